@@ -4,9 +4,15 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import networkx as nx
+import numpy as np
+import sys
+from pathlib import Path
 from utils import load_data, get_community_metrics, get_logo_path
 
+# Backend de grafo do pipeline (steps/_grafo_backend.py)
+BASE_DIR = Path(__file__).resolve().parents[2]  # Sprint4RPA
+sys.path.insert(0, str(BASE_DIR / "pipeline_auto"))
+
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
     page_title="HP Anti-Fraude | Rede de Fraude",
@@ -259,36 +265,36 @@ st.info("""
 Aqui apresentamos uma representação simplificada baseada nos dados de comunidade.
 """)
 
-# Criar um grafo simplificado usando NetworkX
+# Criar um grafo simplificado (igraph, scipy ou NetworkX; ver PIPELINE_GRAFO_BACKEND)
 try:
     import networkx as nx
+    from steps._grafo_backend import GrafoVendedores
     
-    # Criar grafo
-    G = nx.Graph()
-    
-    # Adicionar nós (vendedores) e arestas (conexões por comunidade)
-    for _, row in df.iterrows():
-        if pd.notna(row['grafo_comunidade_id']):
-            G.add_node(row['seller_id'], 
-                      name=row['vendedor_nome'],
-                      community=row['grafo_comunidade_id'],
-                      suspicious=row['is_fraud_suspect_v2'])
-    
-    # Adicionar arestas entre vendedores da mesma comunidade
-    for community_id in df['grafo_comunidade_id'].dropna().unique():
-        vendedores_comunidade = df[df['grafo_comunidade_id'] == community_id]['seller_id'].unique()
-        for i, v1 in enumerate(vendedores_comunidade):
-            for v2 in vendedores_comunidade[i+1:]:
-                G.add_edge(v1, v2)
+    # Nós: vendedores com comunidade; arestas: vendedores da mesma comunidade
+    df_rede = df.dropna(subset=['grafo_comunidade_id'])
+    origem, destino = [], []
+    for _, vendedores_comunidade in df_rede.groupby('grafo_comunidade_id', sort=False)['seller_id']:
+        vendedores_comunidade = vendedores_comunidade.unique()
+        i, j = np.triu_indices(len(vendedores_comunidade), k=1)
+        origem.append(vendedores_comunidade[i])
+        destino.append(vendedores_comunidade[j])
+    arestas = pd.DataFrame({
+        'origem': np.concatenate(origem) if origem else [],
+        'destino': np.concatenate(destino) if destino else [],
+    })
+    # Mesmo par em duas comunidades vira uma aresta só
+    arestas = pd.DataFrame({
+        'origem': arestas.min(axis=1), 'destino': arestas.max(axis=1)
+    }).drop_duplicates()
+    G = GrafoVendedores(df_rede['seller_id'].unique(), arestas['origem'], arestas['destino'])
     
     # Calcular métricas do grafo
-    num_nodes = G.number_of_nodes()
-    num_edges = G.number_of_edges()
-    density = nx.density(G)
+    num_nodes = G.n
+    num_edges = G.num_arestas
+    density = 2 * num_edges / (num_nodes * (num_nodes - 1)) if num_nodes > 1 else 0
     
     # Componentes conectados
-    components = list(nx.connected_components(G))
-    largest_component = max(components, key=len) if components else set()
+    components = np.unique(G.componentes())
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -301,8 +307,9 @@ try:
     if num_nodes <= 1000:  # Limitar para performance
         try:
             # Calcular centralidade
-            centrality = nx.degree_centrality(G)
-            betweenness = nx.betweenness_centrality(G, k=min(100, num_nodes))
+            graus = G.graus() / (num_nodes - 1) if num_nodes > 1 else np.ones(num_nodes)
+            centrality = dict(zip(G.vertices, graus.tolist()))
+            betweenness = nx.betweenness_centrality(G.para_networkx(), k=min(100, num_nodes))
             
             # Top vendedores por centralidade
             top_central = sorted(centrality.items(), key=lambda x: x[1], reverse=True)[:10]
@@ -18,9 +18,14 @@ from processamento_anuncio import (
     extrair_dados_selenium,
     salvar_produto_extraido,
     preparar_reviews_unificado,
-    preparar_dataset_unificado
+    preparar_dataset_unificado,
+    montar_reviews_unificado
 )
-from pipeline_executor import executar_pipeline_programatico
+from pipeline_dag import resolver_arquivo
+from pipeline_executor import PipelineExecutor, SCRIPTS_DIR
+from pipeline_incremental import PontuadorIncremental
+from pipeline_metricas import RelatorioExecucao
+from steps._armazenamento import ler_tabela
 from utils import append_to_dataset, clear_streamlit_cache, get_anuncio_by_id
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
@@ -30,6 +35,11 @@ st.set_page_config(
     layout="wide"
 )
 
+# --- PONTUADOR INCREMENTAL (estado do corpus carregado uma vez por sessão do servidor) ---
+@st.cache_resource(show_spinner=False)
+def obter_pontuador():
+    return PontuadorIncremental(SCRIPTS_DIR, BASE_DIR.parent / "data")
+
 # --- URL PADRÃO ---
 URL_PADRAO = "https://www.mercadolivre.com.br/cartucho-hp-667xl-preto-85ml/p/MLB37822949"
 
@@ -171,11 +181,42 @@ if btn_extrair:
                 else:
                     status_text.text(f"✅ {mensagem}")
             
-            sucesso_pipeline = executar_pipeline_programatico(pular=None, progress_callback=callback_pipeline)
+            # Caminho rápido: pontua só o anúncio novo contra o corpus já processado.
+            # Sem corpus (primeira execução), roda o pipeline completo em processo.
+            # (os arquivos preparados acima ficam apenas como registro da extração)
+            pontuador = obter_pontuador()
+            df_novo = None
+            if pontuador.corpus_disponivel():
+                relatorio = RelatorioExecucao(DATA_DIR, "incremental")
+                df_novo = pontuador.pontuar(
+                    produto,
+                    montar_reviews_unificado(produto),
+                    progress_callback=callback_pipeline,
+                    relatorio=relatorio
+                )
+                relatorio.salvar()
+            else:
+                st.info("ℹ️ Corpus ainda não processado: executando o pipeline completo...")
+                executor = PipelineExecutor(pular=None, progress_callback=callback_pipeline, em_processo=True)
+                sucesso_pipeline = executor.executar(
+                    produtos=[produto],
+                    reviews=montar_reviews_unificado(produto)
+                )
+                
+                if not sucesso_pipeline:
+                    st.error("❌ Erro durante execução do pipeline. Verifique os logs acima.")
+                    with st.expander("⏱️ Métricas por etapa"):
+                        st.dataframe(executor.relatorio.como_dataframe(), use_container_width=True)
+                    st.stop()
+                df_novo = executor.df_final
+                relatorio = executor.relatorio
             
-            if not sucesso_pipeline:
-                st.error("❌ Erro durante execução do pipeline. Verifique os logs acima.")
-                st.stop()
+            # Tempo, CPU, memória e linhas de cada etapa (também salvos em data/relatorios_execucao/)
+            with st.expander("⏱️ Métricas por etapa"):
+                st.dataframe(
+                    relatorio.como_dataframe().drop(columns=["execucao", "inicio"]),
+                    use_container_width=True
+                )
             
             progress_bar.progress(0.95)
             
@@ -183,19 +224,21 @@ if btn_extrair:
             etapa_text.markdown("**Finalizando: Adicionando ao dataset...**")
             status_text.text("🔗 Mesclando com dataset final...")
             
-            # Carregar dataset final processado
-            # O pipeline salva em: fraud_analysis/data/script_7_grafo/dataset_final_com_grafo.csv
-            dataset_final_path = DATA_DIR / "script_7_grafo" / "dataset_final_com_grafo.csv"
+            # Dataset final processado: vem em memória; se não houver,
+            # lê o que o pipeline salva em fraud_analysis/data/script_7_grafo/dataset_final_com_grafo.*
+            dataset_final_path = resolver_arquivo(DATA_DIR, "script_7_grafo/dataset_final_com_grafo.{tabela}")
+            if df_novo is None and dataset_final_path is not None:
+                df_novo = ler_tabela(dataset_final_path)
             
-            if dataset_final_path.exists():
-                df_novo = pd.read_csv(dataset_final_path)
+            if df_novo is not None:
                 
                 # Filtrar apenas o registro mais recente (do processamento atual)
                 # Assumindo que o último registro é o que acabamos de processar
                 ultimo_registro = df_novo.tail(1)
                 
-                # Mesclar com dataset principal (dentro de Sprint4RPA/analise_streamlit/data/)
-                dataset_principal_path = BASE_DIR / "analise_streamlit" / "data" / "final_grafo" / "dataset_final_com_grafo.csv"
+                # Mesclar com dataset principal (dentro de Sprint4RPA/analise_streamlit/data/);
+                # sem extensão: append_to_dataset usa o .parquet/.arrow/.csv mais recente
+                dataset_principal_path = BASE_DIR / "analise_streamlit" / "data" / "final_grafo" / "dataset_final_com_grafo"
                 
                 # Garantir que o diretório existe
                 dataset_principal_path.parent.mkdir(parents=True, exist_ok=True)
@@ -241,7 +284,7 @@ if btn_extrair:
                 """)
                 
             else:
-                st.warning(f"⚠️ Dataset final não encontrado em: {dataset_final_path}")
+                st.warning(f"⚠️ Dataset final não encontrado em: {DATA_DIR / 'script_7_grafo'}")
                 st.info("O pipeline foi executado, mas o arquivo de saída não foi encontrado.")
         
         except Exception as e:
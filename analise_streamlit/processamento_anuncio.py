@@ -12,7 +12,7 @@ import json
 import time
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Callable, Tuple
+from typing import Optional, Dict, List, Callable, Tuple
 import pandas as pd
 
 # Adicionar caminhos necessários
@@ -146,6 +146,26 @@ def salvar_produto_extraido(produto: Dict, progress_callback: Optional[Callable]
         raise
 
 
+def montar_reviews_unificado(produto: Dict) -> List[Dict]:
+    """
+    Monta a estrutura de reviews_unificado.json esperada pelo pipeline (Script 4)
+    
+    Args:
+        produto: Dicionário com dados do produto (deve ter 'todos_reviews')
+    
+    Returns:
+        Lista com um item {"product_id", "reviews"}
+    """
+    product_id = produto.get('id') or produto.get('product_code') or ''
+    reviews = produto.get('todos_reviews', [])
+    return [
+        {
+            "product_id": product_id,
+            "reviews": reviews
+        }
+    ]
+
+
 def preparar_reviews_unificado(produto: Dict, data_dir: Path, progress_callback: Optional[Callable] = None) -> Path:
     """
     Cria arquivo reviews_unificado.json a partir do produto extraído
@@ -162,17 +182,8 @@ def preparar_reviews_unificado(produto: Dict, data_dir: Path, progress_callback:
         if progress_callback:
             progress_callback(0.5, "Preparando reviews unificado...")
         
-        # Extrair dados necessários
-        product_id = produto.get('id') or produto.get('product_code') or ''
-        reviews = produto.get('todos_reviews', [])
-        
         # Criar estrutura esperada pelo pipeline
-        payload = [
-            {
-                "product_id": product_id,
-                "reviews": reviews
-            }
-        ]
+        payload = montar_reviews_unificado(produto)
         
         # Salvar arquivo
         reviews_file = data_dir / "reviews_unificado.json"
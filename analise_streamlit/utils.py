@@ -15,6 +15,76 @@ def resolve_data_path(relative_path: str) -> Path:
     """
     return BASE_DIR / relative_path
 
+# Formatos aceitos para o dataset (os mesmos que o pipeline grava; ver PIPELINE_FORMATO)
+TABLE_EXTENSIONS = (".parquet", ".arrow", ".csv")
+
+def resolve_table_path(path_obj: Path) -> Path:
+    """
+    Retorna a versão mais recente da tabela entre .parquet, .arrow e .csv
+    (mesmo nome, outra extensão); se nenhuma existir, devolve o caminho original
+    """
+    existing = [path_obj.with_suffix(ext) for ext in TABLE_EXTENSIONS if path_obj.with_suffix(ext).exists()]
+    if not existing:
+        return path_obj
+    return max(existing, key=lambda p: p.stat().st_mtime)
+
+def read_table(path_obj: Path, columns=None) -> pd.DataFrame:
+    """
+    Lê uma tabela Parquet, Arrow IPC ou CSV (pela extensão)
+    
+    columns: lista de colunas ou função que recebe o nome e retorna True para manter
+    (como o usecols do pandas); só essas colunas são lidas do disco
+    """
+    if path_obj.suffix == ".csv":
+        return pd.read_csv(path_obj, usecols=columns)
+    
+    if callable(columns):
+        import pyarrow.parquet as pq
+        import pyarrow.ipc as ipc
+        if path_obj.suffix == ".parquet":
+            names = pq.read_schema(path_obj).names
+        else:
+            with ipc.open_file(path_obj) as reader:
+                names = reader.schema.names
+        columns = [c for c in names if columns(c)]
+    
+    if path_obj.suffix == ".parquet":
+        return pd.read_parquet(path_obj, columns=columns)
+    return pd.read_feather(path_obj, columns=columns)
+
+def write_table(df: pd.DataFrame, path_obj: Path) -> None:
+    """
+    Grava uma tabela Parquet, Arrow IPC ou CSV (pela extensão)
+    
+    Colunas de objetos que o Arrow não consegue tipar (ex.: misturas de tipos)
+    são gravadas como texto, como no CSV
+    """
+    if path_obj.suffix == ".csv":
+        df.to_csv(path_obj, index=False, encoding='utf-8')
+        return
+    
+    import pyarrow as pa
+    as_text = {}
+    for column in df.columns[df.dtypes == object]:
+        series = df[column]
+        try:
+            arrow_type = pa.array(series, from_pandas=True).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrow_type = None
+        if arrow_type is None or pa.types.is_nested(arrow_type):
+            as_text[column] = series.map(str).where(series.notna())
+    if as_text:
+        df = df.assign(**as_text)
+    
+    if path_obj.suffix == ".parquet":
+        df.to_parquet(path_obj, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(path_obj)
+
+def _without_embeddings(column: str) -> bool:
+    """Colunas de embedding (vetores de 1536 posições) não são usadas pelas páginas"""
+    return not column.startswith("embedding_")
+
 def get_logo_path() -> str:
     """
     Retorna o caminho absoluto do logo HP
@@ -23,22 +93,28 @@ def get_logo_path() -> str:
     return str(logo_path)
 
 @st.cache_data
-def load_data(path):
-    """Carrega e processa os dados com cache para performance"""
+def load_data(path, columns=None):
+    """
+    Carrega e processa os dados com cache para performance
+    
+    O dataset pode estar em .parquet, .arrow ou .csv (vale o mais recente com o mesmo nome).
+    columns: colunas a carregar (padrão: todas exceto os embeddings)
+    """
     try:
         # Resolver caminho absoluto se for relativo
         path_obj = Path(path)
         if not path_obj.is_absolute():
             path_obj = resolve_data_path(path)
+        path_obj = resolve_table_path(path_obj)
         
-        # Converter para string para pandas
+        # Converter para string para mensagens
         path_str = str(path_obj)
         
         # Verificar se o arquivo existe antes de tentar ler
         if not path_obj.exists():
             raise FileNotFoundError(f"Arquivo não encontrado: {path_str}")
         
-        df = pd.read_csv(path_str)
+        df = read_table(path_obj, columns=columns if columns is not None else _without_embeddings)
         df.drop_duplicates(subset=['id_anuncio'], keep='first', inplace=True)
         df.dropna(subset=['seller_id'], inplace=True)
         df['seller_id'] = df['seller_id'].astype(int)
@@ -217,35 +293,37 @@ def get_community_metrics(df):
 
 def append_to_dataset(novo_registro: pd.DataFrame, dataset_path: str, backup: bool = True) -> bool:
     """
-    Adiciona ou atualiza um registro no dataset CSV
+    Adiciona ou atualiza um registro no dataset
     
     Args:
         novo_registro: DataFrame com o novo registro (deve ter coluna 'id_anuncio')
-        dataset_path: Caminho do arquivo CSV do dataset
+        dataset_path: Caminho do dataset (com ou sem extensão); o registro vai para a
+            versão mais recente entre .parquet, .arrow e .csv, no mesmo formato.
+            Só se nenhuma existir é criado um CSV novo
         backup: Se True, cria backup antes de modificar
     
     Returns:
         True se sucesso, False caso contrário
     """
     try:
-        from pathlib import Path
         from datetime import datetime
         import shutil
         
-        dataset_file = Path(dataset_path)
+        dataset_file = resolve_table_path(Path(dataset_path))
         
         if not dataset_file.exists():
-            # Se o arquivo não existe, criar novo
-            novo_registro.to_csv(dataset_file, index=False, encoding='utf-8')
+            # Se nenhuma versão do dataset existe, criar novo (CSV)
+            dataset_file = dataset_file.with_suffix(".csv")
+            write_table(novo_registro, dataset_file)
             return True
         
         # Criar backup se solicitado
         if backup:
-            backup_path = dataset_file.parent / f"{dataset_file.stem}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            backup_path = dataset_file.parent / f"{dataset_file.stem}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}{dataset_file.suffix}"
             shutil.copy2(dataset_file, backup_path)
         
         # Carregar dataset existente
-        df_existente = pd.read_csv(dataset_file)
+        df_existente = read_table(dataset_file)
         
         # Verificar se já existe registro com mesmo id_anuncio
         id_col = 'id_anuncio'
@@ -260,8 +338,8 @@ def append_to_dataset(novo_registro: pd.DataFrame, dataset_path: str, backup: bo
         # Adicionar novo registro
         df_final = pd.concat([df_existente, novo_registro], ignore_index=True)
         
-        # Salvar dataset atualizado
-        df_final.to_csv(dataset_file, index=False, encoding='utf-8')
+        # Salvar dataset atualizado (mesmo arquivo e formato)
+        write_table(df_final, dataset_file)
         
         return True
         
@@ -296,7 +374,7 @@ def get_anuncio_by_id(id_anuncio: str, dataset_path: str) -> pd.DataFrame:
         # Resolver caminho absoluto se for relativo
         if not Path(dataset_path).is_absolute():
             dataset_path = resolve_data_path(dataset_path)
-        df = pd.read_csv(dataset_path)
+        df = read_table(resolve_table_path(Path(dataset_path)))
         resultado = df[df['id_anuncio'] == id_anuncio]
         return resultado
     except Exception as e:
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark dos backends de grafo (steps/_grafo_backend.py)
+Mede, no mesmo grafo sintético de vendedores, cada operação usada pelo Script 7
+em cada backend disponível (igraph, scipy, networkx):
+
+  construção, grau, grau ponderado, somas sobre vizinhos, PageRank,
+  componentes conexas e comunidades (Louvain)
+
+O grafo imita a camada de catálogo do Script 7: anúncios sorteados entre
+vendedores e produtos de catálogo (tamanho e popularidade lognormais), vendedores
+ligados com peso 5.0 por catálogo em comum, mais alguns vendedores isolados.
+
+Para cada backend: tempo de cada operação, ganho total sobre o networkx,
+diferença máxima do PageRank em relação ao networkx e modularidade das comunidades.
+
+Uso:
+  python pipeline_auto/benchmarks/benchmark_grafo.py
+  python pipeline_auto/benchmarks/benchmark_grafo.py --vendedores 50000 --anuncios 150000 --catalogos 100000
+  python pipeline_auto/benchmarks/benchmark_grafo.py --backends igraph scipy
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_matrix, triu
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "steps"))
+from _grafo_backend import GrafoVendedores, backends_disponiveis
+
+
+def grafo_sintetico(vendedores, anuncios, catalogos, semente=0):
+    """(vendedores, origem, destino, pesos) de um grafo de vendedores ligados por catálogo em comum"""
+    rng = np.random.default_rng(semente)
+    # Número de anúncios por vendedor e popularidade dos catálogos com cauda longa (lognormal)
+    tamanho = rng.lognormal(0.0, 1.5, vendedores)
+    vendedor = rng.choice(vendedores, size=anuncios, p=tamanho / tamanho.sum())
+    popularidade = rng.lognormal(0.0, 1.2, catalogos)
+    catalogo = rng.choice(catalogos, size=anuncios, p=popularidade / popularidade.sum())
+
+    incidencia = csr_matrix((np.ones(anuncios, dtype=np.int32), (vendedor, catalogo)), shape=(vendedores, catalogos))
+    incidencia.data[:] = 1
+    em_comum = triu(incidencia @ incidencia.T, k=1).tocoo()
+    return np.arange(vendedores), em_comum.row, em_comum.col, em_comum.data * 5.0
+
+
+def medir(funcao, repeticoes):
+    """(melhor tempo em segundos, resultado da última execução)"""
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de grafo (Script 7)")
+    parser.add_argument("--vendedores", type=int, default=10000, help="vendedores (nós)")
+    parser.add_argument("--anuncios", type=int, default=30000, help="anúncios sorteados")
+    parser.add_argument("--catalogos", type=int, default=20000, help="produtos de catálogo")
+    parser.add_argument("--backends", nargs="+", default=None, help="backends a medir (padrão: todos os disponíveis)")
+    parser.add_argument("--repeticoes", type=int, default=1, help="execuções de cada operação (vale a mais rápida)")
+    parser.add_argument("--semente", type=int, default=0, help="semente do grafo sintético e do Louvain")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("⏱️ BENCHMARK DOS BACKENDS DE GRAFO")
+    print("=" * 80)
+    vertices, origem, destino, pesos = grafo_sintetico(args.vendedores, args.anuncios, args.catalogos, args.semente)
+    print(f"   🕸️ {len(vertices)} vendedores, {len(origem)} arestas "
+          f"({len(np.unique(np.concatenate([origem, destino])))} vendedores conectados)")
+
+    backends = args.backends or backends_disponiveis()
+    indisponiveis = [b for b in backends if b not in backends_disponiveis()]
+    if indisponiveis:
+        print(f"   ⚠️ Backends não disponíveis: {', '.join(indisponiveis)}")
+        backends = [b for b in backends if b not in indisponiveis]
+
+    valores = np.arange(len(vertices), dtype=float)
+    operacoes = [
+        ("grau", lambda g: g.graus()),
+        ("grau ponderado", lambda g: g.graus_ponderados()),
+        ("somas sobre vizinhos", lambda g: (g.somar_vizinhos(valores), g.somar_vizinhos(valores, ponderado=True))),
+        ("PageRank", lambda g: g.pagerank()),
+        ("componentes", lambda g: g.componentes()),
+        ("comunidades (Louvain)", lambda g: g.comunidades(metodo="louvain", semente=args.semente)),
+    ]
+
+    tempos, resultados = {}, {}
+    for backend in backends:
+        print(f"\n   ▶️ {backend}...")
+        tempo, grafo = medir(lambda: GrafoVendedores(vertices, origem, destino, pesos, backend=backend), args.repeticoes)
+        tempos[backend] = {"construção": tempo}
+        resultados[backend] = {}
+        for nome, funcao in operacoes:
+            tempo, resultado = medir(lambda: funcao(grafo), args.repeticoes)
+            tempos[backend][nome] = tempo
+            resultados[backend][nome] = resultado
+            print(f"      {nome:<24} {tempo:>9.3f} s")
+
+    nomes = ["construção"] + [nome for nome, _ in operacoes]
+    print(f"\n   {'operação':<24}" + "".join(f"{b:>12}" for b in backends))
+    for nome in nomes:
+        print(f"   {nome:<24}" + "".join(f"{tempos[b][nome]:>11.3f}s" for b in backends))
+    totais = {b: sum(tempos[b].values()) for b in backends}
+    print(f"   {'total':<24}" + "".join(f"{totais[b]:>11.3f}s" for b in backends))
+
+    referencia = "networkx" if "networkx" in backends else backends[0]
+    G = GrafoVendedores(vertices, origem, destino, pesos, backend="scipy").para_networkx()
+    print(f"\n   {'backend':<12} {'ganho':>8} {'dif. máx. PageRank':>20} {'comunidades':>12} {'modularidade':>13}")
+    for backend in backends:
+        comunidades = resultados[backend]["comunidades (Louvain)"]
+        ordem = np.argsort(comunidades, kind="stable")
+        particao = [set(p.tolist()) for p in np.split(ordem, np.flatnonzero(np.diff(comunidades[ordem])) + 1)]
+        diferenca = np.abs(resultados[backend]["PageRank"] - resultados[referencia]["PageRank"]).max()
+        print(f"   {backend:<12} {totais[referencia] / totais[backend]:>7.2f}x {diferenca:>20.2e} "
+              f"{len(particao):>12d} {nx.community.modularity(G, particao):>13.4f}")
+    print(f"\n   (ganho e diferença do PageRank em relação ao {referencia})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do pHash de imagens (Script 5)
+Compara, sobre os mesmos bytes já em memória (sem rede nem disco no tempo medido):
+
+  1) imagehash.phash com a imagem decodificada inteira (como o Script 5 fazia)
+  2) decodificação inteira + DCT em lote (steps/_phash.py com PIPELINE_PHASH_DRAFT=0)
+  3) JPEG decodificado em resolução reduzida (draft) + DCT em lote (padrão do Script 5)
+
+Para cada variante: imagens/s, ganho sobre a primeira e distância de Hamming média
+e máxima em relação aos hashes do imagehash.
+
+Uso:
+  python pipeline_auto/benchmarks/benchmark_phash.py                      (imagens sintéticas)
+  python pipeline_auto/benchmarks/benchmark_phash.py --pasta data/script_5_imagens/imagens_baixadas
+  python pipeline_auto/benchmarks/benchmark_phash.py --sinteticas 300 --lado 1200 --lote 64
+
+As imagens sintéticas são JPEGs de fotos de produto simuladas (gradientes, formas,
+desfoque e ruído) no tamanho de uma foto de anúncio.
+"""
+
+import argparse
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "steps"))
+from _hamming import distancia
+from _phash import LOTE_PHASH, PHASH_ERRO, phash_lote, reduzir_imagem
+
+EXTENSOES = {".jpg", ".jpeg", ".webp", ".png"}
+
+
+def imagens_sinteticas(quantidade, lado, semente=0):
+    """Bytes JPEG de `quantidade` imagens com lado maior `lado`"""
+    rng = np.random.default_rng(semente)
+    imagens = []
+    for _ in range(quantidade):
+        largura = lado
+        altura = int(lado * rng.choice([0.75, 1.0, 1.25]))
+        y, x = np.mgrid[0:altura, 0:largura]
+        fundo = np.stack([
+            (np.sin(x / rng.uniform(20, 200) + rng.uniform(0, 6)) * 0.5 + 0.5) * 255 * rng.uniform(0.3, 1),
+            (np.cos(y / rng.uniform(20, 200)) * 0.5 + 0.5) * 255 * rng.uniform(0.3, 1),
+            (x + y) / (largura + altura) * 255,
+        ], axis=-1)
+        img = Image.fromarray(fundo.astype(np.uint8))
+        desenho = ImageDraw.Draw(img)
+        for _ in range(rng.integers(3, 12)):
+            x0, y0 = rng.integers(0, largura), rng.integers(0, altura)
+            tamanho = rng.integers(50, largura // 2)
+            cor = tuple(int(c) for c in rng.integers(0, 256, 3))
+            forma = desenho.ellipse if rng.random() < 0.5 else desenho.rectangle
+            forma([x0, y0, x0 + tamanho, y0 + tamanho // 2], fill=cor)
+        img = img.filter(ImageFilter.GaussianBlur(rng.uniform(0, 3)))
+        ruido = rng.normal(0, 8, (altura, largura, 3))
+        img = Image.fromarray(np.clip(np.asarray(img) + ruido, 0, 255).astype(np.uint8))
+        saida = BytesIO()
+        img.save(saida, format="JPEG", quality=int(rng.integers(70, 95)))
+        imagens.append(saida.getvalue())
+    return imagens
+
+
+def imagens_da_pasta(pasta):
+    return [arquivo.read_bytes() for arquivo in sorted(Path(pasta).iterdir()) if arquivo.suffix.lower() in EXTENSOES]
+
+
+def phash_imagehash(lista_dados):
+    import imagehash
+    resultado = []
+    for dados in lista_dados:
+        try:
+            with Image.open(BytesIO(dados)) as img:
+                resultado.append(str(imagehash.phash(img)))
+        except Exception:
+            resultado.append(PHASH_ERRO)
+    return resultado
+
+
+def phash_em_lotes(lista_dados, lado_draft, lote):
+    resultado = []
+    for inicio in range(0, len(lista_dados), lote):
+        pixels, posicoes, parcial = [], [], [PHASH_ERRO] * len(lista_dados[inicio:inicio + lote])
+        for i, dados in enumerate(lista_dados[inicio:inicio + lote]):
+            try:
+                pixels.append(reduzir_imagem(dados, lado_draft)[0])
+                posicoes.append(i)
+            except Exception:
+                continue
+        if pixels:
+            for i, phash in zip(posicoes, phash_lote(np.stack(pixels))):
+                parcial[i] = phash
+        resultado.extend(parcial)
+    return resultado
+
+
+def medir(funcao, repeticoes):
+    """(melhor tempo em segundos, resultado da última execução)"""
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pHash de imagens (Script 5)")
+    parser.add_argument("--pasta", help="pasta com imagens (.jpg/.webp/.png); padrão: imagens sintéticas")
+    parser.add_argument("--sinteticas", type=int, default=200, help="quantidade de imagens sintéticas")
+    parser.add_argument("--lado", type=int, default=1200, help="lado maior das imagens sintéticas, em pixels")
+    parser.add_argument("--draft", type=int, default=128, help="lado mínimo da decodificação reduzida")
+    parser.add_argument("--lote", type=int, default=LOTE_PHASH, help="imagens por DCT em lote")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções de cada variante (vale a mais rápida)")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("⏱️ BENCHMARK DO pHASH DE IMAGENS")
+    print("=" * 80)
+    if args.pasta:
+        lista_dados = imagens_da_pasta(args.pasta)
+        origem = args.pasta
+    else:
+        lista_dados = imagens_sinteticas(args.sinteticas, args.lado)
+        origem = f"sintéticas, lado {args.lado}px"
+    if not lista_dados:
+        print("   ❌ Nenhuma imagem encontrada")
+        sys.exit(1)
+    print(f"   🖼️ {len(lista_dados)} imagens ({origem}), {sum(map(len, lista_dados)) / 1e6:.1f} MB")
+
+    variantes = []
+    try:
+        import imagehash  # noqa: F401
+        variantes.append(("imagehash.phash (imagem inteira)", lambda: phash_imagehash(lista_dados)))
+    except ImportError:
+        print("   ⚠️ imagehash não instalado: a referência passa a ser a decodificação inteira + DCT em lote")
+    variantes.append(("imagem inteira + DCT em lote", lambda: phash_em_lotes(lista_dados, 0, args.lote)))
+    variantes.append((f"draft >= {args.draft}px + DCT em lote", lambda: phash_em_lotes(lista_dados, args.draft, args.lote)))
+
+    print(f"\n   {'variante':<38} {'imagens/s':>10} {'ganho':>7} {'dist. média':>12} {'dist. máx.':>11}")
+    base_tempo, referencia = None, None
+    for nome, funcao in variantes:
+        tempo, hashes = medir(funcao, args.repeticoes)
+        if base_tempo is None:
+            base_tempo, referencia = tempo, hashes
+        distancias = [
+            distancia(a, b) for a, b in zip(referencia, hashes) if PHASH_ERRO not in (a, b)
+        ]
+        print(f"   {nome:<38} {len(lista_dados) / tempo:>10.1f} {base_tempo / tempo:>6.2f}x "
+              f"{np.mean(distancias):>12.2f} {max(distancias):>11d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ import pickle
 import joblib
 from datetime import datetime
 import os
+import sys
+from pathlib import Path
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.linear_model import RidgeClassifier
 import json
@@ -21,7 +23,10 @@ def main():
     
     # Carregar dados
     print("Carregando dados...")
-    df = pd.read_csv('../data/script_7_grafo/dataset_final_com_grafo.csv')
+    # Saída do Script 7 em qualquer formato (Parquet, Arrow ou CSV; vale a mais recente)
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from steps._armazenamento import ler_tabela, tabela_mais_recente
+    df = ler_tabela(tabela_mais_recente(Path('../data/script_7_grafo'), 'dataset_final_com_grafo'))
     print(f"Dataset carregado: {df.shape}")
     
     # Definir features
@@ -11,7 +11,8 @@ Fluxo:
   3) Script 1  -> 1_filtrar_campos_essenciais.py
   4) Script 2  -> 2_extrair_informacoes_ia.py (requer OPENAI_API_KEY)
   5) Script 3  -> 3_processar_features_basicas.py
-  6) Script 4  -> 4_processar_reviews_nlp.py (requer OPENAI_API_KEY)
+  6) Script 4  -> 4_processar_reviews_nlp.py (requer OPENAI_API_KEY, exceto com
+                   PIPELINE_EMBEDDINGS_BACKEND=local)
   7) Script 5  -> 5_baixar_processar_imagens.py
   8) Script 6  -> 6_criar_target_merge.py
   9) Script 7  -> 7_criar_features_grafo.py (gera dataset final com grafo)
@@ -20,10 +21,30 @@ Uso:
   python scripts/pipeline_auto/pipeline.py \
     --consolidar-selenium (opcional) \
     --pular "2,4" (pular etapas por id) \
-    --parar-em 7
+    --parar-em 7 \
+    --paralelo 2 (etapas independentes simultâneas; 1 = sequencial) \
+    --forcar (ignorar o manifesto e reexecutar todas as etapas)
+    --resumir (continuar do último item gravado nas etapas 2, 4 e 5 após uma falha)
+
+As dependências entre etapas estão declaradas em pipeline_dag.py: 1 e 2 dependem
+apenas da 0, e 4 e 5 apenas da 3, então esses pares rodam em paralelo.
+
+Etapas cujas entradas, código e configuração não mudaram desde o último sucesso
+são puladas (ver pipeline_manifest.py e data/pipeline_manifest.json).
+
+As etapas 2, 4 e 5 gravam um checkpoint por item em data/checkpoints/ (ver
+steps/_checkpoint.py). Depois de uma falha, rodar de novo com --resumir: as etapas
+concluídas são reaproveitadas pelo manifesto e a etapa interrompida continua do
+último item gravado, sem repetir chamadas à OpenAI.
+
+Cada execução grava tempo, CPU, pico de memória e linhas de entrada/saída por etapa em
+data/relatorios_execucao/ (ver pipeline_metricas.py).
 
 Saídas principais:
-  - data/script_7_grafo/dataset_final_com_grafo.csv
+  - data/script_7_grafo/dataset_final_com_grafo.parquet
+
+As tabelas entre etapas são gravadas em Parquet por padrão; PIPELINE_FORMATO=arrow
+grava Arrow IPC e PIPELINE_FORMATO=csv mantém o formato antigo (ver steps/_armazenamento.py).
 """
 
 from __future__ import annotations
@@ -31,13 +52,16 @@ from __future__ import annotations
 import argparse
 import os
 import sys
-import subprocess
 from pathlib import Path
 from typing import List, Optional
 from dotenv import load_dotenv
 import shutil
 import glob
 
+from pipeline_dag import ETAPAS, MAX_PARALELO_PADRAO, etapas_openai, executar_dag, resolver_arquivo, selecionar_etapas
+from pipeline_manifest import ManifestoExecucao
+from pipeline_metricas import RelatorioExecucao, contar_linhas, executar_medindo, padroes_entrada, padroes_saida, resumo_metricas
+
 BASE_DIR = Path(__file__).resolve().parents[2]  # raiz do repo
 SCRIPTS_DIR = BASE_DIR / "scripts"
 DATA_DIR = BASE_DIR / "data"
@@ -48,10 +72,14 @@ LOCAL_ML_DIR = SCRIPTS_DIR / "pipeline_auto" / "ml"
 LOCAL_ML_SCORE_DIR = SCRIPTS_DIR / "pipeline_auto" / "ml_score"
 
 
-def sh(cmd: List[str], cwd: Optional[Path] = None, env: Optional[dict] = None) -> int:
+def sh(cmd: List[str], cwd: Optional[Path] = None, env: Optional[dict] = None,
+       medidas: Optional[dict] = None) -> int:
+    """Executa o comando; se medidas for informado, recebe tempo, CPU e pico de memória do processo"""
     print(f"$ {' '.join(cmd)}")
-    completed = subprocess.run(cmd, cwd=str(cwd) if cwd else None, env=env)
-    return completed.returncode
+    returncode, _, _, medido = executar_medindo(cmd, cwd=cwd, env=env)
+    if medidas is not None:
+        medidas.update(medido)
+    return returncode
 
 
 def validar_ambiente() -> None:
@@ -189,16 +217,7 @@ def consolidar_selenium_antigo() -> None:
         raise RuntimeError("Falha na consolidação das saídas do Selenium (processar_todos_arquivos_lote.py)")
 
 
-STEPS = [
-    (0, "0_unificar_dados_brutos.py"),
-    (1, "1_filtrar_campos_essenciais.py"),
-    (2, "2_extrair_informacoes_ia.py"),
-    (3, "3_processar_features_basicas.py"),
-    (4, "4_processar_reviews_nlp.py"),
-    (5, "5_baixar_processar_imagens.py"),
-    (6, "6_criar_target_merge.py"),
-    (7, "7_criar_features_grafo.py"),
-]
+STEPS = [(etapa["id"], etapa["script"]) for etapa in ETAPAS]
 
 
 def preparar_dataset_unificado_se_necessario() -> None:
@@ -244,46 +263,92 @@ def preparar_dataset_unificado_se_necessario() -> None:
         print(f"⚠️ Pasta {produto_especifico_dir} não encontrada; etapa 0 tentará usar dados_brutos/")
 
 
-def executar_steps(pular: List[int], parar_em: Optional[int]) -> None:
+def executar_steps(pular: List[int], parar_em: Optional[int], paralelo: int = MAX_PARALELO_PADRAO,
+                   forcar: bool = False, resumir: bool = False) -> None:
     # Preparar dataset unificado antes da etapa 0 se necessário (produto_especifico)
     if 0 not in pular:
         preparar_dataset_unificado_se_necessario()
-    
+
     for step_id, script_name in STEPS:
         if step_id in pular:
             print(f"⏭️  Pulando etapa {step_id}: {script_name}")
-            if parar_em is not None and step_id >= parar_em:
-                break
-            continue
 
-        # Preparar reviews_unificado.json antes da etapa 4 se necessário
-        if step_id == 4:
-            preparar_reviews_unificado_se_necessario()
-
-        print("\n" + "=" * 80)
-        print(f"▶️  Executando etapa {step_id}: {script_name}")
-        print("=" * 80)
+    etapas = selecionar_etapas(pular, parar_em)
+    if parar_em is not None:
+        print(f"🛑 Etapas após {parar_em} não serão executadas (--parar-em {parar_em})")
 
+    # Validar tudo antes de iniciar qualquer processo
+    for etapa in etapas:
         # Executar SEMPRE o script original na pasta scripts para manter caminhos relativos e imports
-        alvo = SCRIPTS_DIR / script_name
+        alvo = SCRIPTS_DIR / etapa["script"]
         if not alvo.exists():
             raise FileNotFoundError(f"Script não encontrado: {alvo}")
 
-        # As etapas 2 e 4 requerem OPENAI_API_KEY
-        env = os.environ.copy()
-        # Garantir que imports relativos (ex.: _config) funcionem
-        env["PYTHONPATH"] = str(SCRIPTS_DIR) + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
-        if step_id in (2, 4) and not env.get("OPENAI_API_KEY"):
-            raise EnvironmentError("OPENAI_API_KEY ausente no ambiente para executar etapas 2/4.")
+    env = os.environ.copy()
+    # Garantir que imports relativos (ex.: _config) funcionem
+    env["PYTHONPATH"] = str(SCRIPTS_DIR) + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    # Etapas com checkpoint (2, 4, 5) continuam do último item gravado
+    if resumir:
+        env["PIPELINE_RESUMIR"] = "1"
+        print("♻️  Modo retomada: etapas interrompidas continuam do checkpoint em data/checkpoints/")
+
+    manifesto = ManifestoExecucao(DATA_DIR, SCRIPTS_DIR)
+    relatorio = RelatorioExecucao(DATA_DIR)
+
+    def executar_etapa(etapa: dict) -> bool:
+        # Preparar reviews_unificado.json antes da etapa 4 se necessário
+        if etapa["id"] == 4:
+            preparar_reviews_unificado_se_necessario()
+
+        # Pular se entradas, código e configuração são os mesmos do último sucesso
+        fingerprint = manifesto.calcular_fingerprint(etapa)
+        if not forcar and manifesto.etapa_inalterada(etapa, fingerprint):
+            print(f"♻️  Etapa {etapa['id']} inalterada desde a última execução; reaproveitando saídas")
+            relatorio.registrar(etapa["id"], etapa["script"], "reaproveitada")
+            return True
+
+        # As etapas 2 e 4 requerem OPENAI_API_KEY (só quando realmente precisam rodar;
+        # a 4 dispensa a chave com PIPELINE_EMBEDDINGS_BACKEND=local)
+        if etapa["id"] in etapas_openai(env) and not env.get("OPENAI_API_KEY"):
+            raise EnvironmentError(f"OPENAI_API_KEY ausente no ambiente para executar a etapa {etapa['id']}.")
 
         # Executar com cwd = pasta scripts para manter caminhos relativos esperados
-        rc = sh([sys.executable, str(alvo)], cwd=SCRIPTS_DIR, env=env)
-        if rc != 0:
-            raise RuntimeError(f"Falha ao executar etapa {step_id}: {script_name}")
+        linhas_entrada = contar_linhas(DATA_DIR, padroes_entrada(etapa))
+        medidas = {}
+        rc = sh([sys.executable, str(SCRIPTS_DIR / etapa["script"])], cwd=SCRIPTS_DIR, env=env, medidas=medidas)
+        if rc == 0:
+            manifesto.registrar(etapa, fingerprint)
+        linha = relatorio.registrar(
+            etapa["id"], etapa["script"], "sucesso" if rc == 0 else "falha", medidas,
+            linhas_entrada=linhas_entrada,
+            linhas_saida=contar_linhas(DATA_DIR, padroes_saida(etapa)) if rc == 0 else None
+        )
+        print(f"⏱️  Etapa {etapa['id']}: {resumo_metricas(linha)}")
+        return rc == 0
+
+    def ao_iniciar(etapa: dict) -> None:
+        print("\n" + "=" * 80)
+        print(f"▶️  Executando etapa {etapa['id']}: {etapa['script']}")
+        print("=" * 80)
+
+    def ao_concluir(etapa: dict, sucesso: bool) -> None:
+        if sucesso:
+            print(f"✅ Etapa {etapa['id']} concluída: {etapa['script']}")
 
-        if parar_em is not None and step_id >= parar_em:
-            print(f"🛑 Parando conforme solicitado em --parar-em {parar_em}")
-            break
+    try:
+        resultados = executar_dag(etapas, executar_etapa, max_paralelo=paralelo,
+                                  ao_iniciar=ao_iniciar, ao_concluir=ao_concluir)
+    finally:
+        # Relatório gravado mesmo quando alguma etapa falha
+        relatorio.imprimir()
+        caminho_relatorio = relatorio.salvar()
+        if caminho_relatorio:
+            print(f"📝 Relatório de métricas: {caminho_relatorio} (+ .csv)")
+
+    falhas = [etapa_id for etapa_id, sucesso in resultados.items() if not sucesso]
+    if falhas:
+        nomes = ", ".join(f"{e['id']}: {e['script']}" for e in ETAPAS if e["id"] in falhas)
+        raise RuntimeError(f"Falha ao executar etapa(s) {nomes}")
 
 
 def parse_args() -> argparse.Namespace:
@@ -305,6 +370,22 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Parar após executar a etapa informada (0..7)"
     )
+    parser.add_argument(
+        "--paralelo",
+        type=int,
+        default=MAX_PARALELO_PADRAO,
+        help="Máximo de etapas independentes executando ao mesmo tempo (1 = sequencial)"
+    )
+    parser.add_argument(
+        "--forcar",
+        action="store_true",
+        help="Ignorar o manifesto e reexecutar todas as etapas, mesmo sem mudanças"
+    )
+    parser.add_argument(
+        "--resumir",
+        action="store_true",
+        help="Continuar as etapas 2, 4 e 5 do último item gravado no checkpoint (após uma falha)"
+    )
     return parser.parse_args()
 
 
@@ -335,11 +416,12 @@ def main() -> None:
             raise ValueError("--pular deve conter inteiros separados por vírgula, ex: 2,4")
 
     # Executar 0→7
-    executar_steps(pular=pular, parar_em=args.parar_em)
+    executar_steps(pular=pular, parar_em=args.parar_em, paralelo=args.paralelo, forcar=args.forcar,
+                   resumir=args.resumir)
 
     print("\n✅ Pipeline concluído com sucesso!")
-    caminho_final = DATA_DIR / "script_7_grafo" / "dataset_final_com_grafo.csv"
-    if caminho_final.exists():
+    caminho_final = resolver_arquivo(DATA_DIR, "script_7_grafo/dataset_final_com_grafo.{tabela}")
+    if caminho_final is not None:
         print(f"📊 Dataset final: {caminho_final}")
     else:
         print("⚠️ Arquivo final não encontrado; verifique logs das etapas.")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Agendador DAG do Pipeline
+Declara entradas, saídas e dependências de cada etapa e executa em paralelo
+as etapas cujas dependências já foram concluídas.
+
+Grafo de dependências (derivado dos arquivos que cada script lê):
+
+    0 ──┬──> 1 ──┐
+        └──> 2 ──┴──> 3 ──┬──> 4 ──┐
+                          ├──> 5 ──┼──> 6 ──> 7
+                          └────────┘
+
+Cada etapa continua rodando em um processo separado (subprocess); o pool de
+threads apenas aguarda os processos, então as etapas 1/2 e 4/5 se sobrepõem.
+"""
+
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Entradas e saídas são padrões glob relativos à pasta data/.
+# Quando um padrão casa com vários arquivos, vale o mais recente (mesma regra dos scripts).
+# "{tabela}" casa com qualquer formato de tabela intermediária (parquet, arrow ou csv;
+# ver steps/_armazenamento.py), já que o formato gravado depende de PIPELINE_FORMATO.
+# "linhas_entrada" (opcional) indica quais entradas contam como itens processados no
+# relatório de métricas (padrão: a primeira entrada).
+ETAPAS = [
+    {
+        "id": 0,
+        "script": "0_unificar_dados_brutos.py",
+        "depende_de": [],
+        "entradas": [
+            "../dados_brutos/667 e 668/664_dataset_javascript_sem_reviews_*.json",
+            "../dados_brutos/667 e 668/667_dataset_javascript_sem_reviews_*.json",
+            "../dados_brutos/667 e 668/664_reviews.json",
+            "../dados_brutos/667 e 668/667_reviews.json",
+            "../dados_brutos/667 e 668/664_vendedores.json",
+            "../dados_brutos/667 e 668/667_vendedores.json",
+        ],
+        "saidas": ["script_0_unificar_dados/dataset_completo_unificado_*.json", "reviews_unificado.json"],
+        # Contagem de linhas de entrada do relatório de métricas (os dois datasets brutos)
+        "linhas_entrada": [
+            "../dados_brutos/667 e 668/664_dataset_javascript_sem_reviews_*.json",
+            "../dados_brutos/667 e 668/667_dataset_javascript_sem_reviews_*.json",
+        ],
+    },
+    {
+        "id": 1,
+        "script": "1_filtrar_campos_essenciais.py",
+        "depende_de": [0],
+        "entradas": ["script_0_unificar_dados/dataset_completo_unificado_*.json"],
+        "saidas": ["script_1_filtrar_campos/dataset_campos_essenciais_*.{tabela}"],
+    },
+    {
+        "id": 2,
+        "script": "2_extrair_informacoes_ia.py",
+        "depende_de": [0],
+        "entradas": ["script_0_unificar_dados/dataset_completo_unificado_*.json"],
+        "saidas": ["script_2_ia/dados_extraidos_ia_*.{tabela}"],
+    },
+    {
+        "id": 3,
+        "script": "3_processar_features_basicas.py",
+        "depende_de": [1, 2],
+        "entradas": [
+            "script_1_filtrar_campos/dataset_campos_essenciais_*.{tabela}",
+            "script_2_ia/dados_extraidos_ia_*.{tabela}",
+            "../fornecidos_pela_hp/Tabela de Preços Sugeridos.csv",
+        ],
+        "saidas": ["script_3_features_basicas/dataset_com_features_basicas_*.{tabela}"],
+    },
+    {
+        "id": 4,
+        "script": "4_processar_reviews_nlp.py",
+        "depende_de": [3],
+        "entradas": ["script_3_features_basicas/dataset_com_features_basicas_*.{tabela}", "reviews_unificado.json"],
+        "saidas": ["script_4_nlp/reviews_com_nlp_*.{tabela}", "script_4_nlp/embeddings/indice.json"],
+    },
+    {
+        "id": 5,
+        "script": "5_baixar_processar_imagens.py",
+        "depende_de": [3],
+        "entradas": ["script_3_features_basicas/dataset_com_features_basicas_*.{tabela}"],
+        "saidas": ["script_5_imagens/hashes_imagens.{tabela}"],
+    },
+    {
+        "id": 6,
+        "script": "6_criar_target_merge.py",
+        "depende_de": [3, 4, 5],
+        "entradas": [
+            "script_3_features_basicas/dataset_com_features_basicas_*.{tabela}",
+            "script_4_nlp/reviews_com_nlp_*.{tabela}",
+            "script_5_imagens/hashes_imagens.{tabela}",
+        ],
+        "saidas": ["script_6_*/dataset_final_para_modelo.{tabela}"],
+    },
+    {
+        "id": 7,
+        "script": "7_criar_features_grafo.py",
+        "depende_de": [4, 5, 6],
+        "entradas": [
+            "script_6_*/dataset_final_para_modelo.{tabela}",
+            "script_5_imagens/hashes_imagens.{tabela}",
+            "script_4_nlp/embeddings/indice.json",
+        ],
+        "saidas": [
+            "script_7_grafo/dataset_final_com_grafo.{tabela}",
+            "script_7_grafo/grafo_vendedores_nos.{tabela}",
+            "script_7_grafo/grafo_vendedores_arestas.{tabela}",
+        ],
+    },
+]
+
+# Extensões aceitas no marcador "{tabela}" dos padrões
+EXTENSOES_TABELA = ("parquet", "arrow", "csv")
+
+# Etapas que chamam a API da OpenAI
+ETAPAS_OPENAI = (2, 4)
+# Etapa de embeddings: com PIPELINE_EMBEDDINGS_BACKEND=local roda sem a API
+ETAPA_EMBEDDINGS = 4
+
+# Número padrão de etapas simultâneas (4 e 5 são dominadas por espera de rede)
+MAX_PARALELO_PADRAO = int(os.getenv("PIPELINE_MAX_PARALELO", "2"))
+
+
+def etapas_openai(env=None) -> tuple:
+    """Etapas que precisam de OPENAI_API_KEY com a configuração de `env` (padrão: os.environ)"""
+    env = os.environ if env is None else env
+    if env.get("PIPELINE_EMBEDDINGS_BACKEND", "openai").strip().lower() == "local":
+        return tuple(e for e in ETAPAS_OPENAI if e != ETAPA_EMBEDDINGS)
+    return ETAPAS_OPENAI
+
+
+def selecionar_etapas(pular: Optional[List[int]] = None, parar_em: Optional[int] = None) -> List[Dict]:
+    """Retorna as etapas a executar, removendo as puladas e as posteriores a parar_em"""
+    pular = pular or []
+    return [
+        e for e in ETAPAS
+        if e["id"] not in pular and (parar_em is None or e["id"] <= parar_em)
+    ]
+
+
+def resolver_arquivo(data_dir: Path, padrao: str) -> Optional[Path]:
+    """Resolve um padrão glob relativo a data/ para o arquivo mais recente (ou None)"""
+    padroes = [padrao.replace("{tabela}", ext) for ext in EXTENSOES_TABELA] if "{tabela}" in padrao else [padrao]
+    candidatos = [Path(p) for pad in padroes for p in glob.glob(str(data_dir / pad)) if os.path.isfile(p)]
+    if not candidatos:
+        return None
+    return max(candidatos, key=lambda p: p.stat().st_mtime)
+
+
+def executar_dag(
+    etapas: List[Dict],
+    executar: Callable[[Dict], bool],
+    max_paralelo: int = MAX_PARALELO_PADRAO,
+    ao_iniciar: Optional[Callable[[Dict], None]] = None,
+    ao_concluir: Optional[Callable[[Dict, bool], None]] = None,
+) -> Dict[int, bool]:
+    """
+    Executa as etapas respeitando as dependências declaradas em 'depende_de'.
+
+    Args:
+        etapas: Etapas selecionadas (dependências fora da seleção são consideradas satisfeitas)
+        executar: Função executada em thread de trabalho; retorna True se a etapa teve sucesso
+        max_paralelo: Máximo de etapas simultâneas (1 = sequencial, na ordem dos IDs)
+        ao_iniciar: Callback chamado na thread principal antes de cada etapa
+        ao_concluir: Callback chamado na thread principal ao fim de cada etapa
+
+    Returns:
+        Dicionário {etapa_id: sucesso} das etapas que chegaram a ser executadas.
+        Após a primeira falha nenhuma etapa nova é iniciada; as que já rodam terminam normalmente.
+    """
+    max_paralelo = max(1, int(max_paralelo))
+    ids_selecionados = {e["id"] for e in etapas}
+    pendentes = {e["id"]: e for e in etapas}
+    concluidas = set()
+    resultados: Dict[int, bool] = {}
+    falhou = False
+
+    with ThreadPoolExecutor(max_workers=max_paralelo) as pool:
+        em_execucao = {}
+        while pendentes or em_execucao:
+            if not falhou:
+                prontas = [
+                    e for e in pendentes.values()
+                    if all(d in concluidas or d not in ids_selecionados for d in e["depende_de"])
+                ]
+                vagas = max_paralelo - len(em_execucao)
+                for etapa in sorted(prontas, key=lambda e: e["id"])[:vagas]:
+                    del pendentes[etapa["id"]]
+                    if ao_iniciar:
+                        ao_iniciar(etapa)
+                    em_execucao[pool.submit(executar, etapa)] = etapa
+
+            if not em_execucao:
+                # Falha anterior ou dependência impossível de satisfazer
+                break
+
+            feitos, _ = wait(list(em_execucao), return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                etapa = em_execucao.pop(futuro)
+                try:
+                    sucesso = bool(futuro.result())
+                except Exception as e:
+                    print(f"❌ Exceção na etapa {etapa['id']}: {e}")
+                    sucesso = False
+
+                resultados[etapa["id"]] = sucesso
+                if ao_concluir:
+                    ao_concluir(etapa, sucesso)
+
+                if sucesso:
+                    concluidas.add(etapa["id"])
+                else:
+                    falhou = True
+
+    return resultados
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Execução em Processo do Pipeline
+Importa os scripts das etapas uma única vez e encadeia os DataFrames em memória,
+sem subprocess por etapa e sem reler do disco as saídas intermediárias.
+
+Cada script expõe processar(...) (entrada em memória) e main() (execução como script):
+
+    etapa 1: processar(produtos)                          -> df_essenciais
+    etapa 2: processar(produtos)                          -> df_ia
+    etapa 3: processar(df_essenciais, df_ia, precos_hp)   -> df_features
+    etapa 4: processar(df_features, reviews)              -> df_nlp
+    etapa 5: processar(df_features)                       -> df_hashes
+    etapa 6: processar(df_features, df_nlp, df_hashes)    -> df_modelo
+    etapa 7: processar(df_modelo, df_hashes)              -> df_grafo
+
+A etapa 0 (unificação dos dados brutos) trabalha só com arquivos JSON e roda via main().
+Em memória, os embeddings da etapa 4 seguem como colunas embedding_* até a etapa 7; quando
+df_nlp vem do disco (sem essas colunas), a etapa 7 abre o armazém data/script_4_nlp/embeddings/.
+Entradas que nenhuma etapa da execução produziu (ex.: etapa pulada) são lidas do
+arquivo mais recente em data/, como os scripts fazem quando rodam sozinhos.
+"""
+
+import importlib.util
+import json
+import sys
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from pipeline_dag import ETAPAS, resolver_arquivo
+from steps._armazenamento import ler_tabela
+
+# Etapa -> (entradas em memória, na ordem dos argumentos de processar; saída em memória)
+FLUXO_EM_MEMORIA = {
+    1: (["produtos"], "df_essenciais"),
+    2: (["produtos"], "df_ia"),
+    3: (["df_essenciais", "df_ia", "precos_hp"], "df_features"),
+    4: (["df_features", "reviews"], "df_nlp"),
+    5: (["df_features"], "df_hashes"),
+    6: (["df_features", "df_nlp", "df_hashes"], "df_modelo"),
+    7: (["df_modelo", "df_hashes"], "df_grafo"),
+}
+
+# Arquivo lido quando a entrada não está em memória (padrão glob relativo a data/, vale o mais recente)
+FONTES_EM_DISCO = {
+    "produtos": "script_0_unificar_dados/dataset_completo_unificado_*.json",
+    "reviews": "reviews_unificado.json",
+    "df_essenciais": "script_1_filtrar_campos/dataset_campos_essenciais_*.{tabela}",
+    "df_ia": "script_2_ia/dados_extraidos_ia_*.{tabela}",
+    "df_features": "script_3_features_basicas/dataset_com_features_basicas_*.{tabela}",
+    "df_nlp": "script_4_nlp/reviews_com_nlp_*.{tabela}",
+    "df_hashes": "script_5_imagens/hashes_imagens.{tabela}",
+    "df_modelo": "script_6_*/dataset_final_para_modelo.{tabela}",
+}
+
+# Entradas que o script aceita como None (ele mesmo trata a ausência)
+ENTRADAS_OPCIONAIS = ("df_nlp",)
+
+# Módulos já importados (chave: caminho do script); sobrevivem entre execuções no mesmo processo
+_MODULOS: Dict[str, ModuleType] = {}
+_LOCK_IMPORT = threading.Lock()
+
+
+def carregar_modulo_etapa(scripts_dir: Path, script: str) -> ModuleType:
+    """Importa o script da etapa como módulo (uma única vez por processo)"""
+    caminho = str(Path(scripts_dir) / script)
+    with _LOCK_IMPORT:
+        if caminho in _MODULOS:
+            return _MODULOS[caminho]
+
+        # Os scripts importam _config e auxiliares da própria pasta
+        if str(scripts_dir) not in sys.path:
+            sys.path.insert(0, str(scripts_dir))
+
+        nome = "etapa_" + Path(script).stem
+        spec = importlib.util.spec_from_file_location(nome, caminho)
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+        _MODULOS[caminho] = modulo
+        return modulo
+
+
+class ExecucaoEmProcesso:
+    """Estado de uma execução em processo: módulos das etapas e DataFrames intermediários"""
+
+    def __init__(self, scripts_dir: Path, data_dir: Path,
+                 produtos: Optional[List[Dict]] = None, reviews: Optional[List[Dict]] = None):
+        """
+        Args:
+            scripts_dir: Pasta dos scripts das etapas
+            data_dir: Pasta data/ (entradas não produzidas nesta execução são lidas daqui)
+            produtos: Dataset unificado já em memória (dispensa a etapa 0 e o JSON do Script 0)
+            reviews: Reviews unificados já em memória (dispensa o reviews_unificado.json)
+        """
+        self.scripts_dir = Path(scripts_dir)
+        self.data_dir = Path(data_dir)
+        self.dados: Dict[str, Any] = {}
+        self.entrada_fornecida = produtos is not None
+        if produtos is not None:
+            self.dados["produtos"] = produtos
+        if reviews is not None:
+            self.dados["reviews"] = reviews
+        self._lock = threading.Lock()
+
+    def _modulo(self, etapa_id: int) -> ModuleType:
+        etapa = next(e for e in ETAPAS if e["id"] == etapa_id)
+        return carregar_modulo_etapa(self.scripts_dir, etapa["script"])
+
+    def obter(self, chave: str) -> Any:
+        """Retorna a entrada em memória, lendo do disco se nenhuma etapa a produziu"""
+        with self._lock:
+            if chave in self.dados:
+                return self.dados[chave]
+
+        if chave == "precos_hp":
+            valor = self._modulo(3).carregar_tabela_precos()
+        else:
+            arquivo = resolver_arquivo(self.data_dir, FONTES_EM_DISCO[chave])
+            if arquivo is None:
+                if chave in ENTRADAS_OPCIONAIS:
+                    return None
+                raise FileNotFoundError(f"Entrada '{chave}' não encontrada em {self.data_dir / FONTES_EM_DISCO[chave]}")
+            print(f"   📂 {chave}: lendo {arquivo.name}")
+            if arquivo.suffix == ".json":
+                with open(arquivo, "r", encoding="utf-8") as f:
+                    valor = json.load(f)
+            else:
+                valor = ler_tabela(arquivo)
+
+        with self._lock:
+            return self.dados.setdefault(chave, valor)
+
+    def executar_etapa(self, etapa_id: int) -> None:
+        """Executa a etapa no processo atual (exceções propagam para o chamador)"""
+        modulo = self._modulo(etapa_id)
+
+        if etapa_id == 0:
+            if self.entrada_fornecida:
+                print("   ⏭️ Etapa 0 dispensada: dataset unificado fornecido em memória")
+                return
+            modulo.main()
+            # As próximas etapas devem ler o dataset que a etapa 0 acabou de gravar
+            with self._lock:
+                self.dados.pop("produtos", None)
+                self.dados.pop("reviews", None)
+            return
+
+        entradas, saida = FLUXO_EM_MEMORIA[etapa_id]
+        argumentos = [self.obter(chave) for chave in entradas]
+        resultado = modulo.processar(*argumentos)
+        with self._lock:
+            self.dados[saida] = resultado
+
+    @property
+    def df_final(self) -> Optional[pd.DataFrame]:
+        """Dataset final com features de grafo (None se a etapa 7 não rodou)"""
+        return self.dados.get("df_grafo")
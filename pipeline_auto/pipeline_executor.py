@@ -4,15 +4,28 @@
 """
 Pipeline Executor Programático
 Executa o pipeline com callbacks de progresso para integração com Streamlit
+
+Dois modos:
+- subprocess (padrão): cada etapa roda em um processo Python novo, como no pipeline.py
+- em processo (em_processo=True): as etapas são importadas uma vez e os DataFrames
+  passam de uma etapa para a outra em memória (ver pipeline_em_processo.py)
 """
 
 import os
 import sys
-import subprocess
+import traceback
 from pathlib import Path
-from typing import List, Optional, Callable, Dict
+from typing import List, Optional, Callable, Dict, Tuple
 from dotenv import load_dotenv
 
+import pandas as pd
+
+from pipeline_dag import ETAPAS, MAX_PARALELO_PADRAO, etapas_openai, executar_dag, selecionar_etapas
+from pipeline_em_processo import FLUXO_EM_MEMORIA, ExecucaoEmProcesso
+from pipeline_manifest import ManifestoExecucao
+from pipeline_metricas import (RelatorioExecucao, contar_linhas, executar_medindo, medir_em_processo,
+                               padroes_entrada, padroes_saida, resumo_metricas)
+
 # Configurar caminhos
 BASE_DIR = Path(__file__).resolve().parents[1]  # Sprint4RPA
 SCRIPTS_DIR = BASE_DIR.parent / "scripts"  # fraud_analysis/scripts
@@ -22,33 +35,40 @@ DATA_DIR = BASE_DIR.parent / "data"  # fraud_analysis/data
 load_dotenv(str(BASE_DIR / ".env"), override=False)
 load_dotenv(str(BASE_DIR.parent / ".env"), override=False)
 
-STEPS = [
-    (0, "0_unificar_dados_brutos.py"),
-    (1, "1_filtrar_campos_essenciais.py"),
-    (2, "2_extrair_informacoes_ia.py"),
-    (3, "3_processar_features_basicas.py"),
-    (4, "4_processar_reviews_nlp.py"),
-    (5, "5_baixar_processar_imagens.py"),
-    (6, "6_criar_target_merge.py"),
-    (7, "7_criar_features_grafo.py"),
-]
+STEPS = [(etapa["id"], etapa["script"]) for etapa in ETAPAS]
 
 
 class PipelineExecutor:
     """Executor programático do pipeline com callbacks de progresso"""
     
-    def __init__(self, pular: List[int] = None, progress_callback: Optional[Callable] = None):
+    def __init__(self, pular: List[int] = None, progress_callback: Optional[Callable] = None,
+                 max_paralelo: int = MAX_PARALELO_PADRAO, forcar: bool = False, em_processo: bool = False):
         """
         Inicializa o executor do pipeline
         
         Args:
             pular: Lista de IDs de etapas a pular
             progress_callback: Função callback(progresso: float, mensagem: str, etapa_id: int, etapa_nome: str)
+            max_paralelo: Máximo de etapas independentes executando ao mesmo tempo (1 = sequencial)
+            forcar: Se True, ignora o manifesto e reexecuta etapas inalteradas
+            em_processo: Se True, roda as etapas no processo atual passando DataFrames em memória
+                         (sem manifesto: os resultados intermediários não são gravados em disco)
         """
         self.pular = pular or []
         self.progress_callback = progress_callback
+        self.max_paralelo = max_paralelo
+        self.forcar = forcar
+        self.em_processo = em_processo
+        self.manifesto = ManifestoExecucao(DATA_DIR, SCRIPTS_DIR)
+        self.execucao: Optional[ExecucaoEmProcesso] = None
+        self.relatorio: Optional[RelatorioExecucao] = None  # métricas por etapa da última execução
         self.total_etapas = len([s for s in STEPS if s[0] not in self.pular])
     
+    @property
+    def df_final(self) -> Optional[pd.DataFrame]:
+        """Dataset final da última execução em processo (None no modo subprocess)"""
+        return self.execucao.df_final if self.execucao else None
+    
     def _reportar_progresso(self, etapa_id: int, etapa_nome: str, progresso: float, mensagem: str):
         """Reporta progresso via callback se disponível"""
         if self.progress_callback:
@@ -56,96 +76,185 @@ class PipelineExecutor:
     
     def executar_etapa(self, etapa_id: int, script_name: str) -> bool:
         """
-        Executa uma etapa do pipeline
+        Executa uma etapa do pipeline (avulsa, fora de executar())
+        
+        O relatório e, no modo em processo, os dados em memória são criados na primeira
+        chamada e continuam valendo nas seguintes; o relatório é gravado após cada etapa.
         
         Returns:
             True se sucesso, False caso contrário
         """
+        if self.relatorio is None:
+            self.relatorio = RelatorioExecucao(DATA_DIR, "em_processo" if self.em_processo else "subprocess")
+        if self.em_processo and self.execucao is None:
+            self.execucao = ExecucaoEmProcesso(SCRIPTS_DIR, DATA_DIR)
+        
+        self._reportar_progresso(etapa_id, script_name, 0.5, f"Executando {script_name}...")
+        try:
+            sucesso, mensagem = self._rodar_script(etapa_id, script_name)
+        finally:
+            self.relatorio.salvar()
+        self._reportar_progresso(etapa_id, script_name, 1.0 if sucesso else 0.0, mensagem)
+        return sucesso
+    
+    def _rodar_script(self, etapa_id: int, script_name: str) -> Tuple[bool, str]:
+        """
+        Roda o script da etapa em um subprocesso (ou no processo atual, no modo em processo),
+        sem acionar o callback de progresso (pode ser chamado de threads de trabalho do agendador).
+        
+        Returns:
+            (sucesso, mensagem para o callback)
+        """
+        if self.em_processo:
+            return self._rodar_em_processo(etapa_id, script_name)
+        
         try:
             # Caminho do script
             alvo = SCRIPTS_DIR / script_name
             if not alvo.exists():
-                self._reportar_progresso(etapa_id, script_name, 0.0, f"❌ Script não encontrado: {alvo}")
-                return False
+                return False, f"❌ Script não encontrado: {alvo}"
+            
+            # Pular se entradas, código e configuração são os mesmos do último sucesso
+            etapa = next(e for e in ETAPAS if e["id"] == etapa_id)
+            fingerprint = self.manifesto.calcular_fingerprint(etapa)
+            if not self.forcar and self.manifesto.etapa_inalterada(etapa, fingerprint):
+                self.relatorio.registrar(etapa_id, script_name, "reaproveitada")
+                return True, f"♻️ {script_name} inalterado; saídas reaproveitadas"
             
             # Preparar ambiente
             env = os.environ.copy()
             env["PYTHONPATH"] = str(SCRIPTS_DIR) + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
             
-            # Verificar OPENAI_API_KEY para etapas 2 e 4
-            if etapa_id in (2, 4) and not env.get("OPENAI_API_KEY"):
-                self._reportar_progresso(etapa_id, script_name, 0.0, "❌ OPENAI_API_KEY ausente")
-                return False
-            
-            # Executar script
-            self._reportar_progresso(etapa_id, script_name, 0.5, f"Executando {script_name}...")
+            # Verificar OPENAI_API_KEY para etapas 2 e 4 (a 4 não precisa com embeddings locais)
+            if etapa_id in etapas_openai(env) and not env.get("OPENAI_API_KEY"):
+                return False, "❌ OPENAI_API_KEY ausente"
             
-            result = subprocess.run(
+            # Executar script (medindo tempo, CPU e pico de memória do processo)
+            linhas_entrada = contar_linhas(DATA_DIR, padroes_entrada(etapa))
+            returncode, stdout, stderr, medidas = executar_medindo(
                 [sys.executable, str(alvo)],
-                cwd=str(SCRIPTS_DIR),
+                cwd=SCRIPTS_DIR,
                 env=env,
-                capture_output=True,
-                text=True
+                capturar=True
             )
             
-            if result.returncode == 0:
-                self._reportar_progresso(etapa_id, script_name, 1.0, f"✅ {script_name} concluído")
-                return True
+            if returncode == 0:
+                self.manifesto.registrar(etapa, fingerprint)
+                linha = self.relatorio.registrar(etapa_id, script_name, "sucesso", medidas, linhas_entrada,
+                                                 contar_linhas(DATA_DIR, padroes_saida(etapa)))
+                return True, f"✅ {script_name} concluído ({resumo_metricas(linha)})"
             else:
+                self.relatorio.registrar(etapa_id, script_name, "falha", medidas, linhas_entrada)
                 # Mostrar mais detalhes do erro
-                error_msg = result.stderr if result.stderr else result.stdout
+                error_msg = stderr if stderr else stdout
                 # Pegar últimas linhas do erro (normalmente onde está o traceback)
                 error_lines = error_msg.split('\n')
                 if len(error_lines) > 20:
                     error_msg = '\n'.join(error_lines[-20:])  # Últimas 20 linhas
-                self._reportar_progresso(etapa_id, script_name, 0.0, f"❌ Erro em {script_name}: {error_msg[:500]}")
                 # Também imprimir no console para debug
                 print(f"\n{'='*80}")
                 print(f"ERRO DETALHADO - {script_name}")
                 print(f"{'='*80}")
                 print("STDOUT:")
-                print(result.stdout)
+                print(stdout)
                 print("\nSTDERR:")
-                print(result.stderr)
+                print(stderr)
                 print(f"{'='*80}\n")
-                return False
+                return False, f"❌ Erro em {script_name}: {error_msg[:500]}"
                 
         except Exception as e:
-            self._reportar_progresso(etapa_id, script_name, 0.0, f"❌ Exceção: {str(e)}")
-            return False
+            return False, f"❌ Exceção: {str(e)}"
     
-    def executar(self, preparar_reviews: bool = True) -> bool:
+    def _rodar_em_processo(self, etapa_id: int, script_name: str) -> Tuple[bool, str]:
+        """Executa processar() da etapa no processo atual, com as entradas em memória"""
+        if etapa_id in etapas_openai() and not os.environ.get("OPENAI_API_KEY"):
+            return False, "❌ OPENAI_API_KEY ausente"
+        
+        try:
+            with medir_em_processo() as medidas:
+                self.execucao.executar_etapa(etapa_id)
+            linha = self.relatorio.registrar(etapa_id, script_name, "sucesso", medidas,
+                                             *self._linhas_em_memoria(etapa_id))
+            return True, f"✅ {script_name} concluído (em processo; {resumo_metricas(linha)})"
+        except (Exception, SystemExit) as e:
+            self.relatorio.registrar(etapa_id, script_name, "falha")
+            # SystemExit: verificações de dependência dos scripts encerram com sys.exit(1)
+            print(f"\n{'='*80}")
+            print(f"ERRO DETALHADO - {script_name}")
+            print(f"{'='*80}")
+            traceback.print_exc()
+            print(f"{'='*80}\n")
+            return False, f"❌ Erro em {script_name}: {str(e)[:500]}"
+    
+    def _linhas_em_memoria(self, etapa_id: int) -> Tuple[Optional[int], Optional[int]]:
+        """Linhas da entrada principal e da saída da etapa, contadas nos dados em memória"""
+        if etapa_id not in FLUXO_EM_MEMORIA:
+            return None, None
+        entradas, saida = FLUXO_EM_MEMORIA[etapa_id]
+        dados = self.execucao.dados
+        
+        def tamanho(valor):
+            return len(valor) if valor is not None else None
+        
+        return tamanho(dados.get(entradas[0])), tamanho(dados.get(saida))
+    
+    def executar(self, preparar_reviews: bool = True, produtos: Optional[List[Dict]] = None,
+                 reviews: Optional[List[Dict]] = None) -> bool:
         """
-        Executa todas as etapas do pipeline
+        Executa todas as etapas do pipeline, em paralelo quando as dependências permitem
         
         Args:
             preparar_reviews: Se True, prepara reviews_unificado.json antes da etapa 4
+            produtos: (em processo) dataset unificado em memória; dispensa a etapa 0
+            reviews: (em processo) reviews unificados em memória
         
         Returns:
             True se todas as etapas foram executadas com sucesso
         """
-        etapas_executadas = 0
-        etapas_para_executar = [s for s in STEPS if s[0] not in self.pular]
+        etapas_para_executar = selecionar_etapas(self.pular)
+        concluidas = []
+        self.relatorio = RelatorioExecucao(DATA_DIR, "em_processo" if self.em_processo else "subprocess")
+        
+        if self.em_processo:
+            self.execucao = ExecucaoEmProcesso(SCRIPTS_DIR, DATA_DIR, produtos=produtos, reviews=reviews)
         
         # Preparar dataset unificado antes da etapa 0 se necessário (produto_especifico)
-        if 0 not in self.pular:
+        if 0 not in self.pular and produtos is None:
             self._preparar_dataset_unificado_se_necessario()
         
         # Preparar reviews antes da etapa 4 se necessário
-        if preparar_reviews and 4 not in self.pular:
+        if preparar_reviews and 4 not in self.pular and reviews is None:
             self._preparar_reviews_se_necessario()
         
-        # Executar cada etapa
-        for etapa_id, script_name in etapas_para_executar:
-            progresso_geral = etapas_executadas / self.total_etapas
-            self._reportar_progresso(etapa_id, script_name, progresso_geral, f"Iniciando etapa {etapa_id}: {script_name}")
-            
-            sucesso = self.executar_etapa(etapa_id, script_name)
-            
-            if not sucesso:
-                return False
-            
-            etapas_executadas += 1
+        # Mensagem final de cada etapa, preenchida pelas threads de trabalho
+        mensagens: Dict[int, Tuple[bool, str]] = {}
+        
+        def executar(etapa: Dict) -> bool:
+            mensagens[etapa["id"]] = self._rodar_script(etapa["id"], etapa["script"])
+            return mensagens[etapa["id"]][0]
+        
+        # Callbacks rodam na thread principal (o Streamlit não aceita atualizações de outras threads)
+        def ao_iniciar(etapa: Dict):
+            progresso_geral = len(concluidas) / self.total_etapas
+            self._reportar_progresso(etapa["id"], etapa["script"], progresso_geral,
+                                     f"Iniciando etapa {etapa['id']}: {etapa['script']}")
+        
+        def ao_concluir(etapa: Dict, sucesso: bool):
+            if sucesso:
+                concluidas.append(etapa["id"])
+            _, mensagem = mensagens.get(etapa["id"], (sucesso, ""))
+            progresso_geral = len(concluidas) / self.total_etapas
+            self._reportar_progresso(etapa["id"], etapa["script"], progresso_geral if sucesso else 0.0, mensagem)
+        
+        try:
+            resultados = executar_dag(etapas_para_executar, executar, max_paralelo=self.max_paralelo,
+                                      ao_iniciar=ao_iniciar, ao_concluir=ao_concluir)
+        finally:
+            # Relatório em data/relatorios_execucao/ (também quando alguma etapa falha)
+            self.relatorio.salvar()
+        
+        if len(resultados) < len(etapas_para_executar) or not all(resultados.values()):
+            return False
         
         # Progresso final
         self._reportar_progresso(-1, "Pipeline", 1.0, "✅ Pipeline concluído com sucesso!")
@@ -239,17 +348,23 @@ class PipelineExecutor:
             print(f"⚠️ Não foi possível importar processamento_anuncio: {e}")
 
 
-def executar_pipeline_programatico(pular: List[int] = None, progress_callback: Optional[Callable] = None) -> bool:
+def executar_pipeline_programatico(pular: List[int] = None, progress_callback: Optional[Callable] = None,
+                                   max_paralelo: int = MAX_PARALELO_PADRAO, forcar: bool = False,
+                                   em_processo: bool = False) -> bool:
     """
     Função de conveniência para executar o pipeline programaticamente
     
     Args:
         pular: Lista de IDs de etapas a pular
         progress_callback: Função callback(progresso, mensagem, etapa_id, etapa_nome)
+        max_paralelo: Máximo de etapas independentes executando ao mesmo tempo
+        forcar: Se True, reexecuta também as etapas inalteradas
+        em_processo: Se True, roda as etapas no processo atual (DataFrames em memória)
     
     Returns:
         True se pipeline executado com sucesso
     """
-    executor = PipelineExecutor(pular=pular, progress_callback=progress_callback)
+    executor = PipelineExecutor(pular=pular, progress_callback=progress_callback,
+                                max_paralelo=max_paralelo, forcar=forcar, em_processo=em_processo)
     return executor.executar()
 
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pontuação Incremental de um Anúncio
+Calcula as features das etapas 1–7 apenas para um anúncio novo, contra o estado
+já processado do corpus, sem reconstruir o dataset unificado nem o grafo inteiro.
+
+Estado do corpus reaproveitado (carregado uma vez por processo, recarregado se mudar):
+- data/script_7_grafo/dataset_final_com_grafo.*      (anúncios e vendedores)
+- data/script_4_nlp/embeddings/                      (embeddings .npy, abertos com memory-map)
+- data/script_7_grafo/grafo_vendedores_*.*           (grafo de vendedores salvo pelo Script 7)
+- data/script_5_imagens/hashes_imagens.*             (índice de pHash)
+- fornecidos_pela_hp/Tabela de Preços Sugeridos.csv  (tabela de preços)
+
+Para o anúncio novo:
+- etapas 1–4 e 6 rodam em memória (processar() de cada script) só com essa linha;
+- etapa 5 baixa e calcula o pHash de uma única imagem e conta o reuso no índice
+  (quase-duplicatas a até PIPELINE_PHASH_DISTANCIA bits);
+- etapa 7 soma ao grafo salvo as arestas que o anúncio cria (mesmas 4 camadas e pesos
+  do Script 7) e recalcula as métricas do vendedor dele.
+
+Aproximações em relação a reprocessar o corpus:
+- as comunidades do corpus são mantidas; um vendedor sem comunidade passa a fazer parte
+  da comunidade do vizinho com a aresta mais pesada.
+
+O grafo do corpus fica em memória como GrafoVendedores (steps/_grafo_backend.py) e não
+é copiado: cada anúncio gera um grafo novo só com as arestas dele somadas. Betweenness e
+closeness usam o mesmo estimador do Script 7 (steps/_centralidade.py: pivôs por
+componente, PIPELINE_BETWEENNESS_PIVOS e PIPELINE_CENTRALIDADE_SEMENTE), calculado só na
+componente do vendedor do anúncio; PageRank vem do mesmo backend. Se o anúncio não cria
+arestas novas, valem as centralidades já calculadas pelo Script 7 para o vendedor.
+"""
+
+import ast
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pipeline_dag import resolver_arquivo
+from pipeline_em_processo import ExecucaoEmProcesso, carregar_modulo_etapa
+from pipeline_metricas import RelatorioExecucao, medir_em_processo
+from steps._armazenamento import ler_tabela
+from steps._embeddings import ArmazemEmbeddings, embedding_presente, sem_embeddings, vetor_embedding
+from steps._grafo_backend import GrafoVendedores
+from steps._hamming import DISTANCIA_PADRAO as DISTANCIA_PHASH, IndiceHamming, distancia, phash_para_int
+
+# Arquivos do corpus (padrões relativos a data/)
+FONTES_CORPUS = {
+    "dataset": "script_7_grafo/dataset_final_com_grafo.{tabela}",
+    "nos": "script_7_grafo/grafo_vendedores_nos.{tabela}",
+    "arestas": "script_7_grafo/grafo_vendedores_arestas.{tabela}",
+    "hashes": "script_5_imagens/hashes_imagens.{tabela}",
+    "embeddings": "script_4_nlp/embeddings/indice.json",
+}
+
+# Mesmas camadas e pesos do Script 7
+PESO_CATALOGO = 5.0
+PESO_ALTERNATIVA = 2.0
+PESO_IMAGEM = 1.0
+PESO_SEMANTICO = 0.5
+LIMIAR_SIMILARIDADE = 0.85
+
+SCRIPT_ETAPA_5 = "5_baixar_processar_imagens.py"
+SCRIPT_ETAPA_7 = "7_criar_features_grafo.py"
+
+
+def _normalizar(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+def _lista_alternativos(valor) -> List:
+    """Lê a coluna conexoes_vendedores_alt (string de lista ou lista)"""
+    if isinstance(valor, list):
+        return valor
+    if not isinstance(valor, str):
+        return []
+    try:
+        lista = ast.literal_eval(valor)
+    except (ValueError, SyntaxError):
+        return []
+    return lista if isinstance(lista, list) else []
+
+
+class EstadoCorpus:
+    """Índices do corpus já processado, montados uma vez a partir das saídas das etapas 5 e 7"""
+
+    def __init__(self, arquivos: Dict[str, Path]):
+        self.arquivos = arquivos
+        self.mtimes = {chave: arquivo.stat().st_mtime for chave, arquivo in arquivos.items()}
+
+        df = ler_tabela(arquivos["dataset"])
+        df = df.dropna(subset=['seller_id']).drop_duplicates(subset=['id_anuncio'], keep='first')
+        df['seller_id'] = df['seller_id'].astype('int64')
+        df['id_anuncio'] = df['id_anuncio'].astype(str)
+        self.colunas = list(df.columns)
+        self.suspeito_por_anuncio = dict(zip(df['id_anuncio'], df['is_fraud_suspect_v2'].fillna(0).astype(int)))
+        self.vendedor_por_anuncio = dict(zip(df['id_anuncio'], df['seller_id']))
+
+        # Grafo de vendedores (arrays do backend de grafo; atributos alinhados com grafo.vertices)
+        df_nos = ler_tabela(arquivos["nos"])
+        df_arestas = ler_tabela(arquivos["arestas"])
+        self.grafo = GrafoVendedores(
+            df_nos['seller_id'].astype('int64'),
+            df_arestas['origem'].astype('int64'),
+            df_arestas['destino'].astype('int64'),
+            df_arestas['peso'].astype(float)
+        )
+        self.num_produtos = df_nos['num_produtos'].to_numpy(dtype=np.int64)
+        self.num_produtos_suspeitos = df_nos['num_produtos_suspeitos'].to_numpy(dtype=np.int64)
+        self.comunidade = df_nos['comunidade'].to_numpy(dtype=np.int64)
+
+        # Centralidades calculadas pelo Script 7: valem para vendedores cuja vizinhança não muda
+        self.centralidades_corpus = {}
+        colunas_centralidade = ['grafo_betweenness', 'grafo_closeness', 'grafo_pagerank']
+        if all(c in df.columns for c in colunas_centralidade):
+            self.centralidades_corpus = (
+                df.drop_duplicates(subset=['seller_id']).set_index('seller_id')[colunas_centralidade].to_dict('index')
+            )
+
+        # Camada 1: catálogo -> [(id_anuncio, seller_id)]
+        self.anuncios_por_catalogo = defaultdict(list)
+        df_cat = df.dropna(subset=['catalog_product_id'])
+        for id_anuncio, catalogo, seller_id in zip(df_cat['id_anuncio'], df_cat['catalog_product_id'], df_cat['seller_id']):
+            self.anuncios_por_catalogo[str(catalogo)].append((id_anuncio, seller_id))
+
+        # Camada 2 (sentido inverso): vendedor citado como alternativa -> vendedores que o citam
+        self.citado_por = defaultdict(list)
+        if 'conexoes_vendedores_alt' in df.columns:
+            df_alt = df.dropna(subset=['conexoes_vendedores_alt'])
+            for id_anuncio, valor, seller_id in zip(df_alt['id_anuncio'], df_alt['conexoes_vendedores_alt'], df_alt['seller_id']):
+                for vendedor_alt in _lista_alternativos(valor):
+                    try:
+                        self.citado_por[int(vendedor_alt)].append((id_anuncio, seller_id))
+                    except (ValueError, TypeError):
+                        continue
+
+        # Camada 3 e reuso de imagem: índice de Hamming dos pHashes (quase-duplicatas, ver steps/_hamming.py)
+        df_hashes = ler_tabela(arquivos["hashes"], colunas=['id_anuncio', 'phash'], dtype={'id_anuncio': str})
+        valores, validos = phash_para_int(df_hashes['phash'].tolist())
+        self.indice_phash = IndiceHamming(valores[validos], DISTANCIA_PHASH)
+        posicao = self.indice_phash.posicoes(valores[validos])
+        # Por hash distinto do índice: anúncios com esse hash e grupo de quase-duplicatas
+        self.contagem_por_hash = np.bincount(posicao, minlength=len(self.indice_phash))
+        self.grupo_por_hash = self.indice_phash.agrupar()
+        self.phash_por_anuncio = dict(zip(df_hashes['id_anuncio'], df_hashes['phash']))
+        self.anuncios_por_grupo = defaultdict(list)
+        df_grupos = pd.DataFrame({
+            'id_anuncio': df_hashes['id_anuncio'].to_numpy()[validos],
+            'grupo_imagem': self.grupo_por_hash[posicao],
+        }).merge(df[['id_anuncio', 'seller_id']], on='id_anuncio', how='inner')
+        for id_anuncio, grupo, seller_id in zip(df_grupos['id_anuncio'], df_grupos['grupo_imagem'], df_grupos['seller_id']):
+            self.anuncios_por_grupo[grupo].append((id_anuncio, seller_id))
+
+        # Camada 4: embeddings normalizados por tipo (armazém do Script 4, só anúncios do dataset)
+        self.embeddings = {}
+        armazem = ArmazemEmbeddings.carregar(arquivos["embeddings"].parent)
+        for coluna in (armazem.tipos() if armazem is not None else []):
+            presentes, matriz = armazem.alinhar(coluna, df['id_anuncio'])
+            if not presentes.any():
+                continue
+            self.embeddings[coluna] = (
+                _normalizar(matriz),
+                df['id_anuncio'].to_numpy()[presentes],
+                df['seller_id'].to_numpy()[presentes]
+            )
+
+        print(f"   ✅ Corpus carregado: {len(df)} anúncios, {self.grafo.n} vendedores, "
+              f"{self.grafo.num_arestas} conexões")
+
+    def hashes_proximos(self, phash) -> np.ndarray:
+        """Posições, no índice de Hamming, dos pHashes do corpus a até DISTANCIA_PHASH bits de `phash`"""
+        valores, validos = phash_para_int([phash])
+        if not validos[0]:
+            return np.zeros(0, dtype=np.int64)
+        return self.indice_phash.consultar(valores[0])
+
+    def desatualizado(self) -> bool:
+        """True se algum arquivo do corpus mudou desde a carga"""
+        try:
+            return any(self.arquivos[chave].stat().st_mtime != mtime for chave, mtime in self.mtimes.items())
+        except FileNotFoundError:
+            return True
+
+
+class PontuadorIncremental:
+    """Pontua um anúncio por vez contra o corpus em cache (uma instância por processo)"""
+
+    def __init__(self, scripts_dir: Path, data_dir: Path):
+        self.scripts_dir = Path(scripts_dir)
+        self.data_dir = Path(data_dir)
+        self.corpus: Optional[EstadoCorpus] = None
+        self.precos_hp = None
+
+    def arquivos_corpus(self) -> Optional[Dict[str, Path]]:
+        """Arquivos do corpus ou None se alguma etapa ainda não gerou sua saída"""
+        arquivos = {chave: resolver_arquivo(self.data_dir, padrao) for chave, padrao in FONTES_CORPUS.items()}
+        if any(arquivo is None for arquivo in arquivos.values()):
+            return None
+        return arquivos
+
+    def corpus_disponivel(self) -> bool:
+        return self.arquivos_corpus() is not None
+
+    def carregar_corpus(self) -> EstadoCorpus:
+        """Carrega (ou recarrega, se os arquivos mudaram) o estado do corpus"""
+        if self.corpus is None or self.corpus.desatualizado():
+            arquivos = self.arquivos_corpus()
+            if arquivos is None:
+                raise FileNotFoundError(
+                    f"Corpus não processado em {self.data_dir}: execute o pipeline completo antes"
+                )
+            print("\n📂 CARREGANDO ESTADO DO CORPUS...")
+            self.corpus = EstadoCorpus(arquivos)
+            self.precos_hp = carregar_modulo_etapa(self.scripts_dir, "3_processar_features_basicas.py").carregar_tabela_precos()
+        return self.corpus
+
+    def pontuar(self, produto: Dict, reviews: Optional[List[Dict]] = None,
+                progress_callback: Optional[Callable] = None,
+                relatorio: Optional[RelatorioExecucao] = None) -> pd.DataFrame:
+        """
+        Calcula todas as features do anúncio contra o corpus
+
+        Args:
+            produto: Produto no formato do dataset unificado (Script 0)
+            reviews: Reviews no formato de reviews_unificado.json
+            progress_callback: Função callback(progresso, mensagem, etapa_id, etapa_nome)
+            relatorio: Se informado, recebe as métricas de cada etapa (modo "incremental")
+
+        Returns:
+            DataFrame de uma linha com as colunas de dataset_final_com_grafo
+        """
+        def reportar(progresso, mensagem, etapa_id=-1, etapa_nome=""):
+            if progress_callback:
+                progress_callback(progresso, mensagem, etapa_id, etapa_nome)
+
+        @contextmanager
+        def medir(etapa_id, nome, linhas=1):
+            with medir_em_processo() as medidas:
+                yield
+            if relatorio is not None:
+                relatorio.registrar(etapa_id, nome, "sucesso", medidas, linhas, linhas)
+
+        with medir(-1, "carregar_corpus", linhas=None):
+            corpus = self.carregar_corpus()
+
+        execucao = ExecucaoEmProcesso(self.scripts_dir, self.data_dir, produtos=[produto], reviews=reviews or [])
+        execucao.dados["precos_hp"] = self.precos_hp
+
+        # Etapas 1–4: só o anúncio novo, em memória
+        for etapa_id, progresso in ((1, 0.1), (2, 0.25), (3, 0.45), (4, 0.55)):
+            reportar(progresso, f"Etapa {etapa_id} (anúncio novo)", etapa_id, "pontuação incremental")
+            with medir(etapa_id, f"etapa_{etapa_id}"):
+                execucao.executar_etapa(etapa_id)
+
+        # Etapa 5: uma imagem, reuso contado no índice do corpus
+        reportar(0.7, "Etapa 5: pHash da imagem e reuso no corpus", 5, "pontuação incremental")
+        with medir(5, "etapa_5"):
+            df_features = execucao.dados["df_features"]
+            execucao.dados["df_hashes"] = self._hash_imagem(df_features.iloc[0], corpus)
+
+        # Etapa 6: target com as features acima
+        reportar(0.8, "Etapa 6 (anúncio novo)", 6, "pontuação incremental")
+        with medir(6, "etapa_6"):
+            execucao.executar_etapa(6)
+        df_modelo = execucao.dados["df_modelo"].copy()
+
+        # Etapa 7: arestas novas sobre o grafo salvo
+        reportar(0.9, "Etapa 7: features de grafo contra o grafo do corpus", 7, "pontuação incremental")
+        with medir(7, "etapa_7"):
+            linha = df_modelo.iloc[0]
+            if pd.notna(linha.get('seller_id')):
+                df_modelo['seller_id'] = df_modelo['seller_id'].astype('int64')
+                features = self._features_grafo(df_modelo.iloc[0], execucao.dados["df_hashes"], corpus)
+            else:
+                features = {}
+            for coluna in [c for c in corpus.colunas if c.startswith('grafo_')]:
+                df_modelo[coluna] = features.get(coluna, 0)
+
+        # Mesma ordem de colunas do dataset final (que não leva os embeddings)
+        df_modelo = sem_embeddings(df_modelo)
+        ordem = [c for c in corpus.colunas if c in df_modelo.columns]
+        ordem += [c for c in df_modelo.columns if c not in ordem]
+        reportar(1.0, "Anúncio pontuado")
+        return df_modelo[ordem]
+
+    def _hash_imagem(self, linha: pd.Series, corpus: EstadoCorpus) -> pd.DataFrame:
+        """pHash da imagem do anúncio (do índice do Script 5 ou baixando) como linha de hashes_imagens (vazia se não houver imagem)"""
+        modulo = carregar_modulo_etapa(self.scripts_dir, SCRIPT_ETAPA_5)
+        modulo.IMAGENS_DIR.mkdir(parents=True, exist_ok=True)
+        id_anuncio = str(linha['id_anuncio'])
+        url = linha.get('imagem_url_principal')
+        colunas = ['id_anuncio', 'nome_arquivo', 'phash', 'contagem_reuso_imagem']
+
+        # URL já indexada pelo Script 5: pHash sem baixar a imagem
+        indice = modulo.abrir_indice()
+        try:
+            phash = None
+            if indice is not None and isinstance(url, str) and url:
+                phash = indice.por_urls([url]).get(url)
+            if phash is not None:
+                nome_arquivo = modulo.caminho_imagem(id_anuncio, url).name
+            else:
+                _, caminho, dados = modulo.obter_imagem(id_anuncio, url)
+                if caminho is None:
+                    return pd.DataFrame(columns=colunas)
+                nome_arquivo = caminho.name
+                # pHash dos bytes já em memória (sem reabrir o arquivo gravado)
+                phash, largura, altura, formato = modulo.analisar_imagem(dados)
+                if indice is not None and phash != modulo.PHASH_ERRO:
+                    indice.registrar(url, modulo.digest_conteudo(dados), phash, largura, altura, formato, len(dados))
+        finally:
+            if indice is not None:
+                indice.fechar()
+
+        if phash == 'ERRO':
+            contagem = 0
+        else:
+            # Anúncios do corpus a até DISTANCIA_PHASH bits; o próprio anúncio conta uma vez,
+            # mesmo que já esteja no índice
+            contagem = int(corpus.contagem_por_hash[corpus.hashes_proximos(phash)].sum()) + 1
+            antigo = corpus.phash_por_anuncio.get(id_anuncio)
+            if isinstance(antigo, str) and antigo != 'ERRO' and distancia(antigo, phash) <= DISTANCIA_PHASH:
+                contagem -= 1
+        return pd.DataFrame([[id_anuncio, nome_arquivo, phash, contagem]], columns=colunas)
+
+    def _features_grafo(self, linha: pd.Series, df_hashes: pd.DataFrame, corpus: EstadoCorpus) -> Dict:
+        """Soma ao grafo do corpus as conexões do anúncio e calcula as features do vendedor"""
+        vendedor = int(linha['seller_id'])
+        id_anuncio = str(linha['id_anuncio'])
+        suspeito = int(linha.get('is_fraud_suspect_v2', 0) or 0)
+        vendedores_corpus = corpus.grafo.vertices
+        vendedor_novo = vendedor not in vendedores_corpus
+
+        # Atributos dos vértices (cópias; um vendedor novo entra no fim, sem comunidade)
+        num_produtos = np.append(corpus.num_produtos, [0] * vendedor_novo)
+        num_produtos_suspeitos = np.append(corpus.num_produtos_suspeitos, [0] * vendedor_novo)
+        comunidades = np.append(corpus.comunidade, [-1] * vendedor_novo)
+        no = len(corpus.num_produtos) if vendedor_novo else vendedores_corpus.get_loc(vendedor)
+        # Anúncio já presente no corpus: substitui a contribuição antiga nos atributos do vendedor
+        # (as arestas que ele já criou continuam no grafo salvo)
+        if id_anuncio in corpus.vendedor_por_anuncio:
+            antigo = vendedores_corpus.get_loc(corpus.vendedor_por_anuncio[id_anuncio])
+            num_produtos[antigo] -= 1
+            num_produtos_suspeitos[antigo] -= corpus.suspeito_por_anuncio[id_anuncio]
+        num_produtos[no] += 1
+        num_produtos_suspeitos[no] += suspeito
+
+        def outros(anuncios):
+            return [s for a, s in anuncios if a != id_anuncio]
+
+        novas = defaultdict(float)
+
+        # Camada 1: mesmo produto de catálogo (uma vez por par de vendedores no catálogo)
+        catalogo = linha.get('catalog_product_id')
+        if pd.notna(catalogo):
+            vendedores = set(outros(corpus.anuncios_por_catalogo.get(str(catalogo), [])))
+            if vendedor not in vendedores:
+                for v in vendedores:
+                    novas[v] += PESO_CATALOGO
+
+        # Camada 2: alternativas citadas pelo anúncio e, se o vendedor é novo, anúncios que o citam
+        for vendedor_alt in _lista_alternativos(linha.get('conexoes_vendedores_alt')):
+            try:
+                novas[int(vendedor_alt)] += PESO_ALTERNATIVA
+            except (ValueError, TypeError):
+                continue
+        if vendedor_novo:
+            for v in outros(corpus.citado_por.get(vendedor, [])):
+                novas[v] += PESO_ALTERNATIVA
+
+        # Camada 3: mesma imagem (uma vez por par de vendedores no grupo de quase-duplicatas)
+        if not df_hashes.empty:
+            grupos = set(corpus.grupo_por_hash[corpus.hashes_proximos(df_hashes['phash'].iloc[0])])
+            vendedores = {v for grupo in grupos for v in outros(corpus.anuncios_por_grupo.get(grupo, []))}
+            if vendedor not in vendedores:
+                for v in vendedores:
+                    novas[v] += PESO_IMAGEM
+
+        # Camada 4: similaridade semântica (uma vez por par de anúncios acima do limiar)
+        for coluna, (matriz, ids, vendedores) in corpus.embeddings.items():
+            valor = linha.get(coluna)
+            if not embedding_presente(valor):
+                continue
+            similaridades = matriz @ _normalizar(vetor_embedding(valor))
+            similares = (similaridades > LIMIAR_SIMILARIDADE) & (ids != id_anuncio)
+            for v in vendedores[similares]:
+                novas[int(v)] += PESO_SEMANTICO
+
+        # Só as arestas do anúncio são somadas ao grafo do corpus (o grafo em cache não muda)
+        novas = {v: peso for v, peso in novas.items() if v != vendedor and v in vendedores_corpus}
+        if novas:
+            grafo = corpus.grafo.somar_arestas(
+                [vendedor] * len(novas), list(novas), list(novas.values()),
+                novos_vertices=[vendedor] if vendedor_novo else []
+            )
+        else:
+            grafo = corpus.grafo
+        if no < grafo.n:
+            linha_adjacencia = grafo.adjacencia[no]
+            vizinhos, pesos = linha_adjacencia.indices, linha_adjacencia.data
+        else:
+            vizinhos, pesos = np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        # Comunidade: vendedor sem comunidade adota a do vizinho mais forte. Sem comunidade =
+        # sem arestas no corpus, então os vizinhos vêm das arestas novas (empate: a primeira)
+        if comunidades[no] == -1 and len(vizinhos):
+            mais_forte = vendedores_corpus.get_loc(max(novas, key=novas.get)) if novas else vizinhos[np.argmax(pesos)]
+            if comunidades[mais_forte] == -1:
+                # Vizinho também estava isolado: os dois formam uma comunidade nova
+                comunidades[mais_forte] = comunidades.max() + 1
+            comunidades[no] = comunidades[mais_forte]
+
+        comunidade = int(comunidades[no])
+        membros = comunidades == comunidade
+        total_suspeitos_comunidade = int(num_produtos_suspeitos[membros].sum())
+        total_produtos_comunidade = int(num_produtos[membros].sum())
+
+        features = {
+            # Laço conta 2 no grau (como no networkx)
+            'grafo_num_conexoes': len(vizinhos) + int(no in vizinhos),
+            'grafo_comunidade_id': comunidade,
+            'grafo_num_produtos': int(num_produtos[no]),
+            'grafo_num_suspeitos': int(num_produtos_suspeitos[no]),
+            'grafo_taxa_suspeita_vendedor': num_produtos_suspeitos[no] / num_produtos[no],
+            'grafo_tamanho_comunidade': int(membros.sum()),
+            'grafo_total_suspeitos_comunidade': total_suspeitos_comunidade,
+            'grafo_total_produtos_comunidade': total_produtos_comunidade,
+            'grafo_taxa_suspeita_comunidade': (
+                total_suspeitos_comunidade / total_produtos_comunidade if total_produtos_comunidade > 0 else 0
+            ),
+            'grafo_num_vizinhos': len(vizinhos),
+            'grafo_vizinhos_suspeitos': 0,
+            'grafo_taxa_suspeita_vizinhos': 0,
+            'grafo_peso_total_conexoes': 0,
+            'grafo_peso_medio_conexoes': 0,
+            'grafo_betweenness': 0,
+            'grafo_closeness': 0,
+            'grafo_pagerank': 0,
+        }
+
+        if len(vizinhos):
+            vizinhos_suspeitos = int(num_produtos_suspeitos[vizinhos].sum())
+            vizinhos_produtos = int(num_produtos[vizinhos].sum())
+            peso_total = float(pesos.sum())
+            features.update({
+                'grafo_vizinhos_suspeitos': vizinhos_suspeitos,
+                'grafo_taxa_suspeita_vizinhos': vizinhos_suspeitos / vizinhos_produtos if vizinhos_produtos > 0 else 0,
+                'grafo_peso_total_conexoes': peso_total,
+                'grafo_peso_medio_conexoes': peso_total / len(vizinhos),
+            })
+
+            if not novas and vendedor in corpus.centralidades_corpus:
+                # Nenhuma aresta nova: o grafo é o do corpus, valem as centralidades do Script 7
+                features.update(corpus.centralidades_corpus[vendedor])
+            else:
+                # Centralidades no subgrafo de vendedores conectados, com o estimador do Script 7
+                # (mesmos pivôs e escala) calculado só na componente do vendedor
+                modulo = carregar_modulo_etapa(self.scripts_dir, SCRIPT_ETAPA_7)
+                conectado = grafo.subgrafo(grafo.num_vizinhos() > 0)
+                posicao = conectado.vertices.get_loc(vendedor)
+                betweenness, closeness, _ = modulo.centralidades(conectado, componentes_de=[posicao], processos=1)
+                features.update({
+                    'grafo_betweenness': float(betweenness[posicao]),
+                    'grafo_closeness': float(closeness[posicao]),
+                    # PageRank do backend de grafo (PIPELINE_GRAFO_BACKEND), como no Script 7
+                    'grafo_pagerank': float(conectado.pagerank()[posicao]),
+                })
+
+        return features
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Manifesto de Execução do Pipeline
+Guarda a impressão digital (fingerprint) de cada etapa concluída com sucesso e
+permite pular etapas cujas entradas, código e configuração não mudaram.
+
+O fingerprint de uma etapa é o SHA-256 de:
+- conteúdo do script da etapa e dos módulos auxiliares (_*.py, ex.: _config.py);
+- variáveis de ambiente PIPELINE_* (exceto as que só afetam desempenho);
+- conteúdo do arquivo mais recente de cada entrada declarada em pipeline_dag.ETAPAS.
+
+Como as entradas são comparadas pelo conteúdo (e não pelo nome com timestamp),
+uma etapa pulada mantém suas saídas e as etapas seguintes também são puladas.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from pipeline_dag import resolver_arquivo
+
+MANIFESTO_NOME = "pipeline_manifest.json"
+
+# Variáveis PIPELINE_* que não alteram o resultado das etapas (ficam fora do fingerprint)
+VARIAVEIS_IGNORADAS = (
+    "PIPELINE_MAX_PARALELO",
+    "PIPELINE_RESUMIR",
+    "PIPELINE_LLM_CONCORRENCIA",
+    "PIPELINE_LLM_RPM",
+    "PIPELINE_LLM_TPM",
+    "PIPELINE_LLM_MAX_TENTATIVAS",
+    "PIPELINE_CACHE_LLM",
+    "PIPELINE_CACHE_EMBEDDINGS_MB",
+    "PIPELINE_EMBEDDINGS_LOTE_TOKENS",
+    "PIPELINE_EMBEDDINGS_LOTE_TEXTOS",
+    "PIPELINE_PROCESSOS",
+    "PIPELINE_IMAGENS_CONCORRENCIA",
+    "PIPELINE_IMAGENS_RPS",
+    "PIPELINE_IMAGENS_TENTATIVAS",
+    "PIPELINE_INDICE_PHASH",
+    "PIPELINE_INDICE_PHASH_DIAS",
+    "PIPELINE_SIMILARIDADE_BLOCO_MB",
+)
+
+TAMANHO_BLOCO = 1024 * 1024
+
+
+class ManifestoExecucao:
+    """Manifesto persistido em data/pipeline_manifest.json"""
+
+    def __init__(self, data_dir: Path, scripts_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.scripts_dir = Path(scripts_dir)
+        self.caminho = self.data_dir / MANIFESTO_NOME
+        self._lock = threading.Lock()
+        self._dados = {"etapas": {}, "arquivos": {}}
+        if self.caminho.exists():
+            try:
+                with open(self.caminho, "r", encoding="utf-8") as f:
+                    self._dados.update(json.load(f))
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"⚠️ Manifesto ilegível ({e}); todas as etapas serão executadas")
+
+    def _hash_arquivo(self, caminho: Path) -> str:
+        """SHA-256 do arquivo, reaproveitando o valor salvo se mtime e tamanho não mudaram"""
+        stat = caminho.stat()
+        chave = str(caminho.resolve())
+        with self._lock:
+            salvo = self._dados["arquivos"].get(chave)
+        if salvo and salvo["mtime"] == stat.st_mtime and salvo["tamanho"] == stat.st_size:
+            return salvo["sha256"]
+
+        h = hashlib.sha256()
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(TAMANHO_BLOCO), b""):
+                h.update(bloco)
+        digest = h.hexdigest()
+        with self._lock:
+            self._dados["arquivos"][chave] = {"mtime": stat.st_mtime, "tamanho": stat.st_size, "sha256": digest}
+        return digest
+
+    def calcular_fingerprint(self, etapa: Dict) -> str:
+        """Calcula o fingerprint atual da etapa (código + configuração + entradas)"""
+        h = hashlib.sha256()
+
+        # Código: script da etapa + módulos auxiliares compartilhados (_config.py etc.)
+        script = self.scripts_dir / etapa["script"]
+        h.update(f"script:{etapa['script']}:{self._hash_arquivo(script)}\n".encode())
+        for auxiliar in sorted(self.scripts_dir.glob("_*.py")):
+            h.update(f"aux:{auxiliar.name}:{self._hash_arquivo(auxiliar)}\n".encode())
+
+        # Configuração via ambiente
+        for var in sorted(os.environ):
+            if var.startswith("PIPELINE_") and var not in VARIAVEIS_IGNORADAS:
+                h.update(f"env:{var}={os.environ[var]}\n".encode())
+
+        # Entradas: arquivo mais recente de cada padrão
+        for padrao in etapa["entradas"]:
+            arquivo = resolver_arquivo(self.data_dir, padrao)
+            digest = self._hash_arquivo(arquivo) if arquivo else "<ausente>"
+            h.update(f"in:{padrao}:{digest}\n".encode())
+
+        return h.hexdigest()
+
+    def _estado_saidas(self, etapa: Dict) -> Optional[Dict]:
+        """Identifica as saídas atuais da etapa (arquivo mais recente de cada padrão)"""
+        estado = {}
+        for padrao in etapa["saidas"]:
+            arquivo = resolver_arquivo(self.data_dir, padrao)
+            if arquivo is None:
+                return None
+            stat = arquivo.stat()
+            estado[padrao] = {"caminho": str(arquivo), "mtime": stat.st_mtime, "tamanho": stat.st_size}
+        return estado
+
+    def etapa_inalterada(self, etapa: Dict, fingerprint: str) -> bool:
+        """True se o último sucesso da etapa tem o mesmo fingerprint e suas saídas continuam intactas"""
+        with self._lock:
+            registro = self._dados["etapas"].get(str(etapa["id"]))
+        if not registro or registro.get("fingerprint") != fingerprint:
+            return False
+        # Saídas apagadas ou sobrescritas por outra execução invalidam o registro
+        return self._estado_saidas(etapa) == registro.get("saidas")
+
+    def registrar(self, etapa: Dict, fingerprint: str) -> None:
+        """Registra uma execução bem-sucedida da etapa e persiste o manifesto"""
+        saidas = self._estado_saidas(etapa)
+        with self._lock:
+            if saidas is None:
+                # Sem saídas localizáveis não há como reaproveitar a etapa depois
+                self._dados["etapas"].pop(str(etapa["id"]), None)
+            else:
+                self._dados["etapas"][str(etapa["id"])] = {
+                    "script": etapa["script"],
+                    "fingerprint": fingerprint,
+                    "saidas": saidas,
+                    "concluido_em": datetime.now().isoformat(timespec="seconds"),
+                }
+        self.salvar()
+
+    def salvar(self) -> None:
+        """Grava o manifesto de forma atômica"""
+        with self._lock:
+            # Descartar hashes de arquivos que já não existem (saídas antigas com timestamp)
+            self._dados["arquivos"] = {
+                caminho: info for caminho, info in self._dados["arquivos"].items() if os.path.exists(caminho)
+            }
+            conteudo = json.dumps(self._dados, ensure_ascii=False, indent=2)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_suffix(".tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+        os.replace(temporario, self.caminho)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Métricas de Execução do Pipeline
+Mede, para cada etapa, tempo de parede, tempo de CPU, pico de memória (RSS), linhas de
+entrada/saída e itens por segundo, e grava um relatório por execução em
+data/relatorios_execucao/execucao_<timestamp>.json e .csv.
+
+Como cada modo é medido:
+- subprocess: o processo da etapa é aguardado com os.wait4, que devolve CPU e pico de
+  RSS do próprio filho (corretos mesmo com etapas em paralelo). No Windows não há
+  wait4: CPU e memória ficam vazios.
+- em processo / incremental: CPU da thread que rodou a etapa e pico de RSS do processo
+  até o fim da etapa (o pico é cumulativo, não isolado por etapa).
+
+Linhas de entrada: soma dos arquivos em etapa["linhas_entrada"] (padrão: a primeira
+entrada da etapa). Linhas de saída: primeira saída da etapa. Itens/s usa as de entrada.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from pipeline_dag import resolver_arquivo
+from steps._armazenamento import EXTENSOES_TABELA, contar_linhas_tabela
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PASTA_RELATORIOS = "relatorios_execucao"
+
+COLUNAS_RELATORIO = [
+    "execucao", "modo", "etapa_id", "script", "status", "inicio",
+    "tempo_parede_s", "tempo_cpu_s", "pico_memoria_mb",
+    "linhas_entrada", "linhas_saida", "itens_por_s",
+]
+
+# ru_maxrss vem em KB no Linux e em bytes no macOS
+_FATOR_MAXRSS_MB = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+
+
+def executar_medindo(cmd: List[str], cwd: Optional[Path] = None, env: Optional[dict] = None,
+                     capturar: bool = False) -> Tuple[int, str, str, Dict]:
+    """
+    Executa o comando e mede o processo filho
+
+    Returns:
+        (returncode, stdout, stderr, medidas); stdout/stderr vazios se capturar=False
+    """
+    saidas = {"stdout": "", "stderr": ""}
+    tubo = subprocess.PIPE if capturar else None
+
+    inicio = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=str(cwd) if cwd else None, env=env,
+                            stdout=tubo, stderr=tubo, text=capturar)
+
+    # Leitura dos pipes em threads para o filho não travar com buffer cheio
+    leitores = []
+    if capturar:
+        for nome, fluxo in (("stdout", proc.stdout), ("stderr", proc.stderr)):
+            leitor = threading.Thread(target=lambda n=nome, f=fluxo: saidas.__setitem__(n, f.read()), daemon=True)
+            leitor.start()
+            leitores.append(leitor)
+
+    tempo_cpu = pico_mb = None
+    if hasattr(os, "wait4"):
+        _, status, uso = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        tempo_cpu = uso.ru_utime + uso.ru_stime
+        pico_mb = uso.ru_maxrss * _FATOR_MAXRSS_MB
+    else:
+        proc.wait()
+
+    for leitor in leitores:
+        leitor.join()
+    if capturar:
+        proc.stdout.close()
+        proc.stderr.close()
+
+    medidas = {
+        "tempo_parede_s": time.perf_counter() - inicio,
+        "tempo_cpu_s": tempo_cpu,
+        "pico_memoria_mb": pico_mb,
+    }
+    return proc.returncode, saidas["stdout"], saidas["stderr"], medidas
+
+
+@contextmanager
+def medir_em_processo() -> Iterator[Dict]:
+    """Mede um bloco executado no processo atual; o dict é preenchido ao sair do bloco"""
+    medidas: Dict = {}
+    inicio = time.perf_counter()
+    cpu_inicio = time.thread_time()
+    try:
+        yield medidas
+    finally:
+        medidas["tempo_parede_s"] = time.perf_counter() - inicio
+        medidas["tempo_cpu_s"] = time.thread_time() - cpu_inicio
+        medidas["pico_memoria_mb"] = (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _FATOR_MAXRSS_MB if resource else None
+        )
+
+
+def contar_linhas_arquivo(arquivo: Path) -> Optional[int]:
+    """Registros de uma tabela (Parquet, Arrow, CSV) ou JSON (lista, ou dict com lista em 'produtos')"""
+    try:
+        if arquivo.suffix == ".json":
+            with open(arquivo, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            if isinstance(dados, dict):
+                dados = dados.get("produtos", [dados])
+            return len(dados)
+        if arquivo.suffix in EXTENSOES_TABELA.values():
+            return contar_linhas_tabela(arquivo)
+    except Exception:
+        return None
+    return None
+
+
+def contar_linhas(data_dir: Path, padroes: List[str]) -> Optional[int]:
+    """Soma os registros do arquivo mais recente de cada padrão (None se nenhum existir)"""
+    total = None
+    for padrao in padroes:
+        arquivo = resolver_arquivo(data_dir, padrao)
+        linhas = contar_linhas_arquivo(arquivo) if arquivo else None
+        if linhas is not None:
+            total = (total or 0) + linhas
+    return total
+
+
+def padroes_entrada(etapa: Dict) -> List[str]:
+    return etapa.get("linhas_entrada", etapa["entradas"][:1])
+
+
+def padroes_saida(etapa: Dict) -> List[str]:
+    return etapa["saidas"][:1]
+
+
+class RelatorioExecucao:
+    """Métricas por etapa de uma execução do pipeline (seguro para etapas em paralelo)"""
+
+    def __init__(self, data_dir: Path, modo: str = "subprocess"):
+        self.data_dir = Path(data_dir)
+        self.modo = modo
+        self.execucao = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.linhas: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def registrar(self, etapa_id: int, script: str, status: str, medidas: Optional[Dict] = None,
+                  linhas_entrada: Optional[int] = None, linhas_saida: Optional[int] = None) -> Dict:
+        """Registra uma etapa; status: 'sucesso', 'falha' ou 'reaproveitada'"""
+        medidas = medidas or {}
+        tempo = medidas.get("tempo_parede_s")
+        linha = {
+            "execucao": self.execucao,
+            "modo": self.modo,
+            "etapa_id": etapa_id,
+            "script": script,
+            "status": status,
+            "inicio": datetime.fromtimestamp(time.time() - (tempo or 0)).isoformat(timespec="seconds"),
+            "tempo_parede_s": round(tempo, 3) if tempo is not None else None,
+            "tempo_cpu_s": round(medidas["tempo_cpu_s"], 3) if medidas.get("tempo_cpu_s") is not None else None,
+            "pico_memoria_mb": round(medidas["pico_memoria_mb"], 1) if medidas.get("pico_memoria_mb") is not None else None,
+            "linhas_entrada": linhas_entrada,
+            "linhas_saida": linhas_saida,
+            "itens_por_s": round(linhas_entrada / tempo, 2) if linhas_entrada and tempo else None,
+        }
+        with self._lock:
+            self.linhas.append(linha)
+        return linha
+
+    def como_dataframe(self) -> pd.DataFrame:
+        with self._lock:
+            linhas = sorted(self.linhas, key=lambda l: l["etapa_id"])
+        return pd.DataFrame(linhas, columns=COLUNAS_RELATORIO)
+
+    def salvar(self) -> Optional[Path]:
+        """Grava JSON e CSV em data/relatorios_execucao/ e retorna o caminho do JSON"""
+        if not self.linhas:
+            return None
+        pasta = self.data_dir / PASTA_RELATORIOS
+        pasta.mkdir(parents=True, exist_ok=True)
+        base = pasta / f"execucao_{self.execucao}_{self.modo}"
+
+        df = self.como_dataframe()
+        with open(base.with_suffix(".json"), "w", encoding="utf-8") as f:
+            json.dump({"execucao": self.execucao, "modo": self.modo,
+                       "etapas": sorted(self.linhas, key=lambda l: l["etapa_id"])},
+                      f, ensure_ascii=False, indent=2)
+        df.to_csv(base.with_suffix(".csv"), index=False)
+        return base.with_suffix(".json")
+
+    def imprimir(self) -> None:
+        """Tabela resumida no console"""
+        df = self.como_dataframe()
+        if df.empty:
+            return
+        print("\n⏱️  MÉTRICAS POR ETAPA")
+        print("-" * 80)
+        print(df.drop(columns=["execucao", "modo", "inicio"]).to_string(index=False))
+
+
+def resumo_metricas(linha: Dict) -> str:
+    """Resumo de uma linha do relatório para mensagens de progresso"""
+    partes = []
+    if linha.get("tempo_parede_s") is not None:
+        partes.append(f"{linha['tempo_parede_s']:.1f}s")
+    if linha.get("tempo_cpu_s") is not None:
+        partes.append(f"CPU {linha['tempo_cpu_s']:.1f}s")
+    if linha.get("pico_memoria_mb") is not None:
+        partes.append(f"pico {linha['pico_memoria_mb']:.0f} MB")
+    if linha.get("linhas_entrada") is not None or linha.get("linhas_saida") is not None:
+        partes.append(f"{linha.get('linhas_entrada') or 0}→{linha.get('linhas_saida') or 0} linhas")
+    if linha.get("itens_por_s") is not None:
+        partes.append(f"{linha['itens_por_s']:.1f} itens/s")
+    return " · ".join(partes)
@@ -8,7 +8,7 @@ Este script filtra o dataset unificado mantendo apenas os campos essenciais
 para análise de fraude, conforme especificado na lista definitiva.
 
 Entrada: dataset_completo_unificado_*.json
-Saída: dataset_campos_essenciais_*.json + *.csv
+Saída: dataset_campos_essenciais_*.json + *.parquet (PIPELINE_FORMATO=arrow|csv; ver _armazenamento.py)
 """
 
 import json
@@ -17,8 +17,12 @@ from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+import numpy as np
+import pandas as pd
+
 # Importar configurações
 from _config import DATA_DIR, BASE_DIR
+from _armazenamento import formato_configurado, salvar_tabela
 
 # Pasta específica para Script 1
 SCRIPT_1_DIR = DATA_DIR / "script_1_filtrar_campos"
@@ -174,6 +178,64 @@ def filtrar_campos_essenciais(produto: Dict) -> Dict:
     
     return produto_filtrado
 
+def filtrar_dataset(dataset_unificado: List[Dict]) -> List[Dict]:
+    """Aplica filtrar_campos_essenciais a todos os produtos do dataset unificado"""
+    print("\n🔍 FILTRANDO CAMPOS ESSENCIAIS...")
+    print("-"*80)
+    
+    produtos_essenciais = []
+    produtos_com_erro = 0
+    
+    for i, produto in enumerate(dataset_unificado):
+        try:
+            produto_filtrado = filtrar_campos_essenciais(produto)
+            produtos_essenciais.append(produto_filtrado)
+            
+            if (i + 1) % 50 == 0:
+                print(f"   📊 Processados: {i + 1}/{len(dataset_unificado)} produtos")
+                
+        except Exception as e:
+            produtos_com_erro += 1
+            print(f"   ⚠️ Erro no produto {i + 1}: {e}")
+    
+    print(f"\n✅ Processamento concluído:")
+    print(f"   📊 Produtos processados: {len(produtos_essenciais)}")
+    print(f"   ⚠️ Produtos com erro: {produtos_com_erro}")
+    
+    return produtos_essenciais
+
+def processar(dataset_unificado: List[Dict]) -> pd.DataFrame:
+    """
+    Ponto de entrada em memória (usado pelo modo em processo do PipelineExecutor)
+    """
+    return tabela_essencial(filtrar_dataset(dataset_unificado))
+
+def tabela_essencial(produtos_essenciais: List[Dict]) -> pd.DataFrame:
+    """
+    Retorna o mesmo DataFrame que o Script 3 obteria lendo o CSV salvo por
+    salvar_csv_essencial: textos limpos, listas/dicionários como JSON,
+    vazios como NaN e colunas numéricas tipadas como no pd.read_csv.
+    """
+    todas_chaves = set()
+    for produto in produtos_essenciais:
+        todas_chaves.update(produto.keys())
+    
+    df = pd.DataFrame(
+        [{chave: limpar_valor_csv(valor) for chave, valor in produto.items()} for produto in produtos_essenciais],
+        columns=sorted(todas_chaves)
+    )
+    
+    for coluna in df.columns:
+        if pd.api.types.is_numeric_dtype(df[coluna]):
+            continue
+        serie = df[coluna].replace('', np.nan)
+        try:
+            df[coluna] = pd.to_numeric(serie)
+        except (ValueError, TypeError):
+            df[coluna] = serie
+    
+    return df
+
 def processar_dataset_essencial():
     """Processa o dataset unificado e extrai apenas os campos essenciais"""
     print("="*80)
@@ -203,28 +265,7 @@ def processar_dataset_essencial():
     
     print(f"   ✅ Dataset carregado: {len(dataset_unificado)} produtos")
     
-    # Processar cada produto
-    print("\n🔍 FILTRANDO CAMPOS ESSENCIAIS...")
-    print("-"*80)
-    
-    produtos_essenciais = []
-    produtos_com_erro = 0
-    
-    for i, produto in enumerate(dataset_unificado):
-        try:
-            produto_filtrado = filtrar_campos_essenciais(produto)
-            produtos_essenciais.append(produto_filtrado)
-            
-            if (i + 1) % 50 == 0:
-                print(f"   📊 Processados: {i + 1}/{len(dataset_unificado)} produtos")
-                
-        except Exception as e:
-            produtos_com_erro += 1
-            print(f"   ⚠️ Erro no produto {i + 1}: {e}")
-    
-    print(f"\n✅ Processamento concluído:")
-    print(f"   📊 Produtos processados: {len(produtos_essenciais)}")
-    print(f"   ⚠️ Produtos com erro: {produtos_com_erro}")
+    produtos_essenciais = filtrar_dataset(dataset_unificado)
     
     # Criar pasta específica do Script 1 se não existir
     SCRIPT_1_DIR.mkdir(parents=True, exist_ok=True)
@@ -239,10 +280,15 @@ def processar_dataset_essencial():
     if salvar_json(produtos_essenciais, arquivo_json):
         print(f"   ✅ JSON salvo: {arquivo_json}")
     
-    # Salvar CSV essencial
-    arquivo_csv = SCRIPT_1_DIR / f"dataset_campos_essenciais_{timestamp}.csv"
-    if salvar_csv_essencial(produtos_essenciais, arquivo_csv):
-        print(f"   ✅ CSV salvo: {arquivo_csv}")
+    # Salvar tabela essencial (entrada do Script 3) no formato de PIPELINE_FORMATO
+    if formato_configurado() == "csv":
+        arquivo_csv = SCRIPT_1_DIR / f"dataset_campos_essenciais_{timestamp}.csv"
+        if salvar_csv_essencial(produtos_essenciais, arquivo_csv):
+            print(f"   ✅ CSV salvo: {arquivo_csv}")
+    else:
+        arquivo_tabela = salvar_tabela(tabela_essencial(produtos_essenciais), SCRIPT_1_DIR,
+                                       f"dataset_campos_essenciais_{timestamp}")
+        print(f"   ✅ Tabela salva: {arquivo_tabela}")
     
     # Estatísticas finais
     print(f"\n📈 ESTATÍSTICAS FINAIS:")
@@ -278,6 +324,20 @@ def processar_dataset_essencial():
     
     return produtos_essenciais
 
+def limpar_valor_csv(valor: Any) -> Any:
+    """Normaliza um valor para CSV: textos sem quebras de linha, listas e dicionários como JSON"""
+    if isinstance(valor, str):
+        # Limpar quebras de linha e caracteres problemáticos
+        valor_limpo = valor.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
+        # Limitar tamanho
+        if len(valor_limpo) > 1000:
+            valor_limpo = valor_limpo[:1000] + "..."
+        return valor_limpo
+    if isinstance(valor, (list, dict)):
+        # Converter lista/dicionário para string JSON
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
 def salvar_csv_essencial(dados: List[Dict], caminho: Path) -> bool:
     """Salva dados essenciais em formato CSV com tratamento correto de listas e dicionários"""
     import csv
@@ -302,24 +362,7 @@ def salvar_csv_essencial(dados: List[Dict], caminho: Path) -> bool:
             
             for produto in dados:
                 # Limpar dados de texto para CSV
-                produto_limpo = {}
-                for chave, valor in produto.items():
-                    if isinstance(valor, str):
-                        # Limpar quebras de linha e caracteres problemáticos
-                        valor_limpo = valor.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-                        # Limitar tamanho
-                        if len(valor_limpo) > 1000:
-                            valor_limpo = valor_limpo[:1000] + "..."
-                        produto_limpo[chave] = valor_limpo
-                    elif isinstance(valor, list):
-                        # Converter lista para string JSON
-                        produto_limpo[chave] = json.dumps(valor, ensure_ascii=False)
-                    elif isinstance(valor, dict):
-                        # Converter dicionário para string JSON
-                        produto_limpo[chave] = json.dumps(valor, ensure_ascii=False)
-                    else:
-                        produto_limpo[chave] = valor
-                
+                produto_limpo = {chave: limpar_valor_csv(valor) for chave, valor in produto.items()}
                 writer.writerow(produto_limpo)
         
         return True
@@ -10,7 +10,13 @@ INPUT:
 
 OUTPUT:
 - data/script_1_ia/dados_extraidos_ia_*.json
-- data/script_1_ia/dados_extraidos_ia_*.csv
+- data/script_1_ia/dados_extraidos_ia_*.parquet
+
+Tabelas gravadas em Parquet por padrão (PIPELINE_FORMATO=arrow|csv; ver _armazenamento.py).
+
+Títulos sem ambiguidade são resolvidos por regras locais (_regras_cartucho.py); os demais
+são enviados em paralelo (PIPELINE_LLM_CONCORRENCIA) dentro dos limites
+de requisições/tokens por minuto; 429 respeitam o Retry-After (ver _limitador.py).
 
 INFORMAÇÕES EXTRAÍDAS:
 - tipo_cartucho: modelo (ex: "662", "662xl", "664")
@@ -20,6 +26,7 @@ INFORMAÇÕES EXTRAÍDAS:
 """
 
 import pandas as pd
+import hashlib
 import json
 import os
 import sys
@@ -29,91 +36,32 @@ from openai import OpenAI
 import time
 from datetime import datetime
 import glob
+from typing import Dict, List
 
 # Importar configurações
 sys.path.append(str(Path(__file__).parent))
 from _config import *
+from _checkpoint import Checkpoint, assinatura_conteudo
+from _armazenamento import salvar_tabela
+from _cache import CacheRespostas, cache_ativo, chave_cache
+from _regras_cartucho import classificar, preclassificador_ativo
+from _limitador import CONCORRENCIA_PADRAO, estimar_tokens, executar_em_paralelo, limitador_padrao
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-print("="*80)
-print("🤖 SCRIPT 1: EXTRAIR INFORMAÇÕES COM IA")
-print("="*80)
-
-# =============================================================================
-# 1. VERIFICAR DEPENDÊNCIAS
-# =============================================================================
-
-print("\n📦 VERIFICANDO DEPENDÊNCIAS...")
-print("-"*80)
-
-# Verificar OpenAI
-try:
-    from openai import OpenAI
-    print("   ✅ openai instalado")
-except ImportError:
-    print("   ❌ openai não encontrado!")
-    print("   Execute: pip install openai")
-    sys.exit(1)
-
-# Verificar API Key
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    print("   ❌ OPENAI_API_KEY não encontrada no .env!")
-    print("   Crie um arquivo .env com: OPENAI_API_KEY=sk-...")
-    sys.exit(1)
-else:
-    print(f"   ✅ API Key OpenAI configurada")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-# =============================================================================
-# 2. CONFIGURAR ARQUIVOS DE ENTRADA E SAÍDA
-# =============================================================================
-
-# Detectar arquivo de entrada mais recente
-arquivos_json = list(SCRIPT_0_DIR.glob("dataset_completo_unificado_*.json"))
-if not arquivos_json:
-    print(f"   ❌ Nenhum arquivo JSON encontrado em {SCRIPT_0_DIR}")
-    sys.exit(1)
-
-arquivo_entrada = max(arquivos_json, key=lambda x: x.stat().st_mtime)
-print(f"   📂 Arquivo de entrada: {arquivo_entrada.name}")
-
-# Configurar pasta de saída
-SCRIPT_2_IA_DIR = DATA_DIR / "script_2_ia"
-SCRIPT_2_IA_DIR.mkdir(exist_ok=True)
-
-# Arquivos de saída
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-arquivo_saida_json = SCRIPT_2_IA_DIR / f"dados_extraidos_ia_{timestamp}.json"
-arquivo_saida_csv = SCRIPT_2_IA_DIR / f"dados_extraidos_ia_{timestamp}.csv"
-
 # =============================================================================
-# 3. CONFIGURAÇÕES DO MODELO
+# 1. CONFIGURAÇÕES DO MODELO
 # =============================================================================
 
 MODELO = "gpt-4o-mini"  # Melhor custo-benefício
 TEMPERATURA = 0  # Determinístico (sempre mesma resposta)
-MAX_RETRIES = 3  # Tentativas em caso de erro
+MAX_RETRIES = 3  # Tentativas em caso de resposta inválida (429/5xx são repetidos pelo limitador)
+MAX_TOKENS_RESPOSTA = 100  # Reserva de tokens da resposta no limite por minuto
+MENSAGEM_SISTEMA = "Você é um especialista em análise de produtos HP. Responda SEMPRE com JSON válido."
 
-# =============================================================================
-# 4. FUNÇÃO DE EXTRAÇÃO COM IA
-# =============================================================================
-
-def extrair_informacoes_com_gpt(titulo, descricao=None):
-    """
-    Extrai informações estruturadas de um título/descrição de produto
-    usando GPT-4o-mini com JSON mode.
-    """
-    
-    # Montar o prompt
-    texto_analise = f"Título: {titulo}"
-    if descricao and str(descricao).strip() and str(descricao) != 'nan':
-        texto_analise += f"\nDescrição: {descricao}"
-    
-    prompt = f"""Analise o seguinte produto de cartucho de tinta HP e extraia as informações de forma PRECISA:
+# Prompt de extração ({texto_analise} = título e descrição do produto)
+PROMPT_EXTRACAO = """Analise o seguinte produto de cartucho de tinta HP e extraia as informações de forma PRECISA:
 
 {texto_analise}
 
@@ -206,27 +154,107 @@ Retorne APENAS o JSON com esta estrutura exata:
     "usado_seminovo": 0 ou 1
 }}"""
 
+# Versão do prompt para o cache de respostas: editar o prompt ou o modelo invalida o cache
+VERSAO_PROMPT = hashlib.sha1((MENSAGEM_SISTEMA + PROMPT_EXTRACAO).encode("utf-8")).hexdigest()[:12]
+
+# Valores usados quando todas as tentativas falham (não entram no checkpoint)
+RESULTADO_PADRAO = {
+    "tipo_cartucho": "desconhecido",
+    "cores_detalhadas": {"preto": 0, "colorido": 0},
+    "quantidade_por_anuncio": 1,
+    "usado_seminovo": 0
+}
+
+# Cliente criado sob demanda para que o módulo possa ser importado sem API Key
+_client = None
+
+def obter_cliente():
+    """Retorna o cliente OpenAI (criado na primeira chamada)"""
+    global _client
+    if _client is None:
+        # Sem retries internos: 429 e falhas transitórias passam pelo limitador
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _client
+
+# =============================================================================
+# 2. VERIFICAR DEPENDÊNCIAS
+# =============================================================================
+
+def verificar_dependencias():
+    """Verifica pacote openai e API Key (encerra o script se faltar algo)"""
+    print("\n📦 VERIFICANDO DEPENDÊNCIAS...")
+    print("-"*80)
+
+    # Verificar OpenAI
+    try:
+        from openai import OpenAI
+        print("   ✅ openai instalado")
+    except ImportError:
+        print("   ❌ openai não encontrado!")
+        print("   Execute: pip install openai")
+        sys.exit(1)
+
+    # Verificar API Key
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    if not OPENAI_API_KEY:
+        print("   ❌ OPENAI_API_KEY não encontrada no .env!")
+        print("   Crie um arquivo .env com: OPENAI_API_KEY=sk-...")
+        sys.exit(1)
+    else:
+        print(f"   ✅ API Key OpenAI configurada")
+
+# =============================================================================
+# 3. FUNÇÃO DE EXTRAÇÃO COM IA
+# =============================================================================
+
+def _chamar_api(prompt):
+    """Envia o prompt dentro dos limites de taxa e devolve o conteúdo (JSON) da resposta"""
+    response = limitador_padrao().executar(
+        lambda: obter_cliente().chat.completions.create(
+            model=MODELO,
+            messages=[
+                {
+                    "role": "system",
+                    "content": MENSAGEM_SISTEMA
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=TEMPERATURA,
+            response_format={"type": "json_object"}  # Garante JSON válido
+        ),
+        tokens_estimados=estimar_tokens(MENSAGEM_SISTEMA, prompt) + MAX_TOKENS_RESPOSTA
+    )
+    return response.choices[0].message.content
+
+def extrair_informacoes_com_gpt(titulo, descricao=None, cache=None):
+    """
+    Extrai informações estruturadas de um título/descrição de produto
+    usando GPT-4o-mini com JSON mode.
+
+    cache: CacheRespostas com as respostas brutas da API; num acerto a resposta
+    gravada passa pelas mesmas validações, sem chamada de rede.
+    """
+    
+    # Montar o prompt
+    texto_analise = f"Título: {titulo}"
+    if descricao and str(descricao).strip() and str(descricao) != 'nan':
+        texto_analise += f"\nDescrição: {descricao}"
+    
+    prompt = PROMPT_EXTRACAO.format(texto_analise=texto_analise)
+
+    chave = chave_cache(titulo, descricao) if cache is not None else None
+
     # Fazer a chamada à API com JSON mode
     for tentativa in range(MAX_RETRIES):
+        # Cache consultado só na primeira tentativa (as demais são novas chamadas à API)
+        conteudo = cache.obter(chave) if cache is not None and tentativa == 0 else None
+        do_cache = conteudo is not None
         try:
-            response = client.chat.completions.create(
-                model=MODELO,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Você é um especialista em análise de produtos HP. Responda SEMPRE com JSON válido."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=TEMPERATURA,
-                response_format={"type": "json_object"}  # Garante JSON válido
-            )
-            
-            # Extrair e parsear o JSON
-            conteudo = response.choices[0].message.content
+            if not do_cache:
+                conteudo = _chamar_api(prompt)
             resultado = json.loads(conteudo)
             
             # Validar estrutura
@@ -267,123 +295,228 @@ Retorne APENAS o JSON com esta estrutura exata:
                 print(f"   ⚠️ Ajuste: Quantidade inválida ({quantidade}), ajustada para 1")
                 resultado['quantidade_por_anuncio'] = 1
             
+            # Só respostas válidas entram no cache
+            if cache is not None and not do_cache:
+                cache.registrar(chave, conteudo)
             return resultado
             
         except Exception as e:
+            if do_cache:
+                # Resposta gravada não passa mais na validação: descartar e consultar a API
+                cache.remover(chave)
+                continue
             print(f"   ⚠️ Tentativa {tentativa + 1}/{MAX_RETRIES} falhou: {e}")
             if tentativa < MAX_RETRIES - 1:
                 time.sleep(1)  # Aguardar 1 segundo antes de tentar novamente
             else:
                 # Se todas as tentativas falharem, retornar valores padrão
                 print(f"   ❌ Erro ao processar. Usando valores padrão.")
-                return {
-                    "tipo_cartucho": "desconhecido",
-                    "cores_detalhadas": {"preto": 0, "colorido": 0},
-                    "quantidade_por_anuncio": 1,
-                    "usado_seminovo": 0
-                }
+                return json.loads(json.dumps(RESULTADO_PADRAO))
 
 # =============================================================================
-# 5. CARREGAR DADOS
+# 4. PROCESSAR CADA PRODUTO
 # =============================================================================
 
-print(f"\n📂 CARREGANDO DADOS...")
-print("-"*80)
+def abrir_cache():
+    """Cache de respostas da etapa (data/cache/script_2_ia.sqlite), ou None se desligado"""
+    if not cache_ativo():
+        return None
+    return CacheRespostas("script_2_ia", f"{MODELO}:{VERSAO_PROMPT}")
 
-# Carregar JSON unificado
-with open(arquivo_entrada, 'r', encoding='utf-8') as f:
-    dados = json.load(f)
+def processar(dados: List[Dict], checkpoint: Checkpoint = None,
+              concorrencia: int = CONCORRENCIA_PADRAO, cache: CacheRespostas = None) -> pd.DataFrame:
+    """
+    Extrai as informações de IA de todos os produtos do dataset unificado.
+    Ponto de entrada em memória (usado pelo modo em processo do PipelineExecutor).
+
+    checkpoint: se informado, cada produto extraído é gravado nele e produtos já
+    gravados (mesmo título/descrição/modelo) não são enviados de novo à API.
+    concorrencia: produtos enviados à API ao mesmo tempo.
+    cache: cache de respostas entre execuções; se None, abre o cache padrão
+    (desligado com PIPELINE_CACHE_LLM=0).
+    """
+    print(f"\n⚙️ PROCESSANDO PRODUTOS COM {MODELO}...")
+    print("-"*80)
+
+    if checkpoint is not None and len(checkpoint):
+        print(f"   ♻️ Retomando: {len(checkpoint)} produto(s) já extraídos no checkpoint")
+
+    fechar_cache = cache is None
+    if cache is None:
+        cache = abrir_cache()
+    if cache is not None and cache.invalidadas:
+        print(f"   🗑️ Cache: {cache.invalidadas} resposta(s) de outro prompt/modelo descartadas")
+
+    resultados = [None] * len(dados)
+    # Chave do texto normalizado -> produtos pendentes com esse texto
+    pendentes = {}
+    inicio_total = time.time()
+
+    # Reaproveitar do checkpoint; o restante vai para a API
+    for idx, produto in enumerate(dados):
+        produto_id = produto.get('id', f'produto_{idx}')
+        titulo = produto.get('titulo', '')
+        descricao = produto.get('descricao', '')
+        assinatura = assinatura_conteudo(titulo, descricao, MODELO)
+        info = checkpoint.obter(produto_id, assinatura) if checkpoint is not None else None
+        if info is not None:
+            info['id_anuncio'] = produto_id
+            resultados[idx] = info
+        else:
+            pendentes.setdefault(chave_cache(titulo, descricao), []).append(
+                (idx, produto_id, titulo, descricao, assinatura)
+            )
 
-print(f"   ✅ {len(dados)} produtos carregados")
+    total_pendentes = sum(len(grupo) for grupo in pendentes.values())
+    if total_pendentes < len(dados):
+        print(f"   ♻️ {len(dados) - total_pendentes} produto(s) reaproveitados do checkpoint")
+
+    # Pré-classificador: títulos sem ambiguidade são resolvidos por regras, sem API
+    if preclassificador_ativo() and pendentes:
+        textos_resolvidos = produtos_resolvidos = 0
+        for chave, grupo in list(pendentes.items()):
+            _, _, titulo, descricao, _ = grupo[0]
+            info = classificar(titulo, descricao)
+            if info is None:
+                continue
+            for idx, produto_id, _, _, _ in grupo:
+                resultados[idx] = {**json.loads(json.dumps(info)), 'id_anuncio': produto_id}
+            textos_resolvidos += 1
+            produtos_resolvidos += len(grupo)
+            del pendentes[chave]
+        print(f"   🧩 Pré-classificador: {produtos_resolvidos}/{total_pendentes} produto(s) "
+              f"({produtos_resolvidos / total_pendentes:.0%}) resolvidos por regras, sem API")
+        total_pendentes -= produtos_resolvidos
+    # Anúncios com o mesmo título/descrição são extraídos uma única vez
+    print(f"   🚀 {total_pendentes} produto(s), {len(pendentes)} texto(s) distintos ({concorrencia} em paralelo)")
+
+    def extrair(grupo):
+        _, _, titulo, descricao, _ = grupo[0]
+        inicio_produto = time.time()
+        return extrair_informacoes_com_gpt(titulo, descricao, cache=cache), time.time() - inicio_produto
+
+    # Checkpoint e impressão na thread principal, na ordem em que os produtos terminam
+    for concluidos, (_, grupo, (info, tempo_produto)) in enumerate(
+            executar_em_paralelo(pendentes.values(), extrair, concorrencia), start=1):
+        for idx, produto_id, _, _, assinatura in grupo:
+            info_produto = json.loads(json.dumps(info))
+            if checkpoint is not None and info != RESULTADO_PADRAO:
+                checkpoint.registrar(produto_id, assinatura, info_produto)
+            info_produto['id_anuncio'] = produto_id
+            resultados[idx] = info_produto
+
+        # Exibir resultado
+        _, produto_id, titulo, _, _ = grupo[0]
+        print(f"\n[{concluidos}/{len(pendentes)}] Produto: {produto_id}")
+        print(f"   📝 Título: {titulo[:80]}{'...' if len(titulo) > 80 else ''}")
+        if len(grupo) > 1:
+            print(f"   🔁 Mesmo texto em mais {len(grupo) - 1} anúncio(s)")
+        print(f"   ✅ Extraído em {tempo_produto:.1f}s:")
+        print(f"      - Tipo: {info['tipo_cartucho']}")
+        print(f"      - Cores: {'Preto' if info['cores_detalhadas']['preto'] else ''}{'/' if info['cores_detalhadas']['preto'] and info['cores_detalhadas']['colorido'] else ''}{'Colorido' if info['cores_detalhadas']['colorido'] else ''}")
+        print(f"      - Quantidade: {info['quantidade_por_anuncio']}")
+        print(f"      - Usado: {'Sim' if info['usado_seminovo'] else 'Não'}")
+
+    # Calcular estatísticas
+    tempo_total = time.time() - inicio_total
+    tempo_medio = tempo_total / len(dados) if dados else 0
+
+    print("\n" + "="*80)
+    print("📊 ESTATÍSTICAS DO PROCESSAMENTO")
+    print("="*80)
+    print(f"   Total de produtos: {len(dados)}")
+    print(f"   Tempo total: {tempo_total:.1f}s")
+    print(f"   Tempo médio por produto: {tempo_medio:.1f}s")
+    print(f"   Modelo usado: {MODELO}")
+    if limitador_padrao().total_429:
+        print(f"   Respostas 429 (limite de taxa): {limitador_padrao().total_429}")
+    if cache is not None:
+        estatisticas = cache.estatisticas()
+        print(f"   Cache de respostas: {estatisticas['acertos']} acerto(s), {estatisticas['faltas']} falta(s) "
+              f"({estatisticas['taxa_acerto']:.0%}), {estatisticas['entradas']} entrada(s) em {cache.caminho.name}")
+        if fechar_cache:
+            cache.fechar()
+
+    # Análise dos resultados
+    tipos_encontrados = {}
+    total_preto = sum(1 for r in resultados if r['cores_detalhadas']['preto'])
+    total_colorido = sum(1 for r in resultados if r['cores_detalhadas']['colorido'])
+    total_usado = sum(1 for r in resultados if r['usado_seminovo'])
+
+    for r in resultados:
+        tipo = r['tipo_cartucho']
+        tipos_encontrados[tipo] = tipos_encontrados.get(tipo, 0) + 1
+
+    print(f"\n📈 RESUMO DOS DADOS EXTRAÍDOS:")
+    print("-"*40)
+    print(f"   Produtos com cartucho PRETO: {total_preto}")
+    print(f"   Produtos com cartucho COLORIDO: {total_colorido}")
+    print(f"   Produtos USADOS/SEMINOVOS: {total_usado}")
+    print(f"\n   Tipos de cartucho encontrados:")
+    for tipo, count in sorted(tipos_encontrados.items(), key=lambda x: x[1], reverse=True):
+        print(f"      - {tipo}: {count} produto(s)")
+
+    return pd.DataFrame(resultados)
 
 # =============================================================================
-# 6. PROCESSAR CADA PRODUTO
+# 5. EXECUÇÃO COMO SCRIPT
 # =============================================================================
 
-print(f"\n⚙️ PROCESSANDO PRODUTOS COM {MODELO}...")
-print("-"*80)
+def main():
+    print("="*80)
+    print("🤖 SCRIPT 1: EXTRAIR INFORMAÇÕES COM IA")
+    print("="*80)
 
-resultados = []
-inicio_total = time.time()
+    verificar_dependencias()
 
-for idx, produto in enumerate(dados):
-    inicio_produto = time.time()
-    
-    produto_id = produto.get('id', f'produto_{idx}')
-    titulo = produto.get('titulo', '')
-    descricao = produto.get('descricao', '')
-    
-    print(f"\n[{idx + 1}/{len(dados)}] Produto: {produto_id}")
-    print(f"   📝 Título: {titulo[:80]}{'...' if len(titulo) > 80 else ''}")
-    
-    # Extrair informações com IA
-    info = extrair_informacoes_com_gpt(titulo, descricao)
-    info['id_anuncio'] = produto_id
-    
-    # Calcular tempo
-    tempo_produto = time.time() - inicio_produto
-    
-    # Exibir resultado
-    print(f"   ✅ Extraído em {tempo_produto:.1f}s:")
-    print(f"      - Tipo: {info['tipo_cartucho']}")
-    print(f"      - Cores: {'Preto' if info['cores_detalhadas']['preto'] else ''}{'/' if info['cores_detalhadas']['preto'] and info['cores_detalhadas']['colorido'] else ''}{'Colorido' if info['cores_detalhadas']['colorido'] else ''}")
-    print(f"      - Quantidade: {info['quantidade_por_anuncio']}")
-    print(f"      - Usado: {'Sim' if info['usado_seminovo'] else 'Não'}")
-    
-    resultados.append(info)
-    
-    # Delay para respeitar rate limits
-    time.sleep(0.5)
+    # Detectar arquivo de entrada mais recente
+    arquivos_json = list(SCRIPT_0_DIR.glob("dataset_completo_unificado_*.json"))
+    if not arquivos_json:
+        print(f"   ❌ Nenhum arquivo JSON encontrado em {SCRIPT_0_DIR}")
+        sys.exit(1)
 
-# =============================================================================
-# 7. ESTATÍSTICAS E SALVAMENTO
-# =============================================================================
+    arquivo_entrada = max(arquivos_json, key=lambda x: x.stat().st_mtime)
+    print(f"   📂 Arquivo de entrada: {arquivo_entrada.name}")
+
+    # Configurar pasta de saída
+    SCRIPT_2_IA_DIR = DATA_DIR / "script_2_ia"
+    SCRIPT_2_IA_DIR.mkdir(exist_ok=True)
+
+    # Arquivos de saída
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    arquivo_saida_json = SCRIPT_2_IA_DIR / f"dados_extraidos_ia_{timestamp}.json"
+
+    print(f"\n📂 CARREGANDO DADOS...")
+    print("-"*80)
+
+    # Carregar JSON unificado
+    with open(arquivo_entrada, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+
+    print(f"   ✅ {len(dados)} produtos carregados")
+
+    checkpoint = Checkpoint("script_2_ia")
+    df_resultados = processar(dados, checkpoint=checkpoint)
+
+    # Salvar resultados
+    print(f"\n💾 SALVANDO RESULTADOS...")
+    print("-"*80)
+
+    # Salvar JSON
+    with open(arquivo_saida_json, 'w', encoding='utf-8') as f:
+        json.dump(df_resultados.to_dict('records'), f, indent=2, ensure_ascii=False)
+    print(f"   ✅ JSON salvo em: {arquivo_saida_json.name}")
+
+    # Salvar tabela (entrada do Script 3)
+    arquivo_saida_tabela = salvar_tabela(df_resultados, SCRIPT_2_IA_DIR, f"dados_extraidos_ia_{timestamp}")
+    print(f"   ✅ Tabela salva em: {arquivo_saida_tabela.name}")
+
+    # Saídas gravadas: o checkpoint não é mais necessário
+    checkpoint.concluir()
+
+    print("\n" + "="*80)
+    print("✅ SCRIPT 1 CONCLUÍDO COM SUCESSO!")
+    print("="*80)
 
-# Calcular estatísticas
-tempo_total = time.time() - inicio_total
-tempo_medio = tempo_total / len(dados)
-
-print("\n" + "="*80)
-print("📊 ESTATÍSTICAS DO PROCESSAMENTO")
-print("="*80)
-print(f"   Total de produtos: {len(dados)}")
-print(f"   Tempo total: {tempo_total:.1f}s")
-print(f"   Tempo médio por produto: {tempo_medio:.1f}s")
-print(f"   Modelo usado: {MODELO}")
-
-# Análise dos resultados
-tipos_encontrados = {}
-total_preto = sum(1 for r in resultados if r['cores_detalhadas']['preto'])
-total_colorido = sum(1 for r in resultados if r['cores_detalhadas']['colorido'])
-total_usado = sum(1 for r in resultados if r['usado_seminovo'])
-
-for r in resultados:
-    tipo = r['tipo_cartucho']
-    tipos_encontrados[tipo] = tipos_encontrados.get(tipo, 0) + 1
-
-print(f"\n📈 RESUMO DOS DADOS EXTRAÍDOS:")
-print("-"*40)
-print(f"   Produtos com cartucho PRETO: {total_preto}")
-print(f"   Produtos com cartucho COLORIDO: {total_colorido}")
-print(f"   Produtos USADOS/SEMINOVOS: {total_usado}")
-print(f"\n   Tipos de cartucho encontrados:")
-for tipo, count in sorted(tipos_encontrados.items(), key=lambda x: x[1], reverse=True):
-    print(f"      - {tipo}: {count} produto(s)")
-
-# Salvar resultados
-print(f"\n💾 SALVANDO RESULTADOS...")
-print("-"*80)
-
-# Salvar JSON
-with open(arquivo_saida_json, 'w', encoding='utf-8') as f:
-    json.dump(resultados, f, indent=2, ensure_ascii=False)
-print(f"   ✅ JSON salvo em: {arquivo_saida_json.name}")
-
-# Salvar CSV
-df_resultados = pd.DataFrame(resultados)
-df_resultados.to_csv(arquivo_saida_csv, index=False)
-print(f"   ✅ CSV salvo em: {arquivo_saida_csv.name}")
-
-print("\n" + "="*80)
-print("✅ SCRIPT 1 CONCLUÍDO COM SUCESSO!")
-print("="*80)
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,36 @@ SCRIPT 2: PROCESSAR REVIEWS COM NLP (VERSÃO REVISADA)
 Analisa reviews, título e descrição dos produtos usando técnicas de NLP e gera embeddings.
 
 INPUT:
-- data/script_3_features_basicas/dataset_com_features_basicas_*.csv
+- data/script_3_features_basicas/dataset_com_features_basicas_*.parquet
 - data/reviews_unificado.json
 
 OUTPUT:
-- data/script_4_nlp/reviews_com_nlp_*.csv
+- data/script_4_nlp/reviews_com_nlp_*.parquet
+- data/script_4_nlp/embeddings/ (matrizes .npy por tipo + indice.json; ver _embeddings.py)
+
+Tabelas gravadas em Parquet por padrão (PIPELINE_FORMATO=arrow|csv; ver _armazenamento.py).
+Os embeddings não vão para a tabela: ficam no armazém de embeddings.
+
+Com PIPELINE_EMBEDDINGS_BACKEND=local os embeddings são gerados na CPU, sem API
+Key, de uma vez para todos os textos (ver _embeddings_locais.py); o formato dos
+vetores (1536 dimensões) é o mesmo.
+
+Os textos (título, descrição e reviews de todos os produtos) vão à API em lotes
+paralelos, com vários textos por requisição (ver _motor_embeddings.py). Textos já
+vistos em qualquer execução saem do cache de embeddings (data/cache/embeddings.sqlite;
+ver _cache.py) sem chamar a API.
+
+O VADER e a contagem de palavras-chave rodam em blocos de produtos num pool de
+processos (PIPELINE_PROCESSOS; ver _processos.py e _sentimento.py).
 
 FEATURES GERADAS:
 - sentimento_medio_reviews (VADER)
 - contagem_alegacao_fraude (palavras-chave)
 - contagem_performance_negativa (palavras-chave)
 - possui_reviews_texto (flag)
-- embedding_titulo (OpenAI - 1536 dimensões do título)
-- embedding_descricao (OpenAI - 1536 dimensões da descrição)
-- embedding_reviews (OpenAI - 1536 dimensões das reviews)
+- embedding_titulo (OpenAI - 1536 dimensões do título)       -> embeddings/embedding_titulo.npy
+- embedding_descricao (OpenAI - 1536 dimensões da descrição) -> embeddings/embedding_descricao.npy
+- embedding_reviews (OpenAI - 1536 dimensões das reviews)    -> embeddings/embedding_reviews.npy
 
 MELHORIAS DA VERSÃO:
 - Adaptado para usar o dataset limpo e centralizado, eliminando merges.
@@ -38,245 +54,343 @@ import time
 import sys
 sys.path.append(str(Path(__file__).parent))
 from _config import *
+from _checkpoint import Checkpoint, assinatura_conteudo
+from _armazenamento import ler_tabela, salvar_tabela, tabela_mais_recente
+from _embeddings import PASTA_EMBEDDINGS, ArmazemEmbeddings, backend_configurado, sem_embeddings
+from _motor_embeddings import LOTE_MAX_TEXTOS, LOTE_MAX_TOKENS, gerar_embeddings
+from _cache import CacheEmbeddings, cache_ativo
+from _embeddings_locais import MODELO_LOCAL, vetorizar
+from _processos import mapear_em_processos
+from _sentimento import analisar_bloco, inicializar as inicializar_sentimento
+
+# Colunas do Script 3 usadas aqui (projeção na leitura)
+COLUNAS_ENTRADA = ['id_anuncio', 'titulo', 'descricao']
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-print("="*80)
-print("🧠 SCRIPT 4: PROCESSAR REVIEWS COM NLP (VERSÃO REVISADA)")
-print("="*80)
-
-# =============================================================================
-# 1. VERIFICAR DEPENDÊNCIAS
-# =============================================================================
+# Cliente criado sob demanda para que o módulo possa ser importado sem API Key
+_client = None
 
-print("\n📦 VERIFICANDO DEPENDÊNCIAS...")
-print("-"*80)
-
-# Verificar vaderSentiment
-try:
-    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-    print("   ✅ vaderSentiment instalado")
-except ImportError:
-    print("   ❌ vaderSentiment não encontrado!")
-    print("   Execute: pip install vaderSentiment")
-    sys.exit(1)
-
-# Verificar OpenAI
-try:
-    from openai import OpenAI
-    print("   ✅ openai instalado")
-except ImportError:
-    print("   ❌ openai não encontrado!")
-    print("   Execute: pip install openai")
-    sys.exit(1)
-
-# Verificar API Key
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    print("   ❌ OPENAI_API_KEY não encontrada no .env!")
-    print("   Crie um arquivo .env com: OPENAI_API_KEY=sk-...")
-    sys.exit(1)
-else:
-    print(f"   ✅ API Key OpenAI configurada")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+def obter_cliente():
+    """Retorna o cliente OpenAI (criado na primeira chamada)"""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        # Sem retries internos: 429 e falhas transitórias passam pelo limitador
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _client
 
 # =============================================================================
-# 2. CONFIGURAR ARQUIVOS DE ENTRADA E SAÍDA
-# =============================================================================
-
-# MUDANÇA: Apontar para os novos arquivos de entrada.
-
-# Arquivo com features básicas (inclui título, descrição e features calculadas)
-DATASET_FEATURES_CSV = max(Path("../data/script_3_features_basicas").glob("*.csv"), key=lambda x: x.stat().st_mtime)
-
-# Arquivo JSON unificado com os reviews
-REVIEWS_UNIFICADO_JSON = Path("../data/reviews_unificado.json")
-
-# Arquivo de saída para as features de NLP
-OUTPUT_DIR = Path("../data/script_4_nlp")
-OUTPUT_DIR.mkdir(exist_ok=True)
-REVIEWS_NLP_CSV = OUTPUT_DIR / f"reviews_com_nlp_{time.strftime('%Y%m%d_%H%M%S')}.csv"
-
-# =============================================================================
-# 3. CARREGAR DADOS (MUITO SIMPLIFICADO)
+# 1. VERIFICAR DEPENDÊNCIAS
 # =============================================================================
 
-print("\n📂 CARREGANDO DADOS...")
-print("-"*80)
-
-# MUDANÇA: Carregar o dataset com features básicas que já contém tudo.
-print(f"Carregando: {DATASET_FEATURES_CSV.name}")
-df_produtos = pd.read_csv(DATASET_FEATURES_CSV)
-print(f"   ✅ {len(df_produtos)} produtos carregados com título e descrição")
-
-# MUDANÇA: Carregar o novo JSON de reviews.
-print(f"\nCarregando: {REVIEWS_UNIFICADO_JSON.name}")
-with open(REVIEWS_UNIFICADO_JSON, 'r', encoding='utf-8') as f:
-    reviews_data = json.load(f)
-print(f"   ✅ Reviews de {len(reviews_data)} produtos carregados")
+def verificar_dependencias():
+    """Verifica vaderSentiment, openai e API Key (encerra o script se faltar algo)"""
+    print("\n📦 VERIFICANDO DEPENDÊNCIAS...")
+    print("-"*80)
+
+    # Verificar vaderSentiment
+    try:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        print("   ✅ vaderSentiment instalado")
+    except ImportError:
+        print("   ❌ vaderSentiment não encontrado!")
+        print("   Execute: pip install vaderSentiment")
+        sys.exit(1)
+
+    if backend_configurado() == "local":
+        print("   ✅ Embeddings locais (PIPELINE_EMBEDDINGS_BACKEND=local): openai e API Key dispensados")
+        return
+
+    # Verificar OpenAI
+    try:
+        from openai import OpenAI
+        print("   ✅ openai instalado")
+    except ImportError:
+        print("   ❌ openai não encontrado!")
+        print("   Execute: pip install openai")
+        sys.exit(1)
+
+    # Verificar API Key
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    if not OPENAI_API_KEY:
+        print("   ❌ OPENAI_API_KEY não encontrada no .env!")
+        print("   Crie um arquivo .env com: OPENAI_API_KEY=sk-...")
+        sys.exit(1)
+    else:
+        print(f"   ✅ API Key OpenAI configurada")
 
 # =============================================================================
-# 4. ORGANIZAR REVIEWS POR PRODUTO (Sem alterações na lógica)
+# 2. ORGANIZAR REVIEWS POR PRODUTO
 # =============================================================================
 
-print("\n🔗 ORGANIZANDO REVIEWS POR PRODUTO...")
-print("-"*80)
+def organizar_reviews(reviews_data):
+    """Agrupa os textos de review válidos (> 5 caracteres) por id do produto"""
+    print("\n🔗 ORGANIZANDO REVIEWS POR PRODUTO...")
+    print("-"*80)
 
-reviews_por_produto = {}
-for produto in reviews_data:
-    # ANOTAÇÃO: A chave no JSON é 'product_id', que corresponde a 'id_anuncio' no CSV.
-    produto_id = produto.get('product_id')
-    reviews_list = produto.get('reviews', [])
+    reviews_por_produto = {}
+    for produto in reviews_data:
+        # ANOTAÇÃO: A chave no JSON é 'product_id', que corresponde a 'id_anuncio' no CSV.
+        produto_id = produto.get('product_id')
+        reviews_list = produto.get('reviews', [])
     
-    if produto_id and reviews_list:
-        textos_reviews = [
-            review.get('text', '').strip() 
-            for review in reviews_list 
-            if review.get('text') and len(review.get('text').strip()) > 5
-        ]
-        if textos_reviews:
-            reviews_por_produto[produto_id] = textos_reviews
-
-print(f"   ✅ {len(reviews_por_produto)} produtos com reviews textuais válidos")
-
-# =============================================================================
-# 5. ANÁLISE DE SENTIMENTO E PALAVRAS-CHAVE (VADER)
-# =============================================================================
-
-print("\n😊 ANALISANDO SENTIMENTO (VADER)...")
-print("-"*80)
-
-analyzer = SentimentIntensityAnalyzer()
-resultados_nlp = []
+        if produto_id and reviews_list:
+            textos_reviews = [
+                review.get('text', '').strip() 
+                for review in reviews_list 
+                if review.get('text') and len(review.get('text').strip()) > 5
+            ]
+            if textos_reviews:
+                reviews_por_produto[produto_id] = textos_reviews
+
+    print(f"   ✅ {len(reviews_por_produto)} produtos com reviews textuais válidos")
+    
+    return reviews_por_produto
+
+def abrir_cache():
+    """Cache de embeddings por texto (data/cache/embeddings.sqlite), ou None se desligado"""
+    if not cache_ativo():
+        return None
+    return CacheEmbeddings()
+
+def processar(df_produtos, reviews_data, checkpoint=None, cache=None):
+    """
+    Gera sentimento, contagens de palavras-chave e embeddings de cada produto.
+    Ponto de entrada em memória (usado pelo modo em processo do PipelineExecutor).
+
+    checkpoint: se informado, os embeddings de cada produto são gravados nele e
+    produtos já gravados (mesmos textos e modelo) não são enviados de novo à API.
+    cache: cache de embeddings por texto entre execuções; se None, abre o cache padrão
+
+    Com o backend local, checkpoint e cache não são usados: vetorizar de novo
+    custa menos que gravar e ler os vetores.
+    """
+    reviews_por_produto = organizar_reviews(reviews_data)
+    
+    # =============================================================================
+    # 3. ANÁLISE DE SENTIMENTO E PALAVRAS-CHAVE (VADER)
+    # =============================================================================
+
+    print("\n😊 ANALISANDO SENTIMENTO (VADER)...")
+    print("-"*80)
+
+    # VADER e palavras-chave em blocos de produtos num pool de processos (ver _processos.py)
+    com_reviews = [p for p in dict.fromkeys(df_produtos['id_anuncio']) if reviews_por_produto.get(p)]
+    analises = mapear_em_processos(
+        analisar_bloco,
+        [reviews_por_produto[p] for p in com_reviews],
+        inicializador=inicializar_sentimento,
+        argumentos_inicializador=(PALAVRAS_FRAUDE, PALAVRAS_PERFORMANCE)
+    )
+    analise_por_produto = dict(zip(com_reviews, analises))
+    resultados_nlp = []
 
-# MUDANÇA: Iterar sobre a coluna correta 'id_anuncio'.
-for produto_id in df_produtos['id_anuncio']:
-    reviews = reviews_por_produto.get(produto_id, [])
+    # MUDANÇA: Iterar sobre a coluna correta 'id_anuncio'.
+    for produto_id in df_produtos['id_anuncio']:
+        reviews = reviews_por_produto.get(produto_id, [])
     
-    resultado = {
-        'id_anuncio': produto_id,
-        'possui_reviews_texto': 1 if reviews else 0,
-        'num_reviews_analisadas': len(reviews),
-        'sentimento_medio_reviews': 0,
-        'contagem_alegacao_fraude': 0,
-        'contagem_performance_negativa': 0
-    }
+        resultado = {
+            'id_anuncio': produto_id,
+            'possui_reviews_texto': 1 if reviews else 0,
+            'num_reviews_analisadas': len(reviews),
+            'sentimento_medio_reviews': 0,
+            'contagem_alegacao_fraude': 0,
+            'contagem_performance_negativa': 0
+        }
     
-    if reviews:
-        texto_completo = ' '.join(reviews).lower()
-        sentimentos = [analyzer.polarity_scores(review)['compound'] for review in reviews]
-        resultado['sentimento_medio_reviews'] = np.mean(sentimentos)
-        resultado['contagem_alegacao_fraude'] = sum(texto_completo.count(p) for p in PALAVRAS_FRAUDE)
-        resultado['contagem_performance_negativa'] = sum(texto_completo.count(p) for p in PALAVRAS_PERFORMANCE)
+        if reviews:
+            (resultado['sentimento_medio_reviews'],
+             resultado['contagem_alegacao_fraude'],
+             resultado['contagem_performance_negativa']) = analise_por_produto[produto_id]
     
-    resultados_nlp.append(resultado)
-
-print(f"   ✅ Sentimento calculado para {len(resultados_nlp)} produtos")
+        resultados_nlp.append(resultado)
+
+    print(f"   ✅ Sentimento calculado para {len(resultados_nlp)} produtos")
+
+    # =============================================================================
+    # 4. GERAR EMBEDDINGS (OpenAI ou local)
+    # =============================================================================
+
+    local = backend_configurado() == "local"
+    modelo = MODELO_LOCAL if local else OPENAI_MODEL_EMBEDDING
+    if local:
+        checkpoint = None
+
+    origem = f"MODELO LOCAL ({MODELO_LOCAL})" if local else "OpenAI"
+    print(f"\n🤖 GERANDO EMBEDDINGS SEPARADOS COM {origem}...")
+    print("-"*80)
+
+    # Textos de cada produto (campo sem texto fica None, como antes)
+    textos = []          # (produto_id, coluna, texto) enviados à API
+    embeddings_por_produto = {}
+    assinaturas = {}
+    faltam = {}          # produto_id -> campos ainda sem embedding
+    com_erro = set()
+    reaproveitados = 0
+    if checkpoint is not None and len(checkpoint):
+        print(f"   ♻️ Retomando: {len(checkpoint)} produto(s) com embeddings já gravados no checkpoint")
+
+    for row in df_produtos[['id_anuncio', 'titulo', 'descricao']].itertuples(index=False):
+        produto_id = row.id_anuncio
+        if produto_id in embeddings_por_produto:
+            continue  # duplicata: vale a primeira ocorrência
+        reviews = reviews_por_produto.get(produto_id, [])
+
+        # Reaproveitar do checkpoint se os textos e o modelo são os mesmos
+        assinatura = assinatura_conteudo(row.titulo, row.descricao, reviews, modelo)
+        gravado = checkpoint.obter(produto_id, assinatura) if checkpoint is not None else None
+        if gravado is not None:
+            embeddings_por_produto[produto_id] = gravado
+            reaproveitados += 1
+            continue
+
+        embeddings_por_produto[produto_id] = {
+            'embedding_titulo': None,
+            'embedding_descricao': None,
+            'embedding_reviews': None
+        }
+        assinaturas[produto_id] = assinatura
+        campos = []
+        if pd.notna(row.titulo) and row.titulo.strip():
+            campos.append(('embedding_titulo', row.titulo.strip()[:8000]))
+        if pd.notna(row.descricao) and row.descricao.strip():
+            campos.append(('embedding_descricao', row.descricao.strip()[:8000]))
+        if reviews:
+            campos.append(('embedding_reviews', ' '.join(reviews)[:8000]))
+        faltam[produto_id] = len(campos)
+        textos.extend((produto_id, coluna, texto) for coluna, texto in campos)
+
+    def produto_concluido(produto_id):
+        # Vetores zerados por erro não entram no checkpoint (são refeitos na retomada)
+        if checkpoint is not None and produto_id not in com_erro:
+            checkpoint.registrar(produto_id, assinaturas[produto_id], embeddings_por_produto[produto_id])
+
+    for produto_id in [p for p, n in faltam.items() if n == 0]:
+        produto_concluido(produto_id)
+
+    if local:
+        # Um único "lote" com todos os textos, vetorizados de uma vez
+        print(f"   🖥️ {len(textos)} texto(s) de {len(faltam)} produto(s) vetorizados localmente")
+        lotes = [(list(range(len(textos))), vetorizar([t for _, _, t in textos]), None)]
+        fechar_cache, cache = False, None
+    else:
+        print(f"   🚀 {len(textos)} texto(s) de {len(faltam)} produto(s) em lotes "
+              f"(até {LOTE_MAX_TEXTOS} textos / {LOTE_MAX_TOKENS} tokens por requisição)")
+
+        fechar_cache = cache is None
+        if cache is None:
+            cache = abrir_cache()
+        lotes = gerar_embeddings([t for _, _, t in textos], obter_cliente, modelo, cache=cache)
+
+    # Lotes paralelos; checkpoint na thread principal quando todos os campos do produto chegam
+    lotes_concluidos = 0
+    for posicoes, vetores, erro in lotes:
+        lotes_concluidos += 1
+        if erro is not None:
+            print(f"      ⚠️ Erro no lote {lotes_concluidos} ({len(posicoes)} textos): {erro}")
+        for i, posicao in enumerate(posicoes):
+            produto_id, coluna, _ = textos[posicao]
+            if erro is not None:
+                embeddings_por_produto[produto_id][coluna] = [0.0] * 1536
+                com_erro.add(produto_id)
+            else:
+                embeddings_por_produto[produto_id][coluna] = vetores[i]
+            faltam[produto_id] -= 1
+            if faltam[produto_id] == 0:
+                produto_concluido(produto_id)
+        print(f"      ✅ Lote {lotes_concluidos}: {len(posicoes)} textos")
+
+    if reaproveitados:
+        print(f"   ♻️ {reaproveitados} produto(s) reaproveitados do checkpoint")
+    if cache is not None:
+        estatisticas = cache.estatisticas()
+        print(f"   💾 Cache de embeddings: {estatisticas['acertos']}/{estatisticas['acertos'] + estatisticas['faltas']} "
+              f"texto(s) distintos reaproveitados ({estatisticas['taxa_acerto']:.0%}), "
+              f"{estatisticas['entradas']} vetor(es) / {estatisticas['tamanho_mb']:.1f} MB"
+              + (f", {estatisticas['descartados']} descartado(s) por tamanho" if estatisticas['descartados'] else ""))
+        if fechar_cache:
+            cache.fechar()
+    embeddings_lista = [{'id_anuncio': produto_id, **embeddings} for produto_id, embeddings in embeddings_por_produto.items()]
+
+    print(f"\n   ✅ Embeddings separados gerados para {len(embeddings_lista)} produtos")
+
+    # =============================================================================
+    # 5. MERGE FINAL
+    # =============================================================================
+
+    print(f"\n🔗 FAZENDO MERGE FINAL E SALVANDO...")
+    print("-"*80)
+
+    df_nlp = pd.DataFrame(resultados_nlp)
+
+    # Criar DataFrame com embeddings separados (listas; o main() grava no armazém de embeddings)
+    df_embeddings = pd.DataFrame(embeddings_lista)
+
+    # MUDANÇA: Fazer o merge usando 'id_anuncio'.
+    df_nlp_completo = pd.merge(df_nlp, df_embeddings, on='id_anuncio', how='left')
+
+    # Remover duplicatas por id_anuncio (manter primeira ocorrência)
+    duplicatas_antes = df_nlp_completo.duplicated(subset=['id_anuncio']).sum()
+    if duplicatas_antes > 0:
+        print(f"   🚨 Removendo {duplicatas_antes} duplicatas por id_anuncio")
+        df_nlp_completo = df_nlp_completo.drop_duplicates(subset=['id_anuncio'], keep='first').copy()
+    
+    return df_nlp_completo
 
 # =============================================================================
-# 6. GERAR EMBEDDINGS (OpenAI)
+# 6. EXECUÇÃO COMO SCRIPT
 # =============================================================================
 
-print(f"\n🤖 GERANDO EMBEDDINGS SEPARADOS COM OpenAI...")
-print("-"*80)
+def main():
+    print("="*80)
+    print("🧠 SCRIPT 4: PROCESSAR REVIEWS COM NLP (VERSÃO REVISADA)")
+    print("="*80)
 
-embeddings_lista = []
+    verificar_dependencias()
 
-# MUDANÇA: Iterar sobre o novo DataFrame e gerar embeddings separados
-for index, row in df_produtos.iterrows():
-    produto_id = row['id_anuncio']
-    reviews = reviews_por_produto.get(produto_id, [])
-    
-    # Inicializar embeddings
-    embedding_titulo = None
-    embedding_descricao = None
-    embedding_reviews = None
-    
-    # 1. Embedding do TÍTULO
-    if pd.notna(row.get('titulo')) and row['titulo'].strip():
-        try:
-            response = client.embeddings.create(
-                model=OPENAI_MODEL_EMBEDDING, 
-                input=row['titulo'].strip()[:8000]
-            )
-            embedding_titulo = response.data[0].embedding
-        except Exception as e:
-            print(f"      ⚠️ Erro no título {produto_id}: {e}")
-            embedding_titulo = [0.0] * 1536
-    
-    # 2. Embedding da DESCRIÇÃO
-    if pd.notna(row.get('descricao')) and row['descricao'].strip():
-        try:
-            descricao = row['descricao'].strip()[:8000]
-            response = client.embeddings.create(
-                model=OPENAI_MODEL_EMBEDDING, 
-                input=descricao
-            )
-            embedding_descricao = response.data[0].embedding
-        except Exception as e:
-            print(f"      ⚠️ Erro na descrição {produto_id}: {e}")
-            embedding_descricao = [0.0] * 1536
-    
-    # 3. Embedding das REVIEWS
-    if reviews:
-        try:
-            reviews_texto = ' '.join(reviews)[:8000]
-            response = client.embeddings.create(
-                model=OPENAI_MODEL_EMBEDDING, 
-                input=reviews_texto
-            )
-            embedding_reviews = response.data[0].embedding
-        except Exception as e:
-            print(f"      ⚠️ Erro nas reviews {produto_id}: {e}")
-            embedding_reviews = [0.0] * 1536
-    
-    # Adicionar à lista (usar None se não houver texto)
-    embeddings_lista.append({
-        'id_anuncio': produto_id,
-        'embedding_titulo': embedding_titulo,
-        'embedding_descricao': embedding_descricao,
-        'embedding_reviews': embedding_reviews
-    })
+    # Arquivo com features básicas (inclui título, descrição e features calculadas)
+    DATASET_FEATURES = tabela_mais_recente(SCRIPT_3_DIR, "dataset_com_features_basicas_")
 
-    if (index + 1) % 50 == 0:
-        print(f"      ✅ {index + 1}/{len(df_produtos)} produtos processados para embeddings...")
+    # Arquivo JSON unificado com os reviews
+    REVIEWS_UNIFICADO_JSON = DATA_DIR / "reviews_unificado.json"
 
-print(f"\n   ✅ Embeddings separados gerados para {len(embeddings_lista)} produtos")
+    # Arquivo de saída para as features de NLP
+    SCRIPT_4_DIR.mkdir(exist_ok=True)
+    NOME_SAIDA = f"reviews_com_nlp_{time.strftime('%Y%m%d_%H%M%S')}"
 
-# =============================================================================
-# 7. MERGE FINAL E SALVAR
-# =============================================================================
+    print("\n📂 CARREGANDO DADOS...")
+    print("-"*80)
 
-print(f"\n🔗 FAZENDO MERGE FINAL E SALVANDO...")
-print("-"*80)
+    print(f"Carregando: {DATASET_FEATURES.name}")
+    df_produtos = ler_tabela(DATASET_FEATURES, colunas=COLUNAS_ENTRADA)
+    print(f"   ✅ {len(df_produtos)} produtos carregados com título e descrição")
 
-df_nlp = pd.DataFrame(resultados_nlp)
+    print(f"\nCarregando: {REVIEWS_UNIFICADO_JSON.name}")
+    with open(REVIEWS_UNIFICADO_JSON, 'r', encoding='utf-8') as f:
+        reviews_data = json.load(f)
+    print(f"   ✅ Reviews de {len(reviews_data)} produtos carregados")
 
-# Criar DataFrame com embeddings separados
-df_embeddings = pd.DataFrame(embeddings_lista)
-
-# Converter embeddings de lista para string JSON para salvar no CSV
-for col in ['embedding_titulo', 'embedding_descricao', 'embedding_reviews']:
-    df_embeddings[col] = df_embeddings[col].apply(
-        lambda x: json.dumps(x) if x is not None else None
-    )
+    checkpoint = Checkpoint("script_4_nlp")
+    df_nlp_completo = processar(df_produtos, reviews_data, checkpoint=checkpoint)
 
-# MUDANÇA: Fazer o merge usando 'id_anuncio'.
-df_nlp_completo = pd.merge(df_nlp, df_embeddings, on='id_anuncio', how='left')
+    # Embeddings em matrizes binárias; a tabela leva só as features escalares
+    armazem = ArmazemEmbeddings.de_dataframe(df_nlp_completo)
+    armazem.salvar(SCRIPT_4_DIR / PASTA_EMBEDDINGS)
+    for tipo in armazem.tipos():
+        print(f"   ✅ {tipo}: {armazem.matriz(tipo).shape[0]} vetores em embeddings/{tipo}.npy")
 
-# Remover duplicatas por id_anuncio (manter primeira ocorrência)
-duplicatas_antes = df_nlp_completo.duplicated(subset=['id_anuncio']).sum()
-if duplicatas_antes > 0:
-    print(f"   🚨 Removendo {duplicatas_antes} duplicatas por id_anuncio")
-    df_nlp_completo = df_nlp_completo.drop_duplicates(subset=['id_anuncio'], keep='first').copy()
+    arquivo_saida = salvar_tabela(sem_embeddings(df_nlp_completo), SCRIPT_4_DIR, NOME_SAIDA)
+    print(f"   ✅ Arquivo final salvo em: {arquivo_saida.name}")
 
-df_nlp_completo.to_csv(REVIEWS_NLP_CSV, index=False)
-print(f"   ✅ Arquivo final salvo em: {REVIEWS_NLP_CSV.name}")
-print(f"   📊 Shape final: {df_nlp_completo.shape}")
+    # Saída gravada: o checkpoint não é mais necessário
+    checkpoint.concluir()
+    print(f"   📊 Shape final: {df_nlp_completo.shape}")
 
-print("\n" + "="*80)
-print("✅ SCRIPT 2 CONCLUÍDO COM SUCESSO!")
-print("="*80)
+    print("\n" + "="*80)
+    print("✅ SCRIPT 2 CONCLUÍDO COM SUCESSO!")
+    print("="*80)
 
+if __name__ == "__main__":
+    main()
@@ -6,22 +6,39 @@ Baixa imagens dos produtos e calcula pHash (perceptual hash) para detectar
 imagens duplicadas/reutilizadas.
 
 INPUT:
-- data/script_3_features_basicas/dataset_com_features_basicas_*.csv (coluna: imagem_url_principal)
+- data/script_3_features_basicas/dataset_com_features_basicas_*.parquet (coluna: imagem_url_principal)
 
 OUTPUT:
 - data/script_5_imagens/imagens_baixadas/ (pasta com imagens baixadas)
-- data/script_5_imagens/hashes_imagens.csv (id_anuncio, phash, contagem_reuso_imagem)
+- data/script_5_imagens/hashes_imagens.parquet (id_anuncio, phash, grupo_imagem, contagem_reuso_imagem)
+
+Tabelas gravadas em Parquet por padrão (PIPELINE_FORMATO=arrow|csv; ver _armazenamento.py).
+
+Downloads em paralelo numa sessão HTTP compartilhada (keep-alive), com limite de
+requisições por host e novas tentativas com backoff (ver _download.py).
+
+Download e pHash numa única passada: os bytes das imagens vão direto da
+memória, em lotes, para um pool de processos que calcula o pHash (_phash.py:
+JPEG decodificado em resolução reduzida e DCT do lote numa multiplicação de
+matrizes); o arquivo é gravado uma vez e não é reaberto. Só os anúncios do dataset atual entram na
+tabela de hashes (arquivos de execuções antigas na pasta são ignorados).
+
+O pHash de cada URL e de cada conteúdo (sha256) fica num índice persistente
+(data/cache/phash.sqlite; ver _indice_phash.py): URLs já indexadas não são
+baixadas de novo e só imagens novas têm o pHash calculado.
+
+Reuso por quase-duplicatas: imagens com pHash a até PIPELINE_PHASH_DISTANCIA
+bits (padrão 4) formam um grupo (grupo_imagem, usado na camada de imagens do
+Script 7) e contagem_reuso_imagem conta os anúncios a até essa distância
+(índice de Hamming em _hamming.py; 0 = só hashes idênticos).
 """
 
 import pandas as pd
 import numpy as np
-import requests
 import os
-from PIL import Image
-import imagehash
 from pathlib import Path
 from tqdm import tqdm
-import time
+from concurrent.futures import as_completed
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -29,107 +46,50 @@ warnings.filterwarnings('ignore')
 import sys
 sys.path.append(str(Path(__file__).parent))
 from _config import *
+from _checkpoint import Checkpoint, assinatura_conteudo
+from _armazenamento import ler_tabela, salvar_tabela, tabela_mais_recente
+from _download import CONCORRENCIA_IMAGENS, RPS_POR_HOST, ContadorVazao, baixar_bytes
+from _limitador import executar_em_paralelo
+from _phash import LOTE_PHASH, PHASH_ERRO, VERSAO_PHASH, analisar_imagem, analisar_lote, digest_conteudo, phash_de_bytes
+from _indice_phash import IndicePhash, indice_ativo
+from _cache import CACHE_DIR
+from _processos import criar_pool
+from _hamming import DISTANCIA_PADRAO as DISTANCIA_PHASH, grupos_e_reuso
+
+# Pasta onde as imagens baixadas ficam salvas (uma por anúncio)
+IMAGENS_DIR = SCRIPT_5_DIR / "imagens_baixadas"
 
-print("="*80)
-print("🖼️ SCRIPT 5: BAIXAR E PROCESSAR IMAGENS")
-print("="*80)
+# Download em andamento: só vira <id>.<ext> depois de completo, para que uma queda
+# no meio não deixe um arquivo truncado que seria tratado como 'ja_existia'
+SUFIXO_PARCIAL = ".parcial"
 
 # =============================================================================
 # 1. VERIFICAR DEPENDÊNCIAS
 # =============================================================================
 
-print("\n📦 VERIFICANDO DEPENDÊNCIAS...")
-print("-"*80)
-
-try:
-    from PIL import Image
-    print("   ✅ Pillow instalado")
-except ImportError:
-    print("   ❌ Pillow não encontrado!")
-    print("   Execute: pip install Pillow")
-    sys.exit(1)
-
-try:
-    import imagehash
-    print("   ✅ imagehash instalado")
-except ImportError:
-    print("   ❌ imagehash não encontrado!")
-    print("   Execute: pip install imagehash")
-    sys.exit(1)
-
-try:
-    import requests
-    print("   ✅ requests instalado")
-except ImportError:
-    print("   ❌ requests não encontrado!")
-    print("   Execute: pip install requests")
-    sys.exit(1)
-
-# =============================================================================
-# 2. CARREGAR DADOS
-# =============================================================================
-
-print("\n📂 CARREGANDO DADOS...")
-print("-"*80)
-
-# Usar o arquivo mais recente do Script 3
-DATASET_FEATURES_BASICAS = max(SCRIPT_3_DIR.glob("*.csv"), key=lambda x: x.stat().st_mtime)
-print(f"Carregando: {DATASET_FEATURES_BASICAS.name}")
-df = pd.read_csv(DATASET_FEATURES_BASICAS)
-print(f"   ✅ {len(df)} produtos carregados")
-
-# Verificar se tem coluna de URL de imagem
-if 'imagem_url_principal' not in df.columns:
-    print("   ❌ Coluna 'imagem_url_principal' não encontrada!")
-    sys.exit(1)
-
-produtos_com_url = df['imagem_url_principal'].notna().sum()
-print(f"   ✅ {produtos_com_url} produtos com URL de imagem")
-
-# =============================================================================
-# 3. CRIAR PASTA DE IMAGENS
-# =============================================================================
-
-print(f"\n📁 CRIANDO PASTA DE IMAGENS...")
-print("-"*80)
+def verificar_dependencias():
+    """Verifica Pillow e requests (encerra o script se faltar algo)"""
+    print("\n📦 VERIFICANDO DEPENDÊNCIAS...")
+    print("-"*80)
 
-# Usar SCRIPT_5_DIR para manter consistência com a nova estrutura
-SCRIPT_5_DIR.mkdir(parents=True, exist_ok=True)
-IMAGENS_DIR = SCRIPT_5_DIR / "imagens_baixadas"
-IMAGENS_DIR.mkdir(parents=True, exist_ok=True)
-print(f"   ✅ Pasta criada: {IMAGENS_DIR}")
-
-# =============================================================================
-# 4. BAIXAR IMAGENS
-# =============================================================================
+    try:
+        from PIL import Image
+        print("   ✅ Pillow instalado")
+    except ImportError:
+        print("   ❌ Pillow não encontrado!")
+        print("   Execute: pip install Pillow")
+        sys.exit(1)
 
-print(f"\n⬇️ BAIXANDO IMAGENS...")
-print("-"*80)
-print(f"   ⏳ Isso pode levar alguns minutos...")
-print(f"   Timeout: {IMAGE_DOWNLOAD_TIMEOUT}s por imagem")
-
-# Contadores
-sucessos = 0
-erros = 0
-ja_existiam = 0
-sem_url = 0
-
-# Headers para simular navegador
-headers = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-}
-
-# Baixar cada imagem
-for index, row in tqdm(df.iterrows(), total=len(df), desc="Baixando"):
-    id_produto = row['id_anuncio']
-    url = row['imagem_url_principal']
-    
-    # Pular se não tem URL
-    if pd.isna(url) or not url:
-        sem_url += 1
-        continue
-    
-    # Nome do arquivo (extensão baseada na URL ou .jpg padrão)
+    try:
+        import requests
+        print("   ✅ requests instalado")
+    except ImportError:
+        print("   ❌ requests não encontrado!")
+        print("   Execute: pip install requests")
+        sys.exit(1)
+
+def caminho_imagem(id_produto, url):
+    """Arquivo da imagem do anúncio em IMAGENS_DIR (extensão pela URL, .jpg por padrão)"""
     try:
         ext = '.jpg'  # Mercado Livre geralmente usa .jpg ou .webp
         if 'webp' in url.lower():
@@ -138,177 +98,380 @@ for index, row in tqdm(df.iterrows(), total=len(df), desc="Baixando"):
             ext = '.png'
     except:
         ext = '.jpg'
-    
-    nome_arquivo = f"{id_produto}{ext}"
-    caminho_arquivo = IMAGENS_DIR / nome_arquivo
-    
-    # Pular se já existe
-    if caminho_arquivo.exists():
-        ja_existiam += 1
-        continue
-    
-    # Baixar
-    try:
-        response = requests.get(
-            url,
-            stream=True,
-            timeout=IMAGE_DOWNLOAD_TIMEOUT,
-            headers=headers
-        )
-        response.raise_for_status()
-        
-        # Salvar
-        with open(caminho_arquivo, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        sucessos += 1
-        
-        # Delay para não sobrecarregar servidor
-        time.sleep(0.5)
-        
-    except Exception as e:
-        # print(f"   ⚠️ Erro em {id_produto}: {e}")
-        erros += 1
+    return IMAGENS_DIR / f"{id_produto}{ext}"
 
-print(f"\n   📊 RELATÓRIO DE DOWNLOAD:")
-print(f"      ✅ Baixadas com sucesso: {sucessos}")
-print(f"      ⏩ Já existiam (puladas): {ja_existiam}")
-print(f"      ❌ Sem URL: {sem_url}")
-print(f"      ⚠️ Erros de download: {erros}")
+def obter_imagem(id_produto, url, contador=None, ler_existente=True):
+    """
+    Bytes da imagem de um anúncio: do disco se já foi baixada, senão do CDN
+    (gravada uma vez em IMAGENS_DIR). Pode ser chamada por várias threads ao
+    mesmo tempo, desde que com ids distintos.
 
-# =============================================================================
-# 5. CALCULAR pHASH
-# =============================================================================
-
-print(f"\n🔢 CALCULANDO pHASH DAS IMAGENS...")
-print("-"*80)
-
-dados_hashes = []
-hash_calculados = 0
-hash_erros = 0
-
-# Listar arquivos de imagem
-arquivos_imagem = list(IMAGENS_DIR.glob('*'))
-print(f"   Total de arquivos encontrados: {len(arquivos_imagem)}")
-
-for arquivo in tqdm(arquivos_imagem, desc="Calculando pHash"):
-    if arquivo.is_file():
-        # Extrair ID do produto do nome do arquivo
-        id_produto = arquivo.stem
-        
-        try:
-            # Calcular pHash
-            img = Image.open(arquivo)
-            phash = str(imagehash.phash(img))
-            
-            dados_hashes.append({
-                'id_anuncio': id_produto,
-                'nome_arquivo': arquivo.name,
-                'phash': phash
-            })
-            hash_calculados += 1
-            
-        except Exception as e:
-            # print(f"   ⚠️ Erro ao calcular hash de {arquivo.name}: {e}")
-            dados_hashes.append({
-                'id_anuncio': id_produto,
-                'nome_arquivo': arquivo.name,
-                'phash': 'ERRO'
-            })
-            hash_erros += 1
-
-print(f"\n   📊 RELATÓRIO DE pHASH:")
-print(f"      ✅ Hashes calculados: {hash_calculados}")
-print(f"      ⚠️ Erros: {hash_erros}")
-
-# =============================================================================
-# 6. CONTAR REUSO DE IMAGENS
-# =============================================================================
-
-print(f"\n🔍 DETECTANDO IMAGENS REUTILIZADAS...")
-print("-"*80)
-
-df_hashes = pd.DataFrame(dados_hashes)
-
-# Contar quantos produtos usam cada hash
-hash_counts = df_hashes[df_hashes['phash'] != 'ERRO']['phash'].value_counts()
-
-# Adicionar contagem de reuso
-df_hashes['contagem_reuso_imagem'] = df_hashes['phash'].map(hash_counts).fillna(0).astype(int)
-
-# Para hashes com erro, usar 0
-df_hashes.loc[df_hashes['phash'] == 'ERRO', 'contagem_reuso_imagem'] = 0
-
-# Estatísticas
-imagens_unicas = len(hash_counts)
-imagens_reutilizadas = (hash_counts > 1).sum()
-max_reuso = hash_counts.max() if len(hash_counts) > 0 else 0
-
-print(f"   ✅ Imagens únicas: {imagens_unicas}")
-print(f"   ⚠️ Imagens reutilizadas (>1 produto): {imagens_reutilizadas}")
-print(f"   📊 Máximo de reuso: {max_reuso}x")
-
-if imagens_reutilizadas > 0:
-    print(f"\n   🔝 TOP 5 IMAGENS MAIS REUTILIZADAS:")
-    for i, (phash_val, count) in enumerate(hash_counts.head(5).items(), 1):
-        # Pegar IDs dos produtos que usam este hash
-        produtos = df_hashes[df_hashes['phash'] == phash_val]['id_anuncio'].tolist()
-        print(f"      {i}. Hash: {phash_val[:16]}... | Usado {count}x")
-        print(f"         Produtos: {', '.join(map(str, produtos[:3]))}{'...' if len(produtos) > 3 else ''}")
-
-# =============================================================================
-# 7. SALVAR RESULTADO
-# =============================================================================
+    contador: ContadorVazao opcional, atualizado com os bytes de cada download concluído
 
-print(f"\n💾 SALVANDO RESULTADO...")
-print("-"*80)
-
-# Salvar CSV de hashes na pasta do Script 5
-HASHES_IMAGENS_CSV = SCRIPT_5_DIR / "hashes_imagens.csv"
-df_hashes.to_csv(HASHES_IMAGENS_CSV, index=False)
-print(f"   ✅ Salvo em: {HASHES_IMAGENS_CSV}")
-print(f"   📊 Shape: {df_hashes.shape}")
-
-# =============================================================================
-# 8. RESUMO FINAL
-# =============================================================================
-
-print("\n" + "="*80)
-print("📈 RESUMO DO PROCESSAMENTO DE IMAGENS")
-print("="*80)
-
-print(f"\n✅ DOWNLOAD:")
-print(f"   Baixadas: {sucessos}")
-print(f"   Já existiam: {ja_existiam}")
-print(f"   Erros: {erros}")
-print(f"   Sem URL: {sem_url}")
+    Returns:
+        (status, caminho, dados) com status em 'sucesso', 'ja_existia', 'sem_url' ou 'erro';
+        dados é None sem imagem (ou com ler_existente=False para arquivo já existente)
+    """
+    # Pular se não tem URL
+    if pd.isna(url) or not url:
+        return 'sem_url', None, None
 
-print(f"\n✅ pHASH:")
-print(f"   Calculados: {hash_calculados}")
-print(f"   Erros: {hash_erros}")
+    caminho_arquivo = caminho_imagem(id_produto, url)
 
-print(f"\n✅ ANÁLISE DE REUSO:")
-print(f"   Imagens únicas: {imagens_unicas}")
-print(f"   Imagens reutilizadas: {imagens_reutilizadas}")
-print(f"   Máximo de reuso: {max_reuso}x")
+    # Pular o download se já existe
+    if caminho_arquivo.exists():
+        return 'ja_existia', caminho_arquivo, caminho_arquivo.read_bytes() if ler_existente else None
 
-print(f"\n📊 DISTRIBUIÇÃO DE REUSO:")
-reuso_0 = (df_hashes['contagem_reuso_imagem'] == 0).sum()
-reuso_1 = (df_hashes['contagem_reuso_imagem'] == 1).sum()
-reuso_2_5 = ((df_hashes['contagem_reuso_imagem'] >= 2) & (df_hashes['contagem_reuso_imagem'] <= 5)).sum()
-reuso_6_10 = ((df_hashes['contagem_reuso_imagem'] >= 6) & (df_hashes['contagem_reuso_imagem'] <= 10)).sum()
-reuso_10_plus = (df_hashes['contagem_reuso_imagem'] > 10).sum()
+    # Baixar (429/5xx e falhas de conexão são repetidos pela sessão)
+    try:
+        dados = baixar_bytes(url, IMAGE_DOWNLOAD_TIMEOUT, contador)
 
-print(f"   Sem hash (erro): {reuso_0}")
-print(f"   Única (1x): {reuso_1}")
-print(f"   Baixo reuso (2-5x): {reuso_2_5}")
-print(f"   Médio reuso (6-10x): {reuso_6_10}")
-print(f"   Alto reuso (>10x): {reuso_10_plus} ⚠️")
+        # Salvar (arquivo parcial renomeado ao final)
+        caminho_parcial = caminho_arquivo.with_name(caminho_arquivo.name + SUFIXO_PARCIAL)
+        with open(caminho_parcial, 'wb') as f:
+            f.write(dados)
+        os.replace(caminho_parcial, caminho_arquivo)
 
-print("\n" + "="*80)
-print("✅ SCRIPT 3 CONCLUÍDO COM SUCESSO!")
-print("="*80)
-print(f"\n📁 Próximo passo: python 4_criar_target_merge.py")
+        return 'sucesso', caminho_arquivo, dados
 
+    except Exception as e:
+        # print(f"   ⚠️ Erro em {id_produto}: {e}")
+        return 'erro', None, None
+
+def baixar_imagem(id_produto, url, contador=None):
+    """
+    Baixa a imagem de um anúncio para IMAGENS_DIR.
+
+    Returns:
+        (status, caminho) com status em 'sucesso', 'ja_existia', 'sem_url' ou 'erro'
+    """
+    status, caminho, _ = obter_imagem(id_produto, url, contador, ler_existente=False)
+    return status, caminho
+
+def abrir_indice():
+    """Índice persistente de pHash (data/cache/phash.sqlite), ou None se desligado"""
+    if not indice_ativo():
+        return None
+    return IndicePhash(CACHE_DIR / "phash.sqlite", versao=VERSAO_PHASH)
+
+def assinatura_arquivo(caminho):
+    """Tamanho, data de modificação e receita do pHash: identificam o arquivo no checkpoint"""
+    estado = caminho.stat()
+    return assinatura_conteudo(estado.st_size, estado.st_mtime_ns, VERSAO_PHASH)
+
+def calcular_phash(arquivo):
+    """pHash da imagem como string hexadecimal ('ERRO' se não for possível abrir)"""
+    try:
+        return phash_de_bytes(Path(arquivo).read_bytes())
+    except OSError:
+        return PHASH_ERRO
+
+def processar(df, checkpoint=None, indice=None):
+    """
+    Baixa as imagens dos anúncios, calcula o pHash e conta o reuso de cada imagem.
+    Ponto de entrada em memória (usado pelo modo em processo do PipelineExecutor).
+
+    checkpoint: se informado, o pHash de cada arquivo é gravado nele e arquivos já
+    gravados (mesmo tamanho e data de modificação) não são reabertos. Os downloads
+    já retomam sozinhos: imagens completas em disco não são baixadas de novo.
+
+    Download e pHash numa passada: cada imagem baixada (ou lida do disco) vai da
+    memória para o pool de processos do pHash enquanto as outras ainda baixam.
+
+    indice: IndicePhash entre execuções; se None, abre o índice padrão. URLs
+    indexadas não são baixadas e conteúdos já vistos não são rehashados.
+    """
+    produtos_com_url = df['imagem_url_principal'].notna().sum()
+    print(f"   ✅ {produtos_com_url} produtos com URL de imagem")
+
+    # =============================================================================
+    # 3. CRIAR PASTA DE IMAGENS
+    # =============================================================================
+
+    print(f"\n📁 CRIANDO PASTA DE IMAGENS...")
+    print("-"*80)
+
+    # Usar SCRIPT_5_DIR para manter consistência com a nova estrutura
+    IMAGENS_DIR.mkdir(parents=True, exist_ok=True)
+    print(f"   ✅ Pasta criada: {IMAGENS_DIR}")
+
+    # =============================================================================
+    # 4. BAIXAR IMAGENS E CALCULAR pHASH
+    # =============================================================================
+
+    print(f"\n⬇️ BAIXANDO IMAGENS E CALCULANDO pHASH...")
+    print("-"*80)
+    print(f"   ⏳ Isso pode levar alguns minutos...")
+    print(f"   Timeout: {IMAGE_DOWNLOAD_TIMEOUT}s por imagem | "
+          f"{CONCORRENCIA_IMAGENS} downloads simultâneos | até {RPS_POR_HOST:g} req/s por host")
+
+    # Contadores
+    sucessos = 0
+    erros = 0
+    ja_existiam = 0
+    sem_url = 0
+    hashes_reaproveitados = 0
+
+    # Um download por id (como antes, a repetição de um id conta como 'ja_existia';
+    # duas threads nunca escrevem o mesmo arquivo)
+    tarefas = {}
+    for id_produto, url in df[['id_anuncio', 'imagem_url_principal']].itertuples(index=False):
+        if id_produto in tarefas:
+            if pd.isna(url) or not url:
+                sem_url += 1
+            else:
+                ja_existiam += 1
+        else:
+            tarefas[id_produto] = url
+
+    fechar_indice = indice is None
+    if indice is None:
+        indice = abrir_indice()
+
+    # URLs já indexadas não são baixadas; arquivos já em disco com pHash no checkpoint nem são abertos
+    hashes = {}  # id_produto -> (nome_arquivo, phash)
+    do_indice = 0
+    por_url = {}
+    if indice is not None:
+        por_url = indice.por_urls(url for url in tarefas.values() if isinstance(url, str))
+    pendentes = []
+    for id_produto, url in tarefas.items():
+        if url in por_url:
+            hashes[id_produto] = (caminho_imagem(id_produto, url).name, por_url[url])
+            do_indice += 1
+            continue
+        if checkpoint is not None and not (pd.isna(url) or not url):
+            caminho = caminho_imagem(id_produto, url)
+            if caminho.exists():
+                phash = checkpoint.obter(caminho.name, assinatura_arquivo(caminho))
+                if phash is not None:
+                    hashes[id_produto] = (caminho.name, phash)
+                    ja_existiam += 1
+                    hashes_reaproveitados += 1
+                    continue
+        pendentes.append((id_produto, url))
+
+    if indice is not None and indice.invalidadas:
+        print(f"   🗑️ Índice de pHash: {indice.invalidadas} imagem(ns) de outra versão do pHash descartadas")
+
+    # Downloads em threads; os bytes das imagens seguem em lotes para o pool de processos do pHash
+    contador = ContadorVazao()
+    futuros = {}   # futuro do lote -> digests do lote, na ordem enviada
+    anuncios = {}  # digest -> anúncios com esse conteúdo (a mesma imagem é hasheada uma vez)
+    lote = []      # (digest, dados) aguardando completar um lote
+    with criar_pool(len(pendentes)) as pool:
+
+        def enviar_lote():
+            futuros[pool.submit(analisar_lote, [dados for _, dados in lote])] = [digest for digest, _ in lote]
+            lote.clear()
+
+        with tqdm(total=len(pendentes), desc="Baixando") as progresso:
+            for _, (id_produto, url), (status, caminho, dados) in executar_em_paralelo(
+                    pendentes, lambda tarefa: obter_imagem(*tarefa, contador=contador), CONCORRENCIA_IMAGENS):
+                if status == 'sem_url':
+                    sem_url += 1
+                elif status == 'ja_existia':
+                    ja_existiam += 1
+                elif status == 'sucesso':
+                    sucessos += 1
+                else:
+                    erros += 1
+                if dados is not None:
+                    # Conteúdo já visto sob outra URL: pHash do índice, sem recalcular
+                    digest = digest_conteudo(dados)
+                    phash = indice.por_digest(digest) if indice is not None else None
+                    if phash is not None:
+                        hashes[id_produto] = (caminho.name, phash)
+                        indice.registrar(url, digest)
+                        if checkpoint is not None:
+                            checkpoint.registrar(caminho.name, assinatura_arquivo(caminho), phash)
+                    else:
+                        if digest not in anuncios:
+                            anuncios[digest] = []
+                            lote.append((digest, dados))
+                            if len(lote) >= LOTE_PHASH:
+                                enviar_lote()
+                        anuncios[digest].append((id_produto, url, caminho, len(dados)))
+                progresso.update(1)
+                progresso.set_postfix(contador.resumo(), refresh=False)
+        if lote:
+            enviar_lote()
+
+        with tqdm(total=len(anuncios), desc="Calculando pHash") as progresso:
+            for futuro in as_completed(futuros):
+                for digest, (phash, largura, altura, formato) in zip(futuros[futuro], futuro.result()):
+                    for id_produto, url, caminho, tamanho in anuncios[digest]:
+                        hashes[id_produto] = (caminho.name, phash)
+                        # Falhas de leitura não entram no índice (a imagem é tentada de novo na próxima execução)
+                        if indice is not None and phash != PHASH_ERRO:
+                            indice.registrar(url, digest, phash, largura, altura, formato, tamanho)
+                        if checkpoint is not None:
+                            checkpoint.registrar(caminho.name, assinatura_arquivo(caminho), phash)
+                    progresso.update(1)
+
+    print(f"\n   📊 RELATÓRIO DE DOWNLOAD:")
+    print(f"      ✅ Baixadas com sucesso: {sucessos}")
+    print(f"      ⏩ Já existiam (puladas): {ja_existiam}")
+    if indice is not None:
+        print(f"      ♻️ URLs já indexadas (sem download): {do_indice}")
+    print(f"      ❌ Sem URL: {sem_url}")
+    print(f"      ⚠️ Erros de download: {erros}")
+    vazao = contador.resumo()
+    print(f"      🚀 Vazão: {vazao['img/s']} imagens/s, {vazao['MB/s']} MB/s")
+
+    # =============================================================================
+    # 5. TABELA DE pHASH (SÓ ANÚNCIOS DO DATASET ATUAL)
+    # =============================================================================
+
+    dados_hashes = [
+        {'id_anuncio': str(id_produto), 'nome_arquivo': hashes[id_produto][0], 'phash': hashes[id_produto][1]}
+        for id_produto in tarefas if id_produto in hashes
+    ]
+    hash_erros = sum(1 for linha in dados_hashes if linha['phash'] == PHASH_ERRO)
+    hash_calculados = len(dados_hashes) - hash_erros
+
+    print(f"\n   📊 RELATÓRIO DE pHASH:")
+    print(f"      ✅ Hashes calculados: {hash_calculados}"
+          + (f" ({hashes_reaproveitados} do checkpoint)" if hashes_reaproveitados else ""))
+    print(f"      ⚠️ Erros: {hash_erros}")
+
+    if indice is not None:
+        urls_removidas, imagens_removidas = indice.compactar()
+        estatisticas = indice.estatisticas()
+        print(f"\n   🗂️ ÍNDICE DE pHASH ({indice.caminho.name}):")
+        print(f"      Reaproveitados: {estatisticas['acertos_url']} por URL, {estatisticas['acertos_digest']} por conteúdo")
+        print(f"      Calculados agora: {estatisticas['novos']}")
+        print(f"      Tamanho: {estatisticas['urls']} URLs, {estatisticas['imagens']} imagens"
+              + (f" ({urls_removidas} URLs e {imagens_removidas} imagens sem uso removidas)"
+                 if urls_removidas or imagens_removidas else ""))
+        if fechar_indice:
+            indice.fechar()
+
+    # =============================================================================
+    # 6. CONTAR REUSO DE IMAGENS
+    # =============================================================================
+
+    print(f"\n🔍 DETECTANDO IMAGENS REUTILIZADAS...")
+    print("-"*80)
+
+    df_hashes = pd.DataFrame(dados_hashes, columns=['id_anuncio', 'nome_arquivo', 'phash'])
+
+    # Quase-duplicatas: pHashes a até DISTANCIA_PHASH bits (0 = hash idêntico; ver _hamming.py)
+    grupos, reuso = grupos_e_reuso(df_hashes['phash'], DISTANCIA_PHASH)
+    df_hashes['grupo_imagem'] = grupos
+    df_hashes['contagem_reuso_imagem'] = reuso
+
+    # Contar quantos produtos há em cada grupo de imagens (hashes com erro ficam de fora)
+    hash_counts = df_hashes.loc[df_hashes['grupo_imagem'] >= 0, 'grupo_imagem'].value_counts()
+
+    # Estatísticas
+    imagens_unicas = len(hash_counts)
+    imagens_reutilizadas = (hash_counts > 1).sum()
+    max_reuso = df_hashes['contagem_reuso_imagem'].max() if len(df_hashes) > 0 else 0
+
+    print(f"   📏 Distância máxima entre pHashes: {DISTANCIA_PHASH} bits")
+    print(f"   ✅ Imagens únicas: {imagens_unicas}")
+    print(f"   ⚠️ Imagens reutilizadas (>1 produto): {imagens_reutilizadas}")
+    print(f"   📊 Máximo de reuso: {max_reuso}x")
+
+    if imagens_reutilizadas > 0:
+        print(f"\n   🔝 TOP 5 IMAGENS MAIS REUTILIZADAS:")
+        for i, (grupo, count) in enumerate(hash_counts.head(5).items(), 1):
+            # Pegar IDs dos produtos do grupo e o pHash mais frequente
+            do_grupo = df_hashes[df_hashes['grupo_imagem'] == grupo]
+            produtos = do_grupo['id_anuncio'].tolist()
+            phash_val = do_grupo['phash'].value_counts().index[0]
+            variantes = do_grupo['phash'].nunique()
+            print(f"      {i}. Hash: {phash_val[:16]}... | Usado {count}x"
+                  + (f" ({variantes} variantes)" if variantes > 1 else ""))
+            print(f"         Produtos: {', '.join(map(str, produtos[:3]))}{'...' if len(produtos) > 3 else ''}")
+
+    # =============================================================================
+    # 8. RESUMO FINAL
+    # =============================================================================
+
+    print("\n" + "="*80)
+    print("📈 RESUMO DO PROCESSAMENTO DE IMAGENS")
+    print("="*80)
+
+    print(f"\n✅ DOWNLOAD:")
+    print(f"   Baixadas: {sucessos}")
+    print(f"   Já existiam: {ja_existiam}")
+    print(f"   Erros: {erros}")
+    print(f"   Sem URL: {sem_url}")
+
+    print(f"\n✅ pHASH:")
+    print(f"   Calculados: {hash_calculados}")
+    print(f"   Erros: {hash_erros}")
+
+    print(f"\n✅ ANÁLISE DE REUSO:")
+    print(f"   Imagens únicas: {imagens_unicas}")
+    print(f"   Imagens reutilizadas: {imagens_reutilizadas}")
+    print(f"   Máximo de reuso: {max_reuso}x")
+
+    print(f"\n📊 DISTRIBUIÇÃO DE REUSO:")
+    reuso_0 = (df_hashes['contagem_reuso_imagem'] == 0).sum()
+    reuso_1 = (df_hashes['contagem_reuso_imagem'] == 1).sum()
+    reuso_2_5 = ((df_hashes['contagem_reuso_imagem'] >= 2) & (df_hashes['contagem_reuso_imagem'] <= 5)).sum()
+    reuso_6_10 = ((df_hashes['contagem_reuso_imagem'] >= 6) & (df_hashes['contagem_reuso_imagem'] <= 10)).sum()
+    reuso_10_plus = (df_hashes['contagem_reuso_imagem'] > 10).sum()
+
+    print(f"   Sem hash (erro): {reuso_0}")
+    print(f"   Única (1x): {reuso_1}")
+    print(f"   Baixo reuso (2-5x): {reuso_2_5}")
+    print(f"   Médio reuso (6-10x): {reuso_6_10}")
+    print(f"   Alto reuso (>10x): {reuso_10_plus} ⚠️")
+    
+    return df_hashes
 
+def main():
+    print("="*80)
+    print("🖼️ SCRIPT 5: BAIXAR E PROCESSAR IMAGENS")
+    print("="*80)
+    
+    verificar_dependencias()
+    
+    # =============================================================================
+    # 2. CARREGAR DADOS
+    # =============================================================================
+
+    print("\n📂 CARREGANDO DADOS...")
+    print("-"*80)
+
+    # Usar o arquivo mais recente do Script 3
+    DATASET_FEATURES_BASICAS = tabela_mais_recente(SCRIPT_3_DIR, "dataset_com_features_basicas_")
+    print(f"Carregando: {DATASET_FEATURES_BASICAS.name}")
+    df = ler_tabela(DATASET_FEATURES_BASICAS, colunas=['id_anuncio', 'imagem_url_principal'])
+    print(f"   ✅ {len(df)} produtos carregados")
+
+    # Verificar se tem coluna de URL de imagem
+    if 'imagem_url_principal' not in df.columns:
+        print("   ❌ Coluna 'imagem_url_principal' não encontrada!")
+        sys.exit(1)
+
+    # fsync a cada 50 hashes: recalcular um pHash é barato, ao contrário das chamadas de API
+    checkpoint = Checkpoint("script_5_imagens", sincronizar_a_cada=50)
+    df_hashes = processar(df, checkpoint=checkpoint)
+
+    # =============================================================================
+    # 7. SALVAR RESULTADO
+    # =============================================================================
+
+    print(f"\n💾 SALVANDO RESULTADO...")
+    print("-"*80)
+
+    # Salvar tabela de hashes na pasta do Script 5
+    arquivo_hashes = salvar_tabela(df_hashes, SCRIPT_5_DIR, "hashes_imagens")
+    print(f"   ✅ Salvo em: {arquivo_hashes}")
+    print(f"   📊 Shape: {df_hashes.shape}")
+
+    # Saída gravada: o checkpoint não é mais necessário
+    checkpoint.concluir()
+
+    print("\n" + "="*80)
+    print("✅ SCRIPT 3 CONCLUÍDO COM SUCESSO!")
+    print("="*80)
+    print(f"\n📁 Próximo passo: python 4_criar_target_merge.py")
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,14 @@ SCRIPT 6: CRIAR TARGET E MERGE FINAL
 Cria a variável target is_fraud_suspect_v2 e faz o merge de todas as features.
 
 INPUT:
-- data/script_3_features_basicas/dataset_com_features_basicas_*.csv
-- data/script_4_nlp/reviews_com_nlp_*.csv
-- data/script_5_imagens/hashes_imagens.csv
+- data/script_3_features_basicas/dataset_com_features_basicas_*.parquet
+- data/script_4_nlp/reviews_com_nlp_*.parquet
+- data/script_5_imagens/hashes_imagens.parquet
 
 OUTPUT:
-- data/script_6_grafo/dataset_final_para_modelo.csv (PRONTO PARA ML)
+- data/script_6_grafo/dataset_final_para_modelo.parquet (PRONTO PARA ML)
+
+Tabelas gravadas em Parquet por padrão (PIPELINE_FORMATO=arrow|csv; ver _armazenamento.py).
 """
 
 import pandas as pd
@@ -23,12 +25,11 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent))
 from _config import *
+from _armazenamento import ler_tabela, salvar_tabela, tabela_mais_recente
 
-# Usar os arquivos mais recentes de cada script
-PATH_FEATURES_BASICAS = max(SCRIPT_3_DIR.glob("*.csv"), key=lambda x: x.stat().st_mtime)
-PATH_REVIEWS_NLP = max(SCRIPT_4_DIR.glob("*.csv"), key=lambda x: x.stat().st_mtime)
-PATH_HASHES_IMAGENS = SCRIPT_5_DIR / "hashes_imagens.csv"
-PATH_OUTPUT = SCRIPT_6_DIR / "dataset_final_para_modelo.csv"
+# Saídas fixas dos scripts 5 e 6, sem extensão (as de 3 e 4 são resolvidas em main, arquivo mais recente)
+NOME_HASHES_IMAGENS = "hashes_imagens"
+NOME_OUTPUT = "dataset_final_para_modelo"
 
 # Criar diretório de saída se não existir
 SCRIPT_6_DIR.mkdir(parents=True, exist_ok=True)
@@ -228,22 +229,27 @@ def criar_is_fraud_suspect_v2(df):
     
     return df
 
-def merge_all_features():
-    """Faz merge de todas as features"""
+def merge_all_features(df_base, df_nlp=None, df_hashes=None):
+    """
+    Faz merge de todas as features
+    
+    Args:
+        df_base: Features básicas (Script 3)
+        df_nlp: Features de NLP (Script 4) ou None
+        df_hashes: Hashes de imagem (Script 5) ou None
+    """
     
     print("\n" + "="*80)
     print("🔗 MERGE DE TODAS AS FEATURES")
     print("="*80)
     
-    # 1. Carregar Features Básicas
-    print("\n📂 1. Carregando Features Básicas...")
-    df_base = pd.read_csv(PATH_FEATURES_BASICAS)
+    # 1. Features Básicas
+    print("\n📂 1. Features Básicas...")
     print(f"   ✅ {len(df_base)} produtos, {len(df_base.columns)} colunas")
     
-    # 2. Carregar Reviews NLP
-    print("\n📂 2. Carregando Reviews NLP...")
-    try:
-        df_nlp = pd.read_csv(PATH_REVIEWS_NLP)
+    # 2. Reviews NLP
+    print("\n📂 2. Reviews NLP...")
+    if df_nlp is not None:
         print(f"   ✅ {len(df_nlp)} produtos com reviews, {len(df_nlp.columns)} colunas NLP")
         
         # Merge
@@ -262,12 +268,12 @@ def merge_all_features():
                     df_merged[col] = df_merged[col].fillna(0)
         
         print(f"   ✅ NaN preenchidos para produtos sem reviews")
-    except FileNotFoundError:
-        print("   ⚠️ Arquivo reviews_com_nlp.csv não encontrado. Pulando NLP...")
+    else:
+        print("   ⚠️ Tabela reviews_com_nlp não encontrada. Pulando NLP...")
         df_merged = df_base.copy()
     
-    # 3. Carregar Hashes de Imagem
-    print("\n📂 3. Carregando Hashes de Imagem...")
+    # 3. Hashes de Imagem
+    print("\n📂 3. Hashes de Imagem...")
     
     # Tentar carregar hashes_imagens_COMPLETO.csv primeiro (múltiplas imagens)
     hash_file_used = None
@@ -290,9 +296,9 @@ def merge_all_features():
         print(f"   ✅ {len(df_hashes_agg)} produtos com imagens")
         print(f"   📊 Média de imagens por produto: {df_hashes['id_anuncio'].value_counts().mean():.1f}")
         
-    elif os.path.exists(PATH_HASHES_IMAGENS):
-        print("   🔍 Detectado: hashes_imagens.csv (imagem principal)")
-        df_hashes_agg = pd.read_csv(PATH_HASHES_IMAGENS)
+    elif df_hashes is not None:
+        print("   🔍 Detectado: hashes_imagens (imagem principal)")
+        df_hashes_agg = df_hashes.copy()
         hash_file_used = 'SIMPLES'
         df_hashes_agg['num_imagens_produto'] = 1  # Apenas 1 imagem
         print(f"   ✅ {len(df_hashes_agg)} produtos com hash")
@@ -322,24 +328,39 @@ def merge_all_features():
     
     return df_final
 
+def processar(df_base, df_nlp=None, df_hashes=None):
+    """
+    Merge das features e criação do target is_fraud_suspect_v2.
+    Ponto de entrada em memória (usado pelo modo em processo do PipelineExecutor).
+    """
+    df = merge_all_features(df_base, df_nlp, df_hashes)
+    return criar_is_fraud_suspect_v2(df)
+
 def main():
     print("="*80)
     print("🎯 SCRIPT 6: CRIAR TARGET E MERGE FINAL")
     print("="*80)
     
-    # 1. Merge de todas as features
-    df = merge_all_features()
+    # 1. Carregar saídas dos scripts 3, 4 e 5 (arquivos mais recentes)
+    PATH_FEATURES_BASICAS = tabela_mais_recente(SCRIPT_3_DIR, "dataset_com_features_basicas_")
+    df_base = ler_tabela(PATH_FEATURES_BASICAS)
+    
+    arquivo_nlp = tabela_mais_recente(SCRIPT_4_DIR, "reviews_com_nlp_")
+    df_nlp = ler_tabela(arquivo_nlp) if arquivo_nlp else None
+    
+    arquivo_hashes = tabela_mais_recente(SCRIPT_5_DIR, NOME_HASHES_IMAGENS)
+    df_hashes = ler_tabela(arquivo_hashes) if arquivo_hashes else None
     
-    # 2. Criar target
-    df = criar_is_fraud_suspect_v2(df)
+    # 2. Merge de todas as features + target
+    df = processar(df_base, df_nlp, df_hashes)
     
     # 3. Salvar dataset final
     print("\n" + "="*80)
     print("💾 SALVANDO DATASET FINAL")
     print("="*80)
     
-    df.to_csv(PATH_OUTPUT, index=False)
-    print(f"✅ Salvo: {os.path.abspath(PATH_OUTPUT)}")
+    arquivo_saida = salvar_tabela(df, SCRIPT_6_DIR, NOME_OUTPUT)
+    print(f"✅ Salvo: {os.path.abspath(arquivo_saida)}")
     print(f"📊 Shape: ({len(df)}, {len(df.columns)})")
     
     # 4. Resumo final
@@ -380,7 +401,7 @@ def main():
     print("\n" + "="*80)
     print("✅ SCRIPT 4 CONCLUÍDO COM SUCESSO!")
     print("="*80)
-    print(f"\n📁 Próximo passo: Treinar o modelo com {PATH_OUTPUT}")
+    print(f"\n📁 Próximo passo: Treinar o modelo com {arquivo_saida}")
 
 if __name__ == "__main__":
     main()
@@ -7,22 +7,38 @@ Constrói o grafo de vendedores com 4 camadas de conexões e calcula 12 métrica
 CAMADAS DE CONEXÃO:
 1. Mesmo produto de catálogo (peso: 5.0)
 2. Vendedores alternativos (peso: 2.0)  
-3. Imagens compartilhadas (peso: 1.0)
+3. Imagens compartilhadas (peso: 1.0; quase-duplicatas pelo pHash, ver _hamming.py)
 4. Similaridade semântica (peso: 0.5)
 
 INPUT:
-- data/script_6_grafo/dataset_final_para_modelo.csv (Script 6)
-- data/script_5_imagens/hashes_imagens.csv (Script 5)
+- data/script_6_grafo/dataset_final_para_modelo.parquet (Script 6)
+- data/script_5_imagens/hashes_imagens.parquet (Script 5)
+- data/script_4_nlp/embeddings/ (embeddings em .npy, abertos com memory-map; Script 4)
 
 OUTPUT:
-- data/script_7_grafo/dataset_final_com_grafo.csv (DATASET COMPLETO COM FEATURES DE GRAFO)
+- data/script_7_grafo/dataset_final_com_grafo.parquet (DATASET COMPLETO COM FEATURES DE GRAFO)
+- data/script_7_grafo/grafo_vendedores_nos.parquet e grafo_vendedores_arestas.parquet
+  (grafo de vendedores, reaproveitado pela pontuação incremental de um anúncio)
+
+Tabelas gravadas em Parquet por padrão (PIPELINE_FORMATO=arrow|csv; ver _armazenamento.py).
+
+A camada semântica usa só os pares de anúncios acima do limiar de similaridade,
+calculados em blocos de linhas com memória limitada (ver _similaridade.py), sem
+montar a matriz n x n de cada tipo de embedding.
+
+Betweenness e closeness são calculados por componente conexa, em paralelo, a
+partir de no máximo PIPELINE_BETWEENNESS_PIVOS vendedores por componente
+(estimativa com limite de erro informado no log; ver _centralidade.py).
+
+Grau, vizinhança, PageRank e comunidades são calculados no backend escolhido
+por PIPELINE_GRAFO_BACKEND (igraph, scipy ou networkx; ver _grafo_backend.py).
 """
 
 import pandas as pd
 import numpy as np
 import os
 import networkx as nx
-from community import community_louvain
+from scipy.sparse import csr_matrix, triu
 import ast  # Para converter strings de listas de forma segura
 
 # --- CONFIGURAÇÃO ---
@@ -30,36 +46,181 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent))
 from _config import *
+from _armazenamento import ler_tabela, salvar_tabela, tabela_mais_recente
+from _embeddings import PASTA_EMBEDDINGS, TIPOS_EMBEDDING, ArmazemEmbeddings, sem_embeddings
+from _hamming import grupos_e_reuso
+from _similaridade import pares_similares
+from _centralidade import CONFIANCA_ERRO, SEMENTE_CENTRALIDADE, centralidades
+from _grafo_backend import METODO_COMUNIDADES, GrafoVendedores
 
-# Usar os arquivos mais recentes de cada script
-PATH_DATASET = SCRIPT_6_DIR / "dataset_final_para_modelo.csv"
-PATH_HASHES = SCRIPT_5_DIR / "hashes_imagens.csv"
-PATH_OUTPUT = SCRIPT_7_DIR / "dataset_final_com_grafo.csv"
+# Tabelas de entrada e saída, sem extensão (usar os arquivos mais recentes de cada script)
+NOME_DATASET = "dataset_final_para_modelo"
+NOME_HASHES = "hashes_imagens"
+NOME_OUTPUT = "dataset_final_com_grafo"
+NOME_GRAFO_NOS = "grafo_vendedores_nos"
+NOME_GRAFO_ARESTAS = "grafo_vendedores_arestas"
 
 # Criar diretório de saída se não existir
 SCRIPT_7_DIR.mkdir(parents=True, exist_ok=True)
 
-# Verificar se o arquivo existe, se não, procurar em script_6_target_merge
-if not PATH_DATASET.exists():
+def localizar_dataset():
+    """Localiza a saída do Script 6 (procura em script_6_target_merge se necessário)"""
+    path_dataset = tabela_mais_recente(SCRIPT_6_DIR, NOME_DATASET)
+    if path_dataset is not None:
+        return path_dataset
     SCRIPT_6_TARGET_DIR = DATA_DIR / "script_6_target_merge"
-    if SCRIPT_6_TARGET_DIR.exists():
-        PATH_DATASET = max(SCRIPT_6_TARGET_DIR.glob("*.csv"), key=lambda x: x.stat().st_mtime)
-        print(f"   📂 Usando arquivo de: {PATH_DATASET}")
+    path_dataset = tabela_mais_recente(SCRIPT_6_TARGET_DIR) if SCRIPT_6_TARGET_DIR.exists() else None
+    if path_dataset is not None:
+        print(f"   📂 Usando arquivo de: {path_dataset}")
+        return path_dataset
+    raise FileNotFoundError(f"Saída do Script 6 ({NOME_DATASET}) não encontrada em {SCRIPT_6_DIR}")
 
-def main():
-    print("="*80)
-    print("🕸️ SCRIPT 7: CRIAR FEATURES DE GRAFO COM SIMILARIDADE SEMÂNTICA")
-    print("="*80)
-    
-    # 1. Carregar dados
-    print("\n📂 CARREGANDO DADOS...")
-    print("-"*80)
+def salvar_grafo(G, pasta=SCRIPT_7_DIR):
+    """Salva nós (atributos usados nas features) e arestas ponderadas do grafo de vendedores"""
+    df_nos = pd.DataFrame([
+        {
+            'seller_id': node,
+            'num_produtos': attrs.get('num_produtos', 0),
+            'num_produtos_suspeitos': attrs.get('num_produtos_suspeitos', 0),
+            'comunidade': attrs.get('comunidade', -1)
+        }
+        for node, attrs in G.nodes(data=True)
+    ], columns=['seller_id', 'num_produtos', 'num_produtos_suspeitos', 'comunidade'])
+    df_arestas = pd.DataFrame(
+        [(u, v, d['weight']) for u, v, d in G.edges(data=True)],
+        columns=['origem', 'destino', 'peso']
+    )
+    return salvar_tabela(df_nos, pasta, NOME_GRAFO_NOS), salvar_tabela(df_arestas, pasta, NOME_GRAFO_ARESTAS)
+
+def atributos_vendedores(df):
+    """
+    Atributos dos nós do grafo, uma linha por vendedor (índice seller_id, na ordem
+    em que os vendedores aparecem no df). Dados do vendedor vêm do primeiro anúncio.
+    """
+    primeiros = df.drop_duplicates(subset=['seller_id']).set_index('seller_id')
+    suspeitos = df.groupby('seller_id', sort=False)['is_fraud_suspect_v2'].agg(['size', 'sum', 'mean'])
+    return pd.DataFrame({
+        'tipo': 'vendedor',
+        'total_transacoes': primeiros['vendedor_total_transacoes'],
+        'reputacao': primeiros['vendedor_reputacao_num'],
+        'e_loja_oficial': primeiros['e_loja_oficial'],
+        'num_produtos': suspeitos['size'],
+        'num_produtos_suspeitos': suspeitos['sum'],
+        'taxa_suspeita': suspeitos['mean'],
+    }, index=primeiros.index)
+
+def features_vizinhanca(grafo, atributos):
+    """
+    Features de vizinhança de cada vendedor (na ordem de grafo.vertices) por somas
+    sobre os vizinhos dos vetores de produtos e suspeitos por nó (adjacência esparsa).
+    Um vendedor ligado a ele mesmo conta como o próprio vizinho.
+    """
+    suspeitos = atributos['num_produtos_suspeitos'].loc[grafo.vertices].to_numpy()
+    produtos = atributos['num_produtos'].loc[grafo.vertices].to_numpy()
+
+    num_vizinhos = grafo.num_vizinhos()
+    vizinhos_suspeitos = grafo.somar_vizinhos(suspeitos).astype(suspeitos.dtype)
+    vizinhos_produtos = grafo.somar_vizinhos(produtos)
+    peso_total = grafo.somar_vizinhos(np.ones(grafo.n), ponderado=True)
+    com_vizinhos = num_vizinhos > 0
+    return pd.DataFrame({
+        'seller_id': grafo.vertices.to_numpy(),
+        'grafo_num_vizinhos': num_vizinhos,
+        'grafo_vizinhos_suspeitos': vizinhos_suspeitos,
+        'grafo_taxa_suspeita_vizinhos': np.divide(
+            vizinhos_suspeitos, vizinhos_produtos, out=np.zeros(grafo.n), where=vizinhos_produtos > 0
+        ),
+        'grafo_peso_total_conexoes': peso_total,
+        'grafo_peso_medio_conexoes': np.divide(
+            peso_total, num_vizinhos, out=np.zeros(grafo.n), where=com_vizinhos
+        ),
+    })
+
+def pares_por_grupo(vendedores, grupos):
+    """
+    Pares de vendedores distintos que aparecem num mesmo grupo (catálogo, imagem)
+    e em quantos grupos cada par aparece: arrays (vendedores_a, vendedores_b, quantidades).
+
+    Projeção da matriz esparsa de incidência vendedor x grupo (B, binária): o
+    triângulo superior de B @ B.T conta os grupos em comum de cada par.
+    """
+    codigos_vendedor, vendedores_unicos = pd.factorize(np.asarray(vendedores, dtype=np.int64))
+    codigos_grupo, grupos_unicos = pd.factorize(np.asarray(grupos))
+    incidencia = csr_matrix(
+        (np.ones(len(codigos_vendedor), dtype=np.int32), (codigos_vendedor, codigos_grupo)),
+        shape=(len(vendedores_unicos), len(grupos_unicos))
+    )
+    # Vários anúncios do mesmo vendedor no grupo contam uma vez
+    incidencia.data[:] = 1
+    em_comum = triu(incidencia @ incidencia.T, k=1).tocoo()
+    vendedores_unicos = np.asarray(vendedores_unicos)
+    return vendedores_unicos[em_comum.row], vendedores_unicos[em_comum.col], em_comum.data
+
+class ArestasVendedores:
+    """
+    Arestas ponderadas entre vendedores, somadas camada a camada em arrays e
+    carregadas no grafo de uma vez no final. Cada aresta guarda o peso total e
+    o tipo da primeira camada que a criou.
+    """
+
+    def __init__(self, vendedores):
+        self.vendedores = pd.Index(pd.unique(np.asarray(vendedores, dtype=np.int64)))
+        self._chaves, self._pesos, self._tipos = [], [], []
+        self._existentes = np.zeros(0, dtype=np.int64)
+
+    def somar(self, vendedores_a, vendedores_b, pesos, tipo):
+        """Soma pesos[k] à aresta (vendedores_a[k], vendedores_b[k]); retorna quantas arestas a camada cria"""
+        a = self.vendedores.get_indexer(np.asarray(vendedores_a, dtype=np.int64)).astype(np.int64)
+        b = self.vendedores.get_indexer(np.asarray(vendedores_b, dtype=np.int64)).astype(np.int64)
+        # Aresta não direcionada: chave única do par (menor código, maior código)
+        chaves = np.minimum(a, b) * len(self.vendedores) + np.maximum(a, b)
+        novas = np.setdiff1d(np.unique(chaves), self._existentes, assume_unique=True)
+        self._existentes = np.union1d(self._existentes, novas)
+        self._chaves.append(chaves)
+        self._pesos.append(np.broadcast_to(np.asarray(pesos, dtype=float), chaves.shape))
+        self._tipos.append(tipo)
+        return len(novas)
+
+    def carregar(self, G):
+        """
+        Adiciona as arestas acumuladas ao grafo (os vendedores já são nós de G).
+        Retorna os arrays (vendedores_a, vendedores_b, pesos) das arestas adicionadas.
+        """
+        if not self._chaves:
+            vazio = np.zeros(0, dtype=np.int64)
+            return vazio, vazio, np.zeros(0)
+        tabela = pd.DataFrame({
+            'chave': np.concatenate(self._chaves),
+            'peso': np.concatenate(self._pesos),
+            'camada': np.repeat(np.arange(len(self._chaves)), [len(c) for c in self._chaves]),
+        })
+        # Na ordem em que as arestas apareceram (camada 1 primeiro), como se fossem criadas uma a uma
+        arestas = tabela.groupby('chave', sort=False).agg(peso=('peso', 'sum'), camada=('camada', 'first'))
+        n = len(self.vendedores)
+        codigos = arestas.index.to_numpy()
+        vendedores_a = self.vendedores[codigos // n].to_numpy()
+        vendedores_b = self.vendedores[codigos % n].to_numpy()
+        pesos = arestas['peso'].to_numpy()
+        G.add_edges_from(
+            (v1, v2, {'weight': peso, 'tipo': self._tipos[camada]})
+            for v1, v2, peso, camada in zip(
+                vendedores_a.tolist(), vendedores_b.tolist(), pesos.tolist(), arestas['camada'].tolist()
+            )
+        )
+        return vendedores_a, vendedores_b, pesos
+
+def processar(df, df_hashes, retornar_grafo=False, embeddings=None):
+    """
+    Constrói o grafo de vendedores e agrega as features de grafo ao dataset.
+    Ponto de entrada em memória (usado pelo modo em processo do PipelineExecutor).
     
-    df = pd.read_csv(PATH_DATASET)
-    df_hashes = pd.read_csv(PATH_HASHES)
+    embeddings: ArmazemEmbeddings da camada semântica. Sem ele, usa as colunas
+    embedding_* do df (se houver) ou o armazém gravado pelo Script 4.
+    O dataset devolvido não leva as colunas embedding_*.
     
-    print(f"   ✅ Dataset principal: {len(df)} produtos")
-    print(f"   ✅ Hashes de imagens: {len(df_hashes)} imagens")
+    Com retornar_grafo=True devolve (df_final, G).
+    """
+    df = df.copy()
     
     # =============================================================================
     # 2. LIMPEZA DE DADOS (NAN E DUPLICATAS)
@@ -97,73 +258,46 @@ def main():
     print(f"\n🧠 CALCULANDO SIMILARIDADE SEMÂNTICA...")
     print("-"*80)
     
-    import json
-    from sklearn.metrics.pairwise import cosine_similarity
+    # Embeddings: armazém recebido, colunas em memória (pipeline em processo) ou armazém do Script 4
+    if embeddings is None:
+        if any(col in df.columns for col in TIPOS_EMBEDDING):
+            embeddings = ArmazemEmbeddings.de_dataframe(df)
+        else:
+            embeddings = ArmazemEmbeddings.carregar(SCRIPT_4_DIR / PASTA_EMBEDDINGS)
+    available_embeddings = embeddings.tipos() if embeddings is not None else []
     
-    # Verificar se temos as colunas de embedding separadas
-    embedding_cols = ['embedding_titulo', 'embedding_descricao', 'embedding_reviews']
-    available_embeddings = [col for col in embedding_cols if col in df.columns]
+    # Pares de anúncios (posições em df) com similaridade acima do limiar, por tipo de embedding
+    pares_similares_por_tipo = {}
+    SIMILARITY_THRESHOLD = 0.85
     
     if available_embeddings:
-        print(f"   ✅ Colunas de embedding encontradas: {available_embeddings}")
+        print(f"   ✅ Embeddings encontrados: {available_embeddings}")
         
         # Processar cada tipo de embedding separadamente
-        similarity_matrices = {}
-        SIMILARITY_THRESHOLD = 0.85
-        
         for embedding_type in available_embeddings:
             print(f"   📐 Processando {embedding_type}...")
             
-            # Extrair embeddings válidos (não nulos)
-            valid_indices = df[embedding_type].notna()
-            valid_df = df[valid_indices].copy()
+            # Linhas do dataset com embedding desse tipo (vetores inválidos já vêm zerados)
+            valid_mask, embeddings_matrix = embeddings.alinhar(embedding_type, df['id_anuncio'])
             
-            if len(valid_df) == 0:
+            if not valid_mask.any():
                 print(f"      ⚠️ Nenhum embedding válido para {embedding_type}")
                 continue
             
-            # Converter strings JSON para arrays NumPy
-            embeddings_list = []
-            for idx, row in valid_df.iterrows():
-                try:
-                    embedding = json.loads(row[embedding_type])
-                    # Garantir que o embedding tem exatamente 1536 dimensões
-                    if len(embedding) == 1536:
-                        embeddings_list.append(embedding)
-                    else:
-                        # Se não tem 1536 dimensões, usar zeros
-                        embeddings_list.append([0.0] * 1536)
-                except (json.JSONDecodeError, TypeError):
-                    # Se não conseguir fazer parse, usar zeros
-                    embeddings_list.append([0.0] * 1536)
-            
-            # Verificar se todos os embeddings têm o mesmo tamanho
-            if embeddings_list:
-                embedding_lengths = [len(emb) for emb in embeddings_list]
-                if len(set(embedding_lengths)) > 1:
-                    print(f"      ⚠️ Embeddings com tamanhos diferentes: {set(embedding_lengths)}")
-                    # Padronizar para 1536 dimensões
-                    embeddings_list = [emb[:1536] + [0.0] * max(0, 1536 - len(emb)) for emb in embeddings_list]
-            
-            embeddings_matrix = np.array(embeddings_list)
             print(f"      ✅ Matriz de {embedding_type}: {embeddings_matrix.shape}")
             
-            # Calcular similaridade de cosseno
-            cosine_sim = cosine_similarity(embeddings_matrix)
-            similarity_matrices[embedding_type] = {
-                'matrix': cosine_sim,
-                'indices': valid_df.index.tolist()
-            }
+            # Similaridade de cosseno em blocos de linhas, guardando só os pares acima do limiar
+            # (sem a matriz n x n; ver _similaridade.py)
+            i, j = pares_similares(embeddings_matrix, SIMILARITY_THRESHOLD)
+            posicoes = np.flatnonzero(valid_mask)
+            pares_similares_por_tipo[embedding_type] = (posicoes[i], posicoes[j])
             
             # Estatísticas
-            similaridades_altas = (cosine_sim > SIMILARITY_THRESHOLD).sum()
-            print(f"      📊 Pares com similaridade > {SIMILARITY_THRESHOLD:.0%}: {similaridades_altas}")
+            print(f"      📊 Pares com similaridade > {SIMILARITY_THRESHOLD:.0%}: {len(i)}")
         
-        print(f"   ✅ {len(similarity_matrices)} tipos de similaridade calculados")
+        print(f"   ✅ {len(pares_similares_por_tipo)} tipos de similaridade calculados")
     else:
-        print(f"   ⚠️ Nenhuma coluna de embedding encontrada. Pulando similaridade semântica.")
-        similarity_matrices = {}
-        SIMILARITY_THRESHOLD = 0.85
+        print(f"   ⚠️ Nenhum embedding encontrado. Pulando similaridade semântica.")
     
     # =============================================================================
     # 4. Construir o grafo (VERSÃO MELHORADA COM MÚLTIPLAS ARESTAS)
@@ -177,121 +311,76 @@ def main():
     print("   📍 Adicionando nós (vendedores)...")
     vendedores_unicos = df['seller_id'].unique()
     
-    for seller_id in vendedores_unicos:
-        # Pegar produtos desse vendedor
-        produtos_vendedor = df[df['seller_id'] == seller_id]
-        
-        if len(produtos_vendedor) == 0:
-            continue
-        
-        # Atributos do vendedor
-        G.add_node(
-            seller_id,
-            tipo='vendedor',
-            total_transacoes=produtos_vendedor['vendedor_total_transacoes'].iloc[0],
-            reputacao=produtos_vendedor['vendedor_reputacao_num'].iloc[0],
-            e_loja_oficial=produtos_vendedor['e_loja_oficial'].iloc[0],
-            num_produtos=len(produtos_vendedor),
-            num_produtos_suspeitos=produtos_vendedor['is_fraud_suspect_v2'].sum(),
-            taxa_suspeita=produtos_vendedor['is_fraud_suspect_v2'].mean()
-        )
+    # Atributos de todos os vendedores numa passada (na ordem em que aparecem no df)
+    atributos = atributos_vendedores(df)
+    G.add_nodes_from(zip(atributos.index, atributos.to_dict('records')))
     print(f"   ✅ {len(G.nodes)} vendedores adicionados como nós.")
 
     # --- 4.2 Adicionar arestas (conexões) em camadas ---
     print("\n   🔗 Adicionando conexões em camadas (arestas)...")
+    # Arestas somadas em arrays e carregadas no grafo ao final das 4 camadas
+    arestas = ArestasVendedores(vendedores_unicos)
 
     # --- CAMADA 1: MESMO PRODUTO DE CATÁLOGO (Conexão mais forte) ---
     print("      - Camada 1: Vendedores do mesmo produto de catálogo...")
-    conexoes_catalogo = 0
     df_cat = df.dropna(subset=['catalog_product_id'])
-    for _, grupo in df_cat.groupby('catalog_product_id'):
-        vendedores = grupo['seller_id'].unique()
-        if len(vendedores) > 1:
-            for i, v1 in enumerate(vendedores):
-                for v2 in vendedores[i+1:]:
-                    if G.has_edge(v1, v2):
-                        G[v1][v2]['weight'] += 5.0  # Aumenta o peso se já conectado
-                    else:
-                        G.add_edge(v1, v2, weight=5.0, tipo='mesmo_catalogo')
-                        conexoes_catalogo += 1
+    # Cada catálogo em comum soma 5.0 ao par de vendedores
+    v1, v2, catalogos_em_comum = pares_por_grupo(df_cat['seller_id'], df_cat['catalog_product_id'])
+    conexoes_catalogo = arestas.somar(v1, v2, catalogos_em_comum * 5.0, tipo='mesmo_catalogo')
     print(f"         -> {conexoes_catalogo} novas conexões criadas (peso: 5.0)")
 
     # --- CAMADA 2: VENDEDORES ALTERNATIVOS (Conexão forte) ---
     print("      - Camada 2: Vendedores listados como alternativas de compra...")
-    conexoes_alt = 0
+    principais, alternativos = [], []
     df_alt = df.dropna(subset=['conexoes_vendedores_alt'])
-    for _, row in df_alt.iterrows():
-        vendedor_principal = row['seller_id']
+    for vendedor_principal, valor in zip(df_alt['seller_id'], df_alt['conexoes_vendedores_alt']):
         try:
             # Usar ast.literal_eval para converter string de lista para lista
-            vendedores_alternativos = ast.literal_eval(row['conexoes_vendedores_alt'])
+            vendedores_alternativos = ast.literal_eval(valor)
             if not isinstance(vendedores_alternativos, list): continue
                 
             for vendedor_alt in vendedores_alternativos:
                 # Garantir que o nó alternativo existe no grafo antes de conectar
                 if G.has_node(vendedor_principal) and G.has_node(int(vendedor_alt)):
-                    if G.has_edge(vendedor_principal, int(vendedor_alt)):
-                        G[vendedor_principal][int(vendedor_alt)]['weight'] += 2.0
-                    else:
-                        G.add_edge(vendedor_principal, int(vendedor_alt), weight=2.0, tipo='alternativa_compra')
-                        conexoes_alt += 1
+                    principais.append(vendedor_principal)
+                    alternativos.append(int(vendedor_alt))
         except (ValueError, SyntaxError):
             continue # Ignora se a string não for uma lista válida
+    # Cada citação soma 2.0 ao par (inclusive citações repetidas)
+    conexoes_alt = arestas.somar(principais, alternativos, 2.0, tipo='alternativa_compra')
     print(f"         -> {conexoes_alt} novas conexões criadas (peso: 2.0)")
 
     # --- CAMADA 3: IMAGENS COMPARTILHADAS (Conexão contextual) ---
     print("      - Camada 3: Vendedores que compartilham a mesma imagem...")
-    conexoes_imagem = 0
+    # Tabela de hashes antiga (sem grupo_imagem): agrupa aqui as quase-duplicatas
+    if 'grupo_imagem' not in df_hashes.columns:
+        df_hashes = df_hashes.assign(grupo_imagem=grupos_e_reuso(df_hashes['phash'])[0])
     # Unir df_hashes com df para obter o seller_id para cada imagem
     df_hashes_com_vendedor = pd.merge(df_hashes, df[['id_anuncio', 'seller_id']], on='id_anuncio', how='inner')
+    df_hashes_com_vendedor = df_hashes_com_vendedor[df_hashes_com_vendedor['grupo_imagem'] >= 0]
 
-    for _, grupo in df_hashes_com_vendedor.groupby('phash'):
-        vendedores = grupo['seller_id'].unique()
-        if len(vendedores) > 1:
-            for i, v1 in enumerate(vendedores):
-                for v2 in vendedores[i+1:]:
-                    if G.has_edge(v1, v2):
-                        G[v1][v2]['weight'] += 1.0
-                    else:
-                        G.add_edge(v1, v2, weight=1.0, tipo='imagem_compartilhada')
-                        conexoes_imagem += 1
+    # Cada grupo de quase-duplicatas em comum (pHashes a até PIPELINE_PHASH_DISTANCIA bits;
+    # ver _hamming.py) soma 1.0 ao par de vendedores
+    v1, v2, imagens_em_comum = pares_por_grupo(df_hashes_com_vendedor['seller_id'], df_hashes_com_vendedor['grupo_imagem'])
+    conexoes_imagem = arestas.somar(v1, v2, imagens_em_comum * 1.0, tipo='imagem_compartilhada')
     print(f"         -> {conexoes_imagem} novas conexões criadas (peso: 1.0)")
 
     # --- CAMADA 4: CONEXÕES SEMÂNTICAS (Conexão baseada em similaridade) ---
-    if similarity_matrices:
+    if pares_similares_por_tipo:
         print("      - Camada 4: Vendedores com produtos semanticamente similares...")
         conexoes_semanticas = 0
+        vendedor_por_posicao = df['seller_id'].to_numpy()
         
         # Processar cada tipo de similaridade
-        for embedding_type, sim_data in similarity_matrices.items():
+        for embedding_type, (posicoes1, posicoes2) in pares_similares_por_tipo.items():
             print(f"         Processando similaridade de {embedding_type}...")
-            cosine_sim = sim_data['matrix']
-            indices = sim_data['indices']
-            
-            # Mapear índices do DataFrame para posições na matriz de similaridade
-            idx_to_pos = {idx: pos for pos, idx in enumerate(indices)}
             
-            conexoes_tipo = 0
-            for i in range(len(indices)):
-                for j in range(i + 1, len(indices)):
-                    if cosine_sim[i, j] > SIMILARITY_THRESHOLD:
-                        # Obter os índices originais do DataFrame
-                        idx1 = indices[i]
-                        idx2 = indices[j]
-                        
-                        vendedor1 = df.loc[idx1, 'seller_id']
-                        vendedor2 = df.loc[idx2, 'seller_id']
-                        
-                        # Não conectar um vendedor a ele mesmo
-                        if vendedor1 != vendedor2 and G.has_node(vendedor1) and G.has_node(vendedor2):
-                            peso = 0.5  # Peso base para similaridade semântica
-                            
-                            if G.has_edge(vendedor1, vendedor2):
-                                G[vendedor1][vendedor2]['weight'] += peso
-                            else:
-                                G.add_edge(vendedor1, vendedor2, weight=peso, tipo=f'similaridade_{embedding_type}')
-                                conexoes_semanticas += 1
-                                conexoes_tipo += 1
+            # Cada par de anúncios similares soma 0.5 ao par de vendedores
+            # (não conectar um vendedor a ele mesmo)
+            v1, v2 = vendedor_por_posicao[posicoes1], vendedor_por_posicao[posicoes2]
+            diferentes = v1 != v2
+            conexoes_tipo = arestas.somar(v1[diferentes], v2[diferentes], 0.5, tipo=f'similaridade_{embedding_type}')
+            conexoes_semanticas += conexoes_tipo
             
             print(f"            -> {conexoes_tipo} conexões de {embedding_type}")
         
@@ -299,16 +388,22 @@ def main():
     else:
         print("      - Camada 4: Pulada (sem embeddings disponíveis)")
 
+    vendedores_a, vendedores_b, pesos = arestas.carregar(G)
+    # Métricas calculadas no backend de grafo (igraph, scipy ou networkx; ver _grafo_backend.py)
+    grafo = GrafoVendedores(atributos.index, vendedores_a, vendedores_b, pesos)
+    graus = grafo.graus()
+    conectados = graus > 0
+
     # --- 4.3 Estatísticas Finais do Grafo ---
     print(f"\n📊 ESTATÍSTICAS FINAIS DO GRAFO CONSTRUÍDO:")
-    print(f"   Nós (vendedores): {len(G.nodes)}")
-    print(f"   Arestas (conexões): {len(G.edges)}")
-    print(f"   Vendedores conectados: {len([n for n in G.nodes if G.degree(n) > 0])}")
-    print(f"   Vendedores isolados: {len([n for n in G.nodes if G.degree(n) == 0])}")
+    print(f"   Nós (vendedores): {grafo.n}")
+    print(f"   Arestas (conexões): {grafo.num_arestas}")
+    print(f"   Vendedores conectados: {conectados.sum()}")
+    print(f"   Vendedores isolados: {(~conectados).sum()}")
+    print(f"   Backend do grafo: {grafo.backend}")
     
     # Calcular peso médio das arestas
-    if len(G.edges) > 0:
-        pesos = [G[u][v]['weight'] for u, v in G.edges()]
+    if grafo.num_arestas > 0:
         print(f"   Peso médio das conexões: {np.mean(pesos):.2f}")
         print(f"   Peso máximo das conexões: {np.max(pesos):.2f}")
         print(f"   Peso mínimo das conexões: {np.min(pesos):.2f}")
@@ -318,44 +413,30 @@ def main():
     print("-"*80)
     
     # Criar subgrafo apenas com nós conectados
-    G_conectado = G.subgraph([n for n in G.nodes if G.degree(n) > 0]).copy()
+    grafo_conectado = grafo.subgrafo(conectados)
     
-    if len(G_conectado.nodes) > 0:
-        comunidades = community_louvain.best_partition(G_conectado)
-        
-        # Adicionar comunidade aos nós
-        for node, comunidade_id in comunidades.items():
-            G.nodes[node]['comunidade'] = comunidade_id
-        
-        # Nós isolados recebem comunidade -1
-        for node in G.nodes:
-            if 'comunidade' not in G.nodes[node]:
-                G.nodes[node]['comunidade'] = -1
-        
-        print(f"   ✅ {len(set(comunidades.values()))} comunidades detectadas")
+    # Nós isolados recebem comunidade -1
+    comunidades = np.full(grafo.n, -1, dtype=np.int64)
+    if grafo_conectado.n > 0:
+        comunidades[conectados] = grafo_conectado.comunidades()
+        print(f"   ✅ {len(np.unique(comunidades[conectados]))} comunidades detectadas ({METODO_COMUNIDADES})")
     else:
         print("   ⚠️ Nenhum vendedor conectado. Pulando detecção de comunidades.")
-        for node in G.nodes:
-            G.nodes[node]['comunidade'] = -1
+    nx.set_node_attributes(G, dict(zip(grafo.vertices, comunidades.tolist())), 'comunidade')
     
     # 6. Extrair features básicas do grafo
     print("\n📊 EXTRAINDO FEATURES BÁSICAS DO GRAFO...")
     print("-"*80)
     
-    grafo_features = []
-    
-    for seller_id in G.nodes:
-        features = {
-            'seller_id': seller_id,
-            'grafo_num_conexoes': G.degree(seller_id),
-            'grafo_comunidade_id': G.nodes[seller_id].get('comunidade', -1),
-            'grafo_num_produtos': G.nodes[seller_id].get('num_produtos', 0),
-            'grafo_num_suspeitos': G.nodes[seller_id].get('num_produtos_suspeitos', 0),
-            'grafo_taxa_suspeita_vendedor': G.nodes[seller_id].get('taxa_suspeita', 0)
-        }
-        grafo_features.append(features)
-    
-    df_grafo_features = pd.DataFrame(grafo_features)
+    # Vértices do grafo na mesma ordem das linhas de `atributos`
+    df_grafo_features = pd.DataFrame({
+        'seller_id': atributos.index.to_numpy(),
+        'grafo_num_conexoes': graus,
+        'grafo_comunidade_id': comunidades,
+        'grafo_num_produtos': atributos['num_produtos'].to_numpy(),
+        'grafo_num_suspeitos': atributos['num_produtos_suspeitos'].to_numpy(),
+        'grafo_taxa_suspeita_vendedor': atributos['taxa_suspeita'].to_numpy(),
+    })
     print(f"   ✅ Features básicas extraídas: {len(df_grafo_features)} vendedores")
     
     # 7. Calcular features de comunidade
@@ -397,39 +478,7 @@ def main():
     print("\n📊 CALCULANDO FEATURES DE VIZINHANÇA...")
     print("-"*80)
     
-    df_vizinhanca = []
-    
-    for seller_id in G.nodes:
-        vizinhos = list(G.neighbors(seller_id))
-        
-        if len(vizinhos) > 0:
-            # Contar produtos suspeitos dos vizinhos
-            vizinhos_suspeitos = sum([G.nodes[v].get('num_produtos_suspeitos', 0) for v in vizinhos])
-            vizinhos_produtos_total = sum([G.nodes[v].get('num_produtos', 0) for v in vizinhos])
-            taxa_suspeita_vizinhos = vizinhos_suspeitos / vizinhos_produtos_total if vizinhos_produtos_total > 0 else 0
-            
-            # Peso total e médio das conexões
-            peso_total = sum([G[seller_id][v]['weight'] for v in vizinhos])
-            
-            df_vizinhanca.append({
-                'seller_id': seller_id,
-                'grafo_num_vizinhos': len(vizinhos),
-                'grafo_vizinhos_suspeitos': vizinhos_suspeitos,
-                'grafo_taxa_suspeita_vizinhos': taxa_suspeita_vizinhos,
-                'grafo_peso_total_conexoes': peso_total,
-                'grafo_peso_medio_conexoes': peso_total / len(vizinhos)
-            })
-        else:
-            df_vizinhanca.append({
-                'seller_id': seller_id,
-                'grafo_num_vizinhos': 0,
-                'grafo_vizinhos_suspeitos': 0,
-                'grafo_taxa_suspeita_vizinhos': 0,
-                'grafo_peso_total_conexoes': 0,
-                'grafo_peso_medio_conexoes': 0
-            })
-    
-    df_vizinhanca = pd.DataFrame(df_vizinhanca)
+    df_vizinhanca = features_vizinhanca(grafo, atributos)
     df_grafo_features = df_grafo_features.merge(df_vizinhanca, on='seller_id', how='left')
     
     print(f"   ✅ Features de vizinhança calculadas")
@@ -438,35 +487,31 @@ def main():
     print("\n📊 CALCULANDO MÉTRICAS DE CENTRALIDADE...")
     print("-"*80)
     
-    if len(G_conectado.nodes) > 0:
-        print("   🔢 Calculando betweenness centrality...")
-        betweenness = nx.betweenness_centrality(G_conectado)
-        
-        print("   🔢 Calculando closeness centrality...")
-        closeness = nx.closeness_centrality(G_conectado)
+    if grafo_conectado.n > 0:
+        # Exato em componentes de até PIPELINE_BETWEENNESS_PIVOS vendedores; acima disso, por pivôs sorteados
+        print("   🔢 Calculando betweenness e closeness centrality...")
+        betweenness, closeness, resumo = centralidades(grafo_conectado)
+        if resumo['componentes_amostradas']:
+            print(f"      {resumo['componentes_amostradas']} de {resumo['componentes']} componentes estimadas com "
+                  f"{resumo['pivos']} pivôs (semente {SEMENTE_CENTRALIDADE})")
+            print(f"      Erro máximo ({CONFIANCA_ERRO:.0%} de confiança): betweenness ±{resumo['erro_betweenness']:.4f}, "
+                  f"distância média ±{resumo['erro_distancia']:.2f}")
+        else:
+            print(f"      Cálculo exato ({resumo['componentes']} componentes)")
         
         print("   🔢 Calculando PageRank...")
-        pagerank = nx.pagerank(G_conectado)
-        
-        df_centralidade = []
-        for seller_id in G.nodes:
-            if seller_id in betweenness:
-                df_centralidade.append({
-                    'seller_id': seller_id,
-                    'grafo_betweenness': betweenness[seller_id],
-                    'grafo_closeness': closeness[seller_id],
-                    'grafo_pagerank': pagerank[seller_id]
-                })
-            else:
-                # Vendedor isolado
-                df_centralidade.append({
-                    'seller_id': seller_id,
-                    'grafo_betweenness': 0,
-                    'grafo_closeness': 0,
-                    'grafo_pagerank': 0
-                })
+        pagerank = grafo_conectado.pagerank()
         
-        df_centralidade = pd.DataFrame(df_centralidade)
+        # Vendedores isolados ficam com 0
+        df_centralidade = pd.DataFrame({
+            'seller_id': grafo.vertices.to_numpy(),
+            'grafo_betweenness': 0.0,
+            'grafo_closeness': 0.0,
+            'grafo_pagerank': 0.0,
+        })
+        df_centralidade.loc[conectados, 'grafo_betweenness'] = betweenness
+        df_centralidade.loc[conectados, 'grafo_closeness'] = closeness
+        df_centralidade.loc[conectados, 'grafo_pagerank'] = pagerank
         df_grafo_features = df_grafo_features.merge(df_centralidade, on='seller_id', how='left')
         
         print(f"   ✅ Métricas de centralidade calculadas")
@@ -481,7 +526,7 @@ def main():
     print("-"*80)
     
     # Merge por seller_id (vai replicar para todos os produtos do mesmo vendedor)
-    df_final = df.merge(df_grafo_features, on='seller_id', how='left')
+    df_final = sem_embeddings(df).merge(df_grafo_features, on='seller_id', how='left')
     
     # Preencher NaN para produtos sem features de grafo (se houver)
     grafo_cols = [col for col in df_final.columns if col.startswith('grafo_')]
@@ -491,15 +536,41 @@ def main():
     print(f"   ✅ Merge realizado: {len(df_final)} produtos")
     print(f"   ✅ Total de colunas: {len(df_final.columns)}")
     
+    if retornar_grafo:
+        return df_final, G
+    return df_final
+
+def main():
+    print("="*80)
+    print("🕸️ SCRIPT 7: CRIAR FEATURES DE GRAFO COM SIMILARIDADE SEMÂNTICA")
+    print("="*80)
+    
+    # 1. Carregar dados
+    print("\n📂 CARREGANDO DADOS...")
+    print("-"*80)
+    
+    df = ler_tabela(localizar_dataset())
+    # Só id, pHash e grupo de quase-duplicatas são usados na camada de imagens compartilhadas
+    df_hashes = ler_tabela(tabela_mais_recente(SCRIPT_5_DIR, NOME_HASHES), colunas=['id_anuncio', 'phash', 'grupo_imagem'])
+    
+    print(f"   ✅ Dataset principal: {len(df)} produtos")
+    print(f"   ✅ Hashes de imagens: {len(df_hashes)} imagens")
+    
+    df_final, G = processar(df, df_hashes, retornar_grafo=True)
+    grafo_cols = [col for col in df_final.columns if col.startswith('grafo_')]
+    
     # 11. Salvar dataset final
     print("\n💾 SALVANDO DATASET FINAL...")
     print("-"*80)
     
-    df_final.to_csv(PATH_OUTPUT, index=False)
+    arquivo_saida = salvar_tabela(df_final, SCRIPT_7_DIR, NOME_OUTPUT)
     
-    print(f"   ✅ Salvo: {os.path.abspath(PATH_OUTPUT)}")
+    print(f"   ✅ Salvo: {os.path.abspath(arquivo_saida)}")
     print(f"   📊 Shape: ({len(df_final)}, {len(df_final.columns)})")
     
+    path_nos, path_arestas = salvar_grafo(G)
+    print(f"   ✅ Grafo salvo: {path_nos.name}, {path_arestas.name}")
+    
     # 10. Resumo final
     print("\n" + "="*80)
     print("📈 RESUMO FINAL")
@@ -551,7 +622,7 @@ def main():
     print("✅ SCRIPT 5 CONCLUÍDO COM SUCESSO!")
     print("="*80)
     
-    print(f"\n📁 Próximo passo: Usar o modelo treinado com {PATH_OUTPUT}")
+    print(f"\n📁 Próximo passo: Usar o modelo treinado com {arquivo_saida}")
     print(f"   Total de features: {len(df_final.columns)} (incluindo 12 de grafo)")
 
 if __name__ == "__main__":
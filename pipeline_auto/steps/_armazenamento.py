@@ -0,0 +1,154 @@
+"""
+=============================================================================
+ARMAZENAMENTO DAS TABELAS INTERMEDIÁRIAS DO PIPELINE
+=============================================================================
+Grava e lê as tabelas passadas de uma etapa para a outra no formato escolhido
+em PIPELINE_FORMATO:
+
+- parquet (padrão): colunar, tipado e comprimido com zstd
+- arrow: Arrow IPC (Feather v2), leitura mais rápida e arquivos um pouco maiores
+- csv: formato antigo, mantido para inspeção manual e compatibilidade
+
+Parquet e Arrow guardam os tipos das colunas: a etapa seguinte recebe o
+DataFrame como foi gravado, sem reinferir tipos nem reparsear texto. As
+leituras aceitam `colunas` (projeção): só as colunas pedidas saem do disco.
+
+Os leitores aceitam qualquer um dos três formatos (pela extensão do arquivo),
+então trocar PIPELINE_FORMATO não exige reprocessar as etapas anteriores:
+vale sempre o arquivo mais recente, como antes.
+
+Colunas de objetos (dicionários, listas, tipos misturados) são gravadas como
+texto, do mesmo jeito que o to_csv faria, para que as etapas seguintes as
+interpretem igual em qualquer formato.
+
+Sem pyarrow instalado, parquet/arrow recaem em csv (com aviso).
+"""
+
+import os
+from pathlib import Path
+
+import pandas as pd
+
+# Formato -> extensão do arquivo
+EXTENSOES_TABELA = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+FORMATO_PADRAO = "parquet"
+COMPRESSAO = "zstd"
+
+_formato = None
+
+
+def formato_configurado():
+    """Formato de gravação (PIPELINE_FORMATO), validado na primeira chamada"""
+    global _formato
+    if _formato is None:
+        formato = os.getenv("PIPELINE_FORMATO", FORMATO_PADRAO).strip().lower()
+        if formato not in EXTENSOES_TABELA:
+            print(f"   ⚠️ PIPELINE_FORMATO='{formato}' inválido; usando {FORMATO_PADRAO}")
+            formato = FORMATO_PADRAO
+        if formato != "csv":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                print(f"   ⚠️ pyarrow não encontrado; gravando tabelas em CSV (pip install pyarrow)")
+                formato = "csv"
+        _formato = formato
+    return _formato
+
+
+def caminho_tabela(pasta, nome):
+    """Caminho da tabela `nome` (sem extensão) no formato configurado"""
+    return Path(pasta) / f"{nome}{EXTENSOES_TABELA[formato_configurado()]}"
+
+
+def _colunas_como_texto(df):
+    """Converte em texto (como o to_csv) as colunas de objetos que o Arrow não tipa"""
+    import pyarrow as pa
+
+    convertidas = {}
+    for coluna in df.columns[df.dtypes == object]:
+        serie = df[coluna]
+        try:
+            tipo = pa.array(serie, from_pandas=True).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            tipo = None
+        if tipo is None or pa.types.is_nested(tipo):
+            convertidas[coluna] = serie.map(str).where(serie.notna())
+    return df.assign(**convertidas) if convertidas else df
+
+
+def salvar_tabela(df, pasta, nome):
+    """Grava o DataFrame no formato configurado e retorna o caminho"""
+    caminho = caminho_tabela(pasta, nome)
+    formato = formato_configurado()
+    if formato != "csv":
+        df = _colunas_como_texto(df)
+    if formato == "parquet":
+        df.to_parquet(caminho, index=False, compression=COMPRESSAO)
+    elif formato == "arrow":
+        df.reset_index(drop=True).to_feather(caminho, compression=COMPRESSAO)
+    else:
+        df.to_csv(caminho, index=False)
+    return caminho
+
+
+def colunas_tabela(arquivo):
+    """Nomes das colunas sem ler os dados"""
+    arquivo = Path(arquivo)
+    if arquivo.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.read_schema(arquivo).names
+    if arquivo.suffix == ".arrow":
+        import pyarrow.ipc as ipc
+        with ipc.open_file(arquivo) as leitor:
+            return leitor.schema.names
+    return list(pd.read_csv(arquivo, nrows=0, encoding="utf-8-sig").columns)
+
+
+def ler_tabela(arquivo, colunas=None, dtype=None):
+    """
+    Lê uma tabela em qualquer formato suportado (pela extensão).
+
+    colunas: projeção; colunas pedidas que não existem no arquivo são ignoradas
+    dtype: tipos forçados (aplicados na leitura do CSV e convertidos nos demais)
+    """
+    arquivo = Path(arquivo)
+    if colunas is not None:
+        existentes = set(colunas_tabela(arquivo))
+        colunas = [c for c in colunas if c in existentes]
+
+    if arquivo.suffix == ".parquet":
+        df = pd.read_parquet(arquivo, columns=colunas)
+    elif arquivo.suffix == ".arrow":
+        df = pd.read_feather(arquivo, columns=colunas)
+    else:
+        return pd.read_csv(arquivo, usecols=colunas, dtype=dtype, encoding="utf-8-sig")
+
+    if dtype:
+        df = df.astype({c: t for c, t in dtype.items() if c in df.columns})
+    return df
+
+
+def contar_linhas_tabela(arquivo):
+    """Número de registros (Parquet pelos metadados; Arrow lendo só a primeira coluna)"""
+    arquivo = Path(arquivo)
+    if arquivo.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(arquivo).metadata.num_rows
+    if arquivo.suffix == ".arrow":
+        import pyarrow.feather as feather
+        return feather.read_table(arquivo, columns=colunas_tabela(arquivo)[:1]).num_rows
+    # usecols=[0]: conta registros (inclusive com quebras de linha em campos) sem montar as colunas
+    return len(pd.read_csv(arquivo, usecols=[0], encoding="utf-8-sig"))
+
+
+def tabela_mais_recente(pasta, prefixo=""):
+    """Tabela mais recente da pasta cujo nome começa com `prefixo` (qualquer formato), ou None"""
+    candidatos = [
+        arquivo
+        for extensao in EXTENSOES_TABELA.values()
+        for arquivo in Path(pasta).glob(f"{prefixo}*{extensao}")
+        if arquivo.is_file()
+    ]
+    if not candidatos:
+        return None
+    return max(candidatos, key=lambda x: x.stat().st_mtime)
@@ -0,0 +1,265 @@
+"""
+=============================================================================
+CACHE EM DISCO DE RESPOSTAS DA API (SQLITE)
+=============================================================================
+Guarda respostas da OpenAI entre execuções em data/cache/<nome>.sqlite. A chave
+é um hash do conteúdo normalizado da requisição (ex.: título + descrição), então
+anúncios com o mesmo texto, no mesmo crawl ou em crawls seguintes, não voltam à
+API.
+
+Invalidação: cada cache tem uma `versao` (ex.: modelo + hash do prompt). Ao
+abrir o cache, as entradas de outras versões são apagadas; mudar o prompt ou
+o modelo descarta as respostas antigas automaticamente.
+
+- PIPELINE_CACHE_LLM=0 desliga os caches (toda requisição vai para a API)
+- acertos/faltas da execução ficam em estatisticas(); o total de acessos de
+  cada entrada fica gravado na tabela
+
+Embeddings (CacheEmbeddings, data/cache/embeddings.sqlite): chave = hash do
+modelo + texto exato enviado, vetor gravado em float32 (6 KB por vetor de 1536
+posições). O mesmo texto em outro campo, anúncio ou execução reaproveita o
+vetor. O tamanho é limitado por PIPELINE_CACHE_EMBEDDINGS_MB (padrão 1024): acima
+disso, os vetores acessados há mais tempo são descartados (LRU).
+
+Seguro para uso pelas threads do pool de requisições (uma conexão com lock).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+from _config import DATA_DIR
+
+CACHE_DIR = DATA_DIR / "cache"
+LIMITE_EMBEDDINGS_MB = float(os.getenv("PIPELINE_CACHE_EMBEDDINGS_MB", "1024"))
+# Consultas IN (...) em blocos (limite de variáveis do SQLite)
+BLOCO_CONSULTA = 500
+
+
+def cache_ativo():
+    """False se PIPELINE_CACHE_LLM desliga os caches (respostas e embeddings)"""
+    return os.getenv("PIPELINE_CACHE_LLM", "1").strip().lower() not in ("0", "false", "nao", "não")
+
+
+def normalizar_texto(texto):
+    """Texto comparável entre crawls: NFC, minúsculas e espaços colapsados ('nan'/None viram '')"""
+    if texto is None:
+        return ""
+    texto = str(texto)
+    if texto.strip().lower() == "nan":
+        return ""
+    return " ".join(unicodedata.normalize("NFC", texto).lower().split())
+
+
+def chave_cache(*partes):
+    """Hash das partes normalizadas da requisição"""
+    normalizadas = [normalizar_texto(p) if isinstance(p, str) or p is None else p for p in partes]
+    return hashlib.sha256(json.dumps(normalizadas, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+class CacheRespostas:
+    """Respostas por chave de conteúdo, válidas enquanto a versão não muda"""
+
+    def __init__(self, nome, versao, pasta=CACHE_DIR):
+        self.versao = str(versao)
+        self.caminho = Path(pasta) / f"{nome}.sqlite"
+        self.acertos = 0
+        self.faltas = 0
+        self.invalidadas = 0
+        self._lock = threading.Lock()
+
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS respostas ("
+            " chave TEXT PRIMARY KEY,"
+            " versao TEXT NOT NULL,"
+            " valor TEXT NOT NULL,"
+            " criado_em REAL NOT NULL,"
+            " acessado_em REAL NOT NULL,"
+            " acessos INTEGER NOT NULL DEFAULT 0)"
+        )
+        with self._conexao:
+            self.invalidadas = self._conexao.execute(
+                "DELETE FROM respostas WHERE versao != ?", (self.versao,)
+            ).rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+
+    def obter(self, chave):
+        """Resposta gravada para a chave, ou None (conta acerto/falta)"""
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT valor FROM respostas WHERE chave = ? AND versao = ?", (chave, self.versao)
+            ).fetchone()
+            if linha is None:
+                self.faltas += 1
+                return None
+            self.acertos += 1
+            with self._conexao:
+                self._conexao.execute(
+                    "UPDATE respostas SET acessado_em = ?, acessos = acessos + 1 WHERE chave = ?",
+                    (time.time(), chave)
+                )
+            return linha[0]
+
+    def registrar(self, chave, valor):
+        agora = time.time()
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas (chave, versao, valor, criado_em, acessado_em, acessos)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (chave, self.versao, valor, agora, agora)
+            )
+
+    def remover(self, chave):
+        """Descarta uma entrada (ex.: resposta gravada que não passa mais na validação)"""
+        with self._lock, self._conexao:
+            self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+
+    def estatisticas(self):
+        consultas = self.acertos + self.faltas
+        return {
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            "invalidadas": self.invalidadas,
+            "entradas": len(self),
+        }
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+
+class CacheEmbeddings:
+    """Vetores float32 por hash de modelo + texto, com descarte LRU por tamanho"""
+
+    def __init__(self, nome="embeddings", limite_mb=LIMITE_EMBEDDINGS_MB, pasta=CACHE_DIR):
+        self.caminho = Path(pasta) / f"{nome}.sqlite"
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.acertos = 0
+        self.faltas = 0
+        self.descartados = 0
+        self._lock = threading.Lock()
+
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " chave TEXT PRIMARY KEY,"
+            " modelo TEXT NOT NULL,"
+            " vetor BLOB NOT NULL,"
+            " criado_em REAL NOT NULL,"
+            " acessado_em REAL NOT NULL,"
+            " acessos INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_acesso ON embeddings (acessado_em)")
+        self._bytes = self._conexao.execute(
+            "SELECT COALESCE(SUM(LENGTH(vetor)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    @staticmethod
+    def chave(modelo, texto):
+        """Hash do modelo + texto exato (o embedding depende de cada caractere)"""
+        return hashlib.sha256(f"{modelo}\x00{texto}".encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        with self._lock:
+            return self._conexao.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def obter_varios(self, chaves):
+        """Dict chave -> vetor (lista de floats) das chaves presentes (conta acertos/faltas)"""
+        chaves = list(dict.fromkeys(chaves))
+        encontrados = {}
+        with self._lock:
+            for inicio in range(0, len(chaves), BLOCO_CONSULTA):
+                bloco = chaves[inicio:inicio + BLOCO_CONSULTA]
+                marcadores = ",".join("?" * len(bloco))
+                for chave, vetor in self._conexao.execute(
+                        f"SELECT chave, vetor FROM embeddings WHERE chave IN ({marcadores})", bloco):
+                    encontrados[chave] = np.frombuffer(vetor, dtype=np.float32).tolist()
+            if encontrados:
+                agora = time.time()
+                with self._conexao:
+                    self._conexao.executemany(
+                        "UPDATE embeddings SET acessado_em = ?, acessos = acessos + 1 WHERE chave = ?",
+                        [(agora, chave) for chave in encontrados]
+                    )
+            self.acertos += len(encontrados)
+            self.faltas += len(chaves) - len(encontrados)
+        return encontrados
+
+    def registrar_varios(self, modelo, itens):
+        """Grava [(chave, vetor)] e descarta os menos usados se passar do limite"""
+        agora = time.time()
+        linhas = [
+            (chave, modelo, np.asarray(vetor, dtype=np.float32).tobytes(), agora, agora)
+            for chave, vetor in itens
+        ]
+        with self._lock:
+            with self._conexao:
+                for chave, *_ in linhas:
+                    antigo = self._conexao.execute(
+                        "SELECT LENGTH(vetor) FROM embeddings WHERE chave = ?", (chave,)
+                    ).fetchone()
+                    if antigo:
+                        self._bytes -= antigo[0]
+                self._conexao.executemany(
+                    "INSERT OR REPLACE INTO embeddings (chave, modelo, vetor, criado_em, acessado_em, acessos)"
+                    " VALUES (?, ?, ?, ?, ?, 0)",
+                    linhas
+                )
+            self._bytes += sum(len(linha[2]) for linha in linhas)
+            if self._bytes > self.limite_bytes:
+                self._descartar_antigos()
+
+    def _descartar_antigos(self):
+        """LRU: remove os vetores acessados há mais tempo até ficar em 90% do limite"""
+        alvo = int(self.limite_bytes * 0.9)
+        with self._conexao:
+            while self._bytes > alvo:
+                antigos = self._conexao.execute(
+                    "SELECT chave, LENGTH(vetor) FROM embeddings ORDER BY acessado_em LIMIT 1000"
+                ).fetchall()
+                if not antigos:
+                    break
+                liberar, remover = 0, []
+                for chave, tamanho in antigos:
+                    remover.append((chave,))
+                    liberar += tamanho
+                    if self._bytes - liberar <= alvo:
+                        break
+                self._conexao.executemany("DELETE FROM embeddings WHERE chave = ?", remover)
+                self._bytes -= liberar
+                self.descartados += len(remover)
+
+    def estatisticas(self):
+        consultas = self.acertos + self.faltas
+        return {
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            "descartados": self.descartados,
+            "entradas": len(self),
+            "tamanho_mb": self._bytes / (1024 * 1024),
+        }
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
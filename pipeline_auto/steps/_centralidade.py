@@ -0,0 +1,259 @@
+"""
+=============================================================================
+BETWEENNESS E CLOSENESS DO GRAFO DE VENDEDORES (SCRIPT 7)
+=============================================================================
+O betweenness exato (Brandes) faz uma busca em largura a partir de cada
+vendedor: O(V·E) em Python puro, o gargalo do Script 7 a partir de alguns
+milhares de vendedores conectados. Aqui:
+
+- cada componente conexa é tratada à parte (não há caminhos entre componentes)
+- em cada componente, as buscas partem de no máximo PIPELINE_BETWEENNESS_PIVOS
+  vendedores (padrão 500; 0 = todos) sorteados com PIPELINE_CENTRALIDADE_SEMENTE
+  (padrão 42). Componentes com até esse número de vendedores têm valor exato
+- betweenness: dependências acumuladas a partir dos pivôs, escaladas como em
+  nx.betweenness_centrality(k=...) (estimador de Brandes e Pich)
+- closeness: a soma das distâncias de cada vendedor é estimada pelas distâncias
+  até os mesmos pivôs (Eppstein e Wang)
+- as buscas de vários pivôs andam juntas, nível a nível, em multiplicações de
+  matrizes esparsas (fronteira x adjacência), sem laço em Python por vértice
+- as buscas são divididas em tarefas de até PIVOS_POR_TAREFA pivôs, executadas
+  no pool de processos (_processos.py, PIPELINE_PROCESSOS)
+
+O resultado depende só da semente e do número de pivôs, não do número de
+processos: as tarefas são sempre as mesmas e somadas na mesma ordem. Sem
+amostragem, os valores são os de nx.betweenness_centrality e
+nx.closeness_centrality (sem pesos).
+
+Limite de erro (desigualdade de Hoeffding, que vale para amostragem sem
+reposição): com k pivôs numa componente de n vendedores, num grafo de N, o
+betweenness normalizado de cada vendedor fica a até
+R * sqrt(ln(2 / (1 - CONFIANCA_ERRO)) / (2 (k - 1))) do exato, com
+R = (n - 1)(n - 2) / ((N - 1)(N - 2)), com probabilidade CONFIANCA_ERRO.
+Para a distância média usada no closeness, R = diâmetro da componente (limitado
+por 2x a menor excentricidade entre os pivôs).
+"""
+
+import os
+from math import log, sqrt
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from _processos import PROCESSOS_PADRAO, mapear_em_processos
+
+PIVOS_BETWEENNESS = max(0, int(os.getenv("PIPELINE_BETWEENNESS_PIVOS", "500")))
+SEMENTE_CENTRALIDADE = int(os.getenv("PIPELINE_CENTRALIDADE_SEMENTE", "42"))
+
+# Probabilidade com que os limites de erro informados valem
+CONFIANCA_ERRO = 0.95
+
+# Buscas em largura por tarefa do pool (fixo: não depende do número de processos)
+PIVOS_POR_TAREFA = 32
+# Abaixo disso as tarefas rodam no processo atual
+MINIMO_TAREFAS_POOL = 8
+# Memória das matrizes de uma busca (pivôs x vendedores da componente)
+MEMORIA_BUSCAS_MB = 64
+
+# Grafo do processo (preenchido por inicializar() em cada processo do pool)
+_ESTADO = {}
+
+
+def inicializar(adjacencia, limites):
+    """Guarda a adjacência (vendedores agrupados por componente) no processo"""
+    _ESTADO.clear()
+    _ESTADO.update(adjacencia=adjacencia, limites=limites, componentes={})
+
+
+def _componente(c):
+    """Adjacência CSR (binária, sem laços) da componente c, com vértices numerados de 0 a n - 1"""
+    if c not in _ESTADO["componentes"]:
+        inicio, fim = _ESTADO["limites"][c], _ESTADO["limites"][c + 1]
+        _ESTADO["componentes"][c] = _ESTADO["adjacencia"][inicio:fim, inicio:fim]
+    return _ESTADO["componentes"][c]
+
+
+def _brandes(adjacencia, pivos):
+    """
+    Buscas em largura a partir de cada pivô, todas ao mesmo tempo: a fronteira de
+    cada nível é uma matriz esparsa (pivôs x vértices) multiplicada pela adjacência.
+    Retorna (dependências de Brandes somadas, distâncias somadas, excentricidade de cada pivô).
+    """
+    n, b = adjacencia.shape[0], len(pivos)
+    linhas = np.arange(b)
+    distancia = np.full((b, n), -1, dtype=np.int32)
+    caminhos = np.zeros((b, n))
+    distancia[linhas, pivos] = 0
+    caminhos[linhas, pivos] = 1.0
+
+    # Ida: número de caminhos mínimos (sigma) até cada vértice, nível a nível
+    niveis = [(linhas, pivos)]
+    while True:
+        linha, vertice = niveis[-1]
+        fronteira = csr_matrix((caminhos[linha, vertice], (linha, vertice)), shape=(b, n))
+        vizinhos = (fronteira @ adjacencia).tocoo()
+        novos = distancia[vizinhos.row, vizinhos.col] < 0
+        if not novos.any():
+            break
+        linha, vertice = vizinhos.row[novos], vizinhos.col[novos]
+        distancia[linha, vertice] = len(niveis)
+        caminhos[linha, vertice] = vizinhos.data[novos]
+        niveis.append((linha, vertice))
+
+    # Volta: dependência de cada vértice, do nível mais distante até o nível 1
+    dependencia = np.zeros((b, n))
+    for nivel in range(len(niveis) - 1, 1, -1):
+        linha, vertice = niveis[nivel]
+        coeficientes = csr_matrix(
+            ((1 + dependencia[linha, vertice]) / caminhos[linha, vertice], (linha, vertice)), shape=(b, n)
+        )
+        somas = (coeficientes @ adjacencia).tocoo()
+        anteriores = distancia[somas.row, somas.col] == nivel - 1
+        linha, vertice = somas.row[anteriores], somas.col[anteriores]
+        dependencia[linha, vertice] += caminhos[linha, vertice] * somas.data[anteriores]
+
+    return dependencia.sum(axis=0), distancia.sum(axis=0, dtype=np.int64), distancia.max(axis=1).tolist()
+
+
+def _buscas(c, pivos):
+    """(dependências somadas, distâncias somadas, excentricidade de cada pivô) das buscas a partir de `pivos`"""
+    adjacencia = _componente(c)
+    n = adjacencia.shape[0]
+    dependencias, distancias = np.zeros(n), np.zeros(n)
+    excentricidades = []
+    # Matrizes pivôs x vértices da busca: distância (int32), caminhos e dependência (float64)
+    linhas = max(1, int(MEMORIA_BUSCAS_MB * 1024 * 1024 // (20 * n)))
+    for inicio in range(0, len(pivos), linhas):
+        parcial = _brandes(adjacencia, pivos[inicio:inicio + linhas])
+        dependencias += parcial[0]
+        distancias += parcial[1]
+        excentricidades.extend(parcial[2])
+    return dependencias, distancias, excentricidades
+
+
+def calcular_tarefas(tarefas):
+    """Executa uma lista de tarefas [(componente, pivôs), ...] (função enviada ao pool)"""
+    return [[_buscas(c, pivos) for c, pivos in tarefa] for tarefa in tarefas]
+
+
+def _sortear_pivos(n, pivos, semente, c):
+    """Índices (ordenados) dos pivôs da componente c; todos os vértices se ela tiver até `pivos`"""
+    if pivos == 0 or n <= pivos:
+        return np.arange(n)
+    rng = np.random.default_rng([semente, c])
+    return np.sort(rng.choice(n, size=max(2, pivos), replace=False))
+
+
+def _montar_tarefas(pivos_por_componente):
+    """Agrupa as buscas em tarefas de até PIVOS_POR_TAREFA pivôs (componentes pequenas dividem uma tarefa)"""
+    tarefas, atual, tamanho = [], [], 0
+    for c, pivos in enumerate(pivos_por_componente):
+        for inicio in range(0, len(pivos), PIVOS_POR_TAREFA):
+            parte = pivos[inicio:inicio + PIVOS_POR_TAREFA]
+            if tamanho + len(parte) > PIVOS_POR_TAREFA and atual:
+                tarefas.append(atual)
+                atual, tamanho = [], 0
+            atual.append((c, parte))
+            tamanho += len(parte)
+    if atual:
+        tarefas.append(atual)
+    return tarefas
+
+
+def centralidades(grafo, pivos=PIVOS_BETWEENNESS, semente=SEMENTE_CENTRALIDADE, processos=PROCESSOS_PADRAO,
+                  componentes_de=None):
+    """
+    Betweenness e closeness (normalizados como no networkx, sem pesos) de cada vértice
+    de `grafo` (GrafoVendedores, _grafo_backend.py).
+
+    componentes_de: posições de vértices; se informado, só as componentes deles são
+    calculadas (mesmos pivôs e valores do cálculo completo; nas demais, 0). Usado
+    pela pontuação incremental para o vendedor de um anúncio novo.
+
+    Retorna (betweenness, closeness, resumo): arrays alinhados com grafo.vertices e um
+    dict com componentes, componentes_amostradas, pivos, erro_betweenness e
+    erro_distancia (limites com probabilidade CONFIANCA_ERRO; 0 quando o cálculo é exato).
+    """
+    total = grafo.n
+    rotulos = np.asarray(grafo.vertices)
+    # Ordem determinística: componentes maiores primeiro, vértices ordenados dentro de cada uma
+    componente = grafo.componentes()
+    ordem = np.lexsort((rotulos, componente))
+    componentes = np.split(ordem, np.flatnonzero(np.diff(componente[ordem])) + 1) if total else []
+    componentes.sort(key=lambda c: (-len(c), rotulos[c[0]]))
+    ordem = np.concatenate(componentes) if componentes else np.zeros(0, dtype=np.int64)
+    limites = np.cumsum([0] + [len(c) for c in componentes])
+    adjacencia = grafo.vizinhanca[ordem][:, ordem].tocsr()
+    # Laços (vendedor ligado a ele mesmo) não fazem parte de caminho mínimo
+    adjacencia.setdiag(0)
+    adjacencia.eliminate_zeros()
+
+    # A semente dos pivôs de cada componente é a posição dela nessa ordem (do grafo inteiro)
+    calcular = np.ones(len(componentes), dtype=bool)
+    if componentes_de is not None:
+        indice_componente = np.empty(total, dtype=np.int64)
+        indice_componente[ordem] = np.repeat(np.arange(len(componentes)), np.diff(limites))
+        calcular[:] = False
+        calcular[indice_componente[np.asarray(componentes_de, dtype=np.int64)]] = True
+    pivos_por_componente = [
+        _sortear_pivos(len(c), pivos, semente, i) if calcular[i] else np.zeros(0, dtype=np.int64)
+        for i, c in enumerate(componentes)
+    ]
+    tarefas = _montar_tarefas(pivos_por_componente)
+    try:
+        resultados = mapear_em_processos(
+            calcular_tarefas, tarefas, processos=processos, inicializador=inicializar,
+            argumentos_inicializador=(adjacencia, limites), minimo_para_pool=MINIMO_TAREFAS_POOL
+        )
+    finally:
+        _ESTADO.clear()
+
+    dependencias = np.zeros(total)
+    distancias = np.zeros(total)
+    excentricidades = [[] for _ in componentes]
+    for tarefa, resultado in zip(tarefas, resultados):
+        for (c, _), (parcial_dependencias, parcial_distancias, parcial_excentricidades) in zip(tarefa, resultado):
+            dependencias[limites[c]:limites[c + 1]] += parcial_dependencias
+            distancias[limites[c]:limites[c + 1]] += parcial_distancias
+            excentricidades[c].extend(parcial_excentricidades)
+
+    betweenness = np.zeros(total)
+    closeness = np.zeros(total)
+    fator_erro = sqrt(log(2 / (1 - CONFIANCA_ERRO)) / 2)
+    erro_betweenness = erro_distancia = 0.0
+    amostradas = 0
+    for c, pivos_c in enumerate(pivos_por_componente):
+        if not calcular[c]:
+            continue
+        inicio, fim = limites[c], limites[c + 1]
+        n, k = fim - inicio, len(pivos_c)
+        # Um pivô não é fonte para ele mesmo: estima a partir dos outros k - 1 (como o networkx)
+        escala = np.full(n, (n - 1) / k)
+        if k > 1:
+            escala[pivos_c] = (n - 1) / (k - 1)
+        if k < n:
+            amostradas += 1
+            erro_distancia = max(erro_distancia, float(2 * min(excentricidades[c]) * fator_erro / sqrt(k - 1)))
+            if total > 2:
+                erro_betweenness = max(
+                    erro_betweenness, float((n - 1) * (n - 2) / ((total - 1) * (total - 2)) * fator_erro / sqrt(k - 1))
+                )
+
+        if total > 2:
+            betweenness[inicio:fim] = dependencias[inicio:fim] * escala / ((total - 1) * (total - 2))
+        # Closeness de Wasserman e Faust (padrão do networkx): (n - 1) / soma das distâncias * (n - 1) / (N - 1)
+        soma_distancias = distancias[inicio:fim] * escala
+        if n > 1:
+            positivas = soma_distancias > 0
+            closeness[inicio:fim][positivas] = (n - 1.0) / soma_distancias[positivas] * ((n - 1.0) / (total - 1))
+
+    resumo = {
+        "componentes": len(componentes),
+        "componentes_amostradas": amostradas,
+        "pivos": pivos,
+        "erro_betweenness": erro_betweenness,
+        "erro_distancia": erro_distancia,
+    }
+    # Volta para a ordem de grafo.vertices
+    posicao = np.empty(total, dtype=np.int64)
+    posicao[ordem] = np.arange(total)
+    return betweenness[posicao], closeness[posicao], resumo
@@ -0,0 +1,136 @@
+"""
+=============================================================================
+CHECKPOINT POR ITEM DAS ETAPAS LONGAS (2, 4 e 5)
+=============================================================================
+Cada item concluído é gravado numa linha de data/checkpoints/<nome>.jsonl
+(id do item + assinatura do conteúdo que gerou o resultado + resultado) e o
+arquivo é sincronizado em disco (fsync). Se a etapa morrer no meio, a próxima
+execução com PIPELINE_RESUMIR=1 (pipeline.py --resumir) reaproveita os itens já
+gravados e só refaz o restante.
+
+- A assinatura inclui o texto/URL e o modelo usados: se o item mudou, ele é
+  refeito mesmo em modo de retomada.
+- Sem PIPELINE_RESUMIR o checkpoint anterior é descartado no início da etapa.
+- Ao final da etapa com sucesso o arquivo é removido (concluir()).
+- Uma última linha cortada pela queda do processo é ignorada na leitura e
+  removida do arquivo antes de novos registros serem acrescentados.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+from _config import DATA_DIR
+
+CHECKPOINTS_DIR = DATA_DIR / "checkpoints"
+
+
+def retomada_ativa():
+    """True se a execução atual deve continuar de um checkpoint existente"""
+    return os.getenv("PIPELINE_RESUMIR", "0").strip().lower() in ("1", "true", "sim")
+
+
+def assinatura_conteudo(*partes):
+    """Hash curto do conteúdo que determina o resultado de um item"""
+    h = hashlib.sha1()
+    for parte in partes:
+        h.update(json.dumps(parte, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class Checkpoint:
+    """Resultados por item de uma etapa, persistidos a cada item concluído"""
+
+    def __init__(self, nome, resumir=None, sincronizar_a_cada=1):
+        self.caminho = CHECKPOINTS_DIR / f"{nome}.jsonl"
+        self.sincronizar_a_cada = max(1, sincronizar_a_cada)
+        self.itens = {}
+        self._pendentes = 0
+
+        CHECKPOINTS_DIR.mkdir(parents=True, exist_ok=True)
+        if resumir is None:
+            resumir = retomada_ativa()
+        if resumir:
+            self._carregar()
+            modo = "a"
+        else:
+            modo = "w"
+        self._arquivo = open(self.caminho, modo, encoding="utf-8")
+
+    def _carregar(self):
+        """Lê os itens gravados e prepara o arquivo para novos registros (ver _reparar_final)"""
+        if not self.caminho.exists():
+            return
+        completo, cortada = 0, b""
+        with open(self.caminho, "rb") as f:
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    cortada = linha  # só a última linha pode não ter quebra
+                    break
+                completo += len(linha)
+                self._ler_registro(linha)
+        if cortada:
+            self._reparar_final(completo, cortada)
+
+    def _ler_registro(self, linha):
+        """Guarda o item da linha; False se ela não é um registro válido"""
+        try:
+            registro = json.loads(linha)
+            self.itens[registro["id"]] = (registro["assinatura"], registro["valor"])
+            return True
+        except (ValueError, KeyError, TypeError):
+            return False  # linha incompleta (queda durante a escrita)
+
+    def _reparar_final(self, completo, cortada):
+        """
+        Última linha sem quebra (queda durante a escrita): se o registro está inteiro,
+        completa a linha; se não, corta o arquivo no fim da última linha completa.
+        Sem isso o próximo registro seria colado nela e os dois se perderiam.
+        """
+        with open(self.caminho, "r+b") as f:
+            if self._ler_registro(cortada):
+                f.seek(0, os.SEEK_END)
+                f.write(b"\n")
+            else:
+                f.truncate(completo)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __len__(self):
+        return len(self.itens)
+
+    def obter(self, chave, assinatura):
+        """Resultado gravado para o item, ou None se não existe ou o conteúdo mudou"""
+        registro = self.itens.get(str(chave))
+        if registro is None or registro[0] != assinatura:
+            return None
+        return registro[1]
+
+    def registrar(self, chave, assinatura, valor):
+        """Grava o resultado do item (durável após o próximo fsync)"""
+        chave = str(chave)
+        self.itens[chave] = (assinatura, valor)
+        self._arquivo.write(json.dumps({"id": chave, "assinatura": assinatura, "valor": valor},
+                                       ensure_ascii=False) + "\n")
+        self._pendentes += 1
+        if self._pendentes >= self.sincronizar_a_cada:
+            self.sincronizar()
+
+    def sincronizar(self):
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self._pendentes = 0
+
+    def fechar(self):
+        if not self._arquivo.closed:
+            self.sincronizar()
+            self._arquivo.close()
+
+    def concluir(self):
+        """Etapa terminou com sucesso: o checkpoint não é mais necessário"""
+        self.fechar()
+        self.caminho.unlink(missing_ok=True)
@@ -0,0 +1,125 @@
+"""
+=============================================================================
+DOWNLOAD CONCORRENTE DE IMAGENS (SCRIPT 5)
+=============================================================================
+As imagens vêm quase todas do mesmo CDN (mlstatic). Em vez de um requests.get
+por imagem com pausa fixa entre elas:
+
+- uma requests.Session compartilhada pelas threads, com pool de conexões
+  keep-alive (HTTPAdapter) do tamanho da concorrência
+- PIPELINE_IMAGENS_CONCORRENCIA: downloads simultâneos (padrão 8)
+- PIPELINE_IMAGENS_RPS: início de downloads por segundo em cada host (padrão 10)
+- PIPELINE_IMAGENS_TENTATIVAS: tentativas em falha de conexão, 429 e 5xx, com
+  backoff exponencial e respeito ao Retry-After (padrão 3)
+
+O host sai da própria URL, então o Script 5 pode ser testado contra um servidor
+HTTP local que faça o papel do CDN (ex.: http://127.0.0.1:8000/img/...).
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CONCORRENCIA_IMAGENS = max(1, int(os.getenv("PIPELINE_IMAGENS_CONCORRENCIA", "8")))
+RPS_POR_HOST = float(os.getenv("PIPELINE_IMAGENS_RPS", "10"))
+TENTATIVAS_IMAGENS = max(1, int(os.getenv("PIPELINE_IMAGENS_TENTATIVAS", "3")))
+
+# Headers para simular navegador
+HEADERS_DOWNLOAD = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+class LimitadorPorHost:
+    """Espaça o início das requisições a um mesmo host em 1/rps segundos"""
+
+    def __init__(self, rps=RPS_POR_HOST):
+        self.intervalo = 1.0 / rps if rps > 0 else 0.0
+        self._proximo = {}
+        self._lock = threading.Lock()
+
+    def aguardar(self, url):
+        if not self.intervalo:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            agora = time.monotonic()
+            inicio = max(agora, self._proximo.get(host, agora))
+            self._proximo[host] = inicio + self.intervalo
+        if inicio > agora:
+            time.sleep(inicio - agora)
+
+
+def criar_sessao(concorrencia=CONCORRENCIA_IMAGENS, tentativas=TENTATIVAS_IMAGENS):
+    """Session com conexões keep-alive reaproveitadas e novas tentativas com backoff"""
+    retry = Retry(
+        total=tentativas - 1,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=concorrencia, max_retries=retry)
+    sessao = requests.Session()
+    sessao.headers.update(HEADERS_DOWNLOAD)
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    return sessao
+
+
+class ContadorVazao:
+    """Imagens e bytes baixados, para o progresso (imagens/s e MB/s)"""
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.imagens = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def registrar(self, n_bytes):
+        with self._lock:
+            self.imagens += 1
+            self.bytes += n_bytes
+
+    def resumo(self):
+        decorrido = max(time.monotonic() - self.inicio, 1e-9)
+        return {
+            "img/s": f"{self.imagens / decorrido:.1f}",
+            "MB/s": f"{self.bytes / decorrido / 1e6:.2f}",
+        }
+
+
+_sessao = None
+_limitador = None
+_lock_sessao = threading.Lock()
+
+
+def sessao_padrao():
+    """Session e limitador por host únicos do processo"""
+    global _sessao, _limitador
+    with _lock_sessao:
+        if _sessao is None:
+            _sessao = criar_sessao()
+            _limitador = LimitadorPorHost()
+        return _sessao, _limitador
+
+
+def baixar_bytes(url, timeout, contador=None):
+    """
+    Conteúdo da URL em memória (sessão e limite por host do processo).
+    Levanta a exceção do requests se o download falha depois das novas tentativas.
+    """
+    sessao, limitador = sessao_padrao()
+    limitador.aguardar(url)
+    with sessao.get(url, timeout=timeout) as response:
+        response.raise_for_status()
+        dados = response.content
+    if contador is not None:
+        contador.registrar(len(dados))
+    return dados
@@ -0,0 +1,174 @@
+"""
+=============================================================================
+ARMAZÉM DE EMBEDDINGS (SAÍDA DO SCRIPT 4)
+=============================================================================
+Os embeddings de título, descrição e reviews ficam fora das tabelas, em
+data/script_4_nlp/embeddings/:
+
+- <tipo>.npy    matriz (n_anuncios_com_texto x 1536) em float32
+                (ou float16 com PIPELINE_EMBEDDINGS_DTYPE=float16)
+- indice.json   ids dos anúncios de cada matriz (linha i -> ids[i]), dtype e dimensão
+
+As matrizes são abertas com memory-map (np.load(mmap_mode="r")): o Script 7 e a
+pontuação incremental usam os vetores direto do arquivo, sem parsear JSON nem
+copiar a matriz inteira para a memória.
+
+O índice é gravado por último (depois das matrizes), então um armazém
+incompleto nunca é lido como válido.
+
+Nas etapas em memória (pipeline em processo) os embeddings continuam nas colunas
+embedding_* do DataFrame, como listas; ArmazemEmbeddings.de_dataframe() monta o
+armazém a partir delas (e também aceita o JSON das tabelas antigas).
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Subpasta de data/script_4_nlp/ com as matrizes
+PASTA_EMBEDDINGS = "embeddings"
+TIPOS_EMBEDDING = ('embedding_titulo', 'embedding_descricao', 'embedding_reviews')
+DIMENSAO_EMBEDDING = 1536
+ARQUIVO_INDICE = "indice.json"
+DTYPES_SUPORTADOS = ("float32", "float16")
+# "openai": API de embeddings; "local": hashing na CPU, sem chave (ver _embeddings_locais.py)
+BACKENDS_EMBEDDING = ("openai", "local")
+
+
+def dtype_configurado():
+    """Tipo das matrizes gravadas (PIPELINE_EMBEDDINGS_DTYPE, padrão float32)"""
+    dtype = os.getenv("PIPELINE_EMBEDDINGS_DTYPE", "float32").strip().lower()
+    if dtype not in DTYPES_SUPORTADOS:
+        print(f"   ⚠️ PIPELINE_EMBEDDINGS_DTYPE='{dtype}' inválido; usando float32")
+        dtype = "float32"
+    return np.dtype(dtype)
+
+
+def backend_configurado():
+    """Backend que gera os embeddings do Script 4 (PIPELINE_EMBEDDINGS_BACKEND, padrão openai)"""
+    backend = os.getenv("PIPELINE_EMBEDDINGS_BACKEND", "openai").strip().lower()
+    if backend not in BACKENDS_EMBEDDING:
+        print(f"   ⚠️ PIPELINE_EMBEDDINGS_BACKEND='{backend}' inválido; usando openai")
+        backend = "openai"
+    return backend
+
+
+def vetor_embedding(valor):
+    """Converte um embedding (lista, array ou JSON) em vetor; inválidos viram zeros"""
+    try:
+        vetor = json.loads(valor) if isinstance(valor, str) else valor
+        if vetor is not None and len(vetor) == DIMENSAO_EMBEDDING:
+            return np.asarray(vetor, dtype=np.float32)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        pass
+    return np.zeros(DIMENSAO_EMBEDDING, dtype=np.float32)
+
+
+def embedding_presente(valor):
+    """True se a célula tem um embedding (listas/arrays não passam por pd.isna)"""
+    if isinstance(valor, (str, list, tuple, np.ndarray)):
+        return True
+    return not pd.isna(valor)
+
+
+def sem_embeddings(df):
+    """DataFrame sem as colunas embedding_* (que não vão para as tabelas)"""
+    colunas = [c for c in TIPOS_EMBEDDING if c in df.columns]
+    return df.drop(columns=colunas) if colunas else df
+
+
+class ArmazemEmbeddings:
+    """Matrizes de embeddings por tipo, com os ids dos anúncios de cada linha"""
+
+    def __init__(self, matrizes=None):
+        # tipo -> (ids: array de str, matriz: n x DIMENSAO_EMBEDDING)
+        self.matrizes = matrizes or {}
+
+    def __len__(self):
+        return len(self.matrizes)
+
+    def tipos(self):
+        return list(self.matrizes)
+
+    def ids(self, tipo):
+        return self.matrizes[tipo][0]
+
+    def matriz(self, tipo):
+        return self.matrizes[tipo][1]
+
+    @classmethod
+    def de_dataframe(cls, df, coluna_id='id_anuncio'):
+        """Monta o armazém a partir das colunas embedding_* (células vazias ficam de fora)"""
+        matrizes = {}
+        for tipo in TIPOS_EMBEDDING:
+            if tipo not in df.columns:
+                continue
+            presentes = df[tipo].map(embedding_presente).to_numpy(dtype=bool)
+            if not presentes.any():
+                continue
+            ids = df[coluna_id].to_numpy()[presentes].astype(str)
+            matriz = np.vstack([vetor_embedding(v) for v in df[tipo].to_numpy()[presentes]])
+            matrizes[tipo] = (ids, matriz)
+        return cls(matrizes)
+
+    def salvar(self, pasta, dtype=None):
+        """Grava uma matriz .npy por tipo e, por último, o índice"""
+        pasta = Path(pasta)
+        pasta.mkdir(parents=True, exist_ok=True)
+        dtype = np.dtype(dtype) if dtype is not None else dtype_configurado()
+
+        # Sem índice válido durante a gravação: leitores não misturam matrizes novas e antigas
+        (pasta / ARQUIVO_INDICE).unlink(missing_ok=True)
+        for arquivo in pasta.glob("*.npy"):
+            if arquivo.stem not in self.matrizes:
+                arquivo.unlink()
+
+        indice = {"dtype": dtype.name, "dimensao": DIMENSAO_EMBEDDING, "ids": {}}
+        for tipo, (ids, matriz) in self.matrizes.items():
+            temporario = pasta / f"{tipo}.tmp.npy"
+            np.save(temporario, np.ascontiguousarray(matriz, dtype=dtype))
+            os.replace(temporario, pasta / f"{tipo}.npy")
+            indice["ids"][tipo] = [str(i) for i in ids]
+
+        temporario = pasta / f"{ARQUIVO_INDICE}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(indice, f, ensure_ascii=False)
+        os.replace(temporario, pasta / ARQUIVO_INDICE)
+        return pasta / ARQUIVO_INDICE
+
+    @classmethod
+    def carregar(cls, pasta, mmap=True):
+        """Abre o armazém gravado (matrizes em memory-map); None se não existe"""
+        pasta = Path(pasta)
+        arquivo_indice = pasta / ARQUIVO_INDICE
+        if not arquivo_indice.exists():
+            return None
+        with open(arquivo_indice, 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+
+        matrizes = {}
+        for tipo, ids in indice["ids"].items():
+            matriz = np.load(pasta / f"{tipo}.npy", mmap_mode="r" if mmap else None)
+            matrizes[tipo] = (np.asarray(ids, dtype=str), matriz)
+        return cls(matrizes)
+
+    def alinhar(self, tipo, ids):
+        """
+        Vetores do tipo para a sequência `ids` (ex.: a coluna id_anuncio de um DataFrame).
+
+        Retorna (presentes, matriz): máscara booleana sobre `ids` e as linhas
+        correspondentes, na mesma ordem, em float32. Se os ids coincidem com os do
+        armazém (mesma ordem), a matriz é devolvida sem cópia.
+        """
+        ids = np.asarray(ids).astype(str)
+        ids_armazem, matriz = self.matrizes[tipo]
+        if len(ids) == len(ids_armazem) and np.array_equal(ids, ids_armazem):
+            presentes = np.ones(len(ids), dtype=bool)
+            return presentes, matriz if matriz.dtype == np.float32 else matriz.astype(np.float32)
+
+        posicao = pd.Index(ids_armazem).get_indexer(ids)
+        presentes = posicao >= 0
+        return presentes, np.asarray(matriz[posicao[presentes]], dtype=np.float32)
@@ -0,0 +1,71 @@
+"""
+=============================================================================
+EMBEDDINGS LOCAIS (SCRIPT 4 SEM OPENAI)
+=============================================================================
+Com PIPELINE_EMBEDDINGS_BACKEND=local o Script 4 gera os embeddings na própria
+máquina, só com CPU e sem chave de API (nós de lote sem internet, benchmarks).
+
+Os vetores têm a mesma dimensão dos da OpenAI (DIMENSAO_EMBEDDING = 1536), então
+o armazém de embeddings e o Script 7 não mudam. Cada texto vira:
+
+- n-gramas de palavras (1-2) e de caracteres (3-5, dentro das palavras), em
+  minúsculas e sem acentos
+- contagens com escala logarítmica (tf sublinear), espalhadas nas 1536 posições
+  por hashing com sinal alternado (as colisões tendem a se cancelar)
+- palavras e caracteres normalizados separadamente e somados; vetor final com
+  norma 1 (o cosseno do Script 7 continua valendo)
+
+O modelo não é ajustado ao corpus (sem vocabulário, IDF ou SVD): o mesmo texto
+gera sempre o mesmo vetor, na execução completa e na pontuação de um anúncio
+avulso. A vetorização é feita de uma vez sobre todos os textos (matriz esparsa).
+
+Os vetores locais não são comparáveis aos da OpenAI. Trocar o backend muda o
+fingerprint das etapas (PIPELINE_EMBEDDINGS_BACKEND) e o nome do modelo no
+checkpoint, então os dois nunca se misturam.
+"""
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from _embeddings import DIMENSAO_EMBEDDING
+
+# Nome gravado no checkpoint (mudar a receita exige mudar a versão)
+MODELO_LOCAL = f"local-hashing-{DIMENSAO_EMBEDDING}-v1"
+
+_vetorizadores = None
+
+
+def _obter_vetorizadores():
+    """Vetorizadores de palavras e de caracteres (sem estado: não precisam de fit)"""
+    global _vetorizadores
+    if _vetorizadores is None:
+        comum = dict(
+            n_features=DIMENSAO_EMBEDDING,
+            alternate_sign=True,
+            norm=None,
+            lowercase=True,
+            strip_accents="unicode",
+            dtype=np.float32,
+        )
+        _vetorizadores = (
+            HashingVectorizer(analyzer="word", ngram_range=(1, 2), **comum),
+            HashingVectorizer(analyzer="char_wb", ngram_range=(3, 5), **comum),
+        )
+    return _vetorizadores
+
+
+def _tf_sublinear(matriz):
+    """sinal(x) * log(1 + |x|) nas entradas não nulas, seguido de norma L2 por linha"""
+    matriz.data = np.sign(matriz.data) * np.log1p(np.abs(matriz.data))
+    return normalize(matriz, norm="l2", copy=False)
+
+
+def vetorizar(textos):
+    """Matriz (len(textos) x DIMENSAO_EMBEDDING) em float32, uma linha por texto"""
+    textos = list(textos)
+    if not textos:
+        return np.zeros((0, DIMENSAO_EMBEDDING), dtype=np.float32)
+    palavras, caracteres = _obter_vetorizadores()
+    matriz = _tf_sublinear(palavras.transform(textos)) + _tf_sublinear(caracteres.transform(textos))
+    return normalize(matriz, norm="l2").toarray().astype(np.float32, copy=False)
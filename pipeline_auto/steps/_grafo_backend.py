@@ -0,0 +1,363 @@
+"""
+=============================================================================
+BACKENDS DO GRAFO DE VENDEDORES (SCRIPT 7 E DASHBOARD)
+=============================================================================
+GrafoVendedores guarda o grafo não direcionado e ponderado como arrays de
+arestas (códigos 0..n-1 dos vendedores) e entrega as métricas usadas pelo
+Script 7 e pela página de rede do dashboard por um de três backends:
+
+- igraph (se instalado): grau, força, PageRank (PRPACK), componentes e
+  comunidades (Louvain = community_multilevel, Leiden) em C
+- scipy: adjacência CSR; PageRank por iteração de potência com matrizes
+  esparsas (mesma iteração de nx.pagerank), componentes de
+  scipy.sparse.csgraph; comunidades pelo python-louvain
+- networkx: o caminho antigo, em Python puro (referência e fallback)
+
+PIPELINE_GRAFO_BACKEND escolhe o backend: auto (padrão: igraph se instalado,
+senão scipy), igraph, scipy ou networkx. PIPELINE_GRAFO_COMUNIDADES escolhe
+o algoritmo de comunidades: louvain (padrão) ou leiden (só com igraph; sem ele
+volta ao louvain). Valores desconhecidos nas duas variáveis são erro (ValueError). As somas sobre vizinhos usam a adjacência CSR em qualquer
+backend, menos no networkx.
+
+Grau e soma de vizinhos seguem o networkx: um laço (vendedor ligado a ele
+mesmo) conta 2 no grau e o vendedor é vizinho dele mesmo.
+
+Módulo sem dependência de _config: importado também pelo dashboard
+(analise_streamlit/pages/4_Rede_de_Fraude.py).
+"""
+
+import os
+import random
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+try:
+    import igraph
+except ImportError:
+    igraph = None
+
+BACKEND_PADRAO = os.getenv("PIPELINE_GRAFO_BACKEND", "auto").strip().lower()
+METODO_COMUNIDADES = os.getenv("PIPELINE_GRAFO_COMUNIDADES", "louvain").strip().lower()
+
+BACKENDS = ("igraph", "scipy", "networkx")
+METODOS_COMUNIDADES = ("louvain", "leiden")
+
+
+def backends_disponiveis():
+    """Backends que podem ser usados neste ambiente"""
+    return [nome for nome in BACKENDS if nome != "igraph" or igraph is not None]
+
+
+def escolher_backend(nome=BACKEND_PADRAO):
+    """Nome do backend a usar para `nome` (auto, igraph, scipy ou networkx)"""
+    nome = (nome or "auto").strip().lower()
+    if nome == "auto":
+        return "igraph" if igraph is not None else "scipy"
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de grafo desconhecido: {nome} (use auto, {', '.join(BACKENDS)})")
+    if nome == "igraph" and igraph is None:
+        print("   ⚠️ igraph não instalado (pip install igraph): usando o backend scipy")
+        return "scipy"
+    return nome
+
+
+def escolher_metodo_comunidades(nome=METODO_COMUNIDADES):
+    """Nome do algoritmo de comunidades para `nome` (louvain ou leiden)"""
+    nome = (nome or "louvain").strip().lower()
+    if nome not in METODOS_COMUNIDADES:
+        raise ValueError(
+            f"Algoritmo de comunidades desconhecido: {nome} (use {', '.join(METODOS_COMUNIDADES)})"
+        )
+    return nome
+
+
+def _louvain(origem, destino, pesos, n, semente):
+    """Comunidades do python-louvain (mesma chamada que o Script 7 sempre usou)"""
+    from community import community_louvain
+    G = nx.Graph()
+    G.add_nodes_from(range(n))
+    G.add_weighted_edges_from(zip(origem.tolist(), destino.tolist(), pesos.tolist()))
+    particao = community_louvain.best_partition(G, random_state=semente)
+    return np.array([particao[v] for v in range(n)], dtype=np.int64)
+
+
+class _BackendScipy:
+    """Matrizes esparsas (CSR) e scipy.sparse.csgraph"""
+
+    nome = "scipy"
+
+    def __init__(self, grafo):
+        self.grafo = grafo
+
+    def graus(self):
+        g = self.grafo
+        return np.bincount(g.origem, minlength=g.n) + np.bincount(g.destino, minlength=g.n)
+
+    def graus_ponderados(self):
+        g = self.grafo
+        return (np.bincount(g.origem, weights=g.pesos, minlength=g.n)
+                + np.bincount(g.destino, weights=g.pesos, minlength=g.n))
+
+    def somar_vizinhos(self, valores, ponderado=False):
+        g = self.grafo
+        return (g.adjacencia if ponderado else g.vizinhanca) @ np.asarray(valores, dtype=float)
+
+    def pagerank(self, alpha=0.85, max_iter=100, tol=1.0e-6):
+        # Mesma iteração de nx.pagerank (sem personalização): saída de cada vértice dividida
+        # pela força, vértices sem arestas distribuídos uniformemente, erro L1 < n * tol
+        g = self.grafo
+        n = g.n
+        if n == 0:
+            return np.zeros(0)
+        forca = np.asarray(g.adjacencia.sum(axis=1)).ravel()
+        inverso = np.zeros(n)
+        inverso[forca != 0] = 1.0 / forca[forca != 0]
+        transicao = (g.adjacencia.multiply(inverso[:, None])).tocsr()
+        sem_saida = np.flatnonzero(forca == 0)
+        uniforme = np.repeat(1.0 / n, n)
+        x = uniforme
+        for _ in range(max_iter):
+            anterior = x
+            x = alpha * (x @ transicao + x[sem_saida].sum() * uniforme) + (1 - alpha) * uniforme
+            if np.absolute(x - anterior).sum() < n * tol:
+                return x
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    def componentes(self):
+        return connected_components(self.grafo.adjacencia, directed=False)[1].astype(np.int64)
+
+    def comunidades(self, metodo=METODO_COMUNIDADES, semente=None):
+        if metodo == "leiden":
+            print("   ⚠️ Leiden precisa do igraph: usando Louvain (python-louvain)")
+        g = self.grafo
+        return _louvain(g.origem, g.destino, g.pesos, g.n, semente)
+
+
+class _BackendIgraph(_BackendScipy):
+    """igraph (C); somas sobre vizinhos pela adjacência CSR"""
+
+    nome = "igraph"
+
+    def __init__(self, grafo):
+        super().__init__(grafo)
+        self.g = igraph.Graph(n=grafo.n, edges=np.column_stack([grafo.origem, grafo.destino]).tolist())
+        self.g.es["weight"] = grafo.pesos.tolist()
+
+    def graus(self):
+        return np.array(self.g.degree(), dtype=np.int64)
+
+    def graus_ponderados(self):
+        return np.array(self.g.strength(weights="weight"), dtype=float)
+
+    def pagerank(self, alpha=0.85, max_iter=100, tol=1.0e-6):
+        # Solução direta (PRPACK): difere da iteração de potência só abaixo da tolerância dela.
+        # O igraph percorre um laço nos dois sentidos (peso 2w); o networkx, uma vez (w)
+        g = self.grafo
+        pesos = np.where(g.origem == g.destino, g.pesos / 2, g.pesos)
+        return np.array(self.g.pagerank(damping=alpha, weights=pesos.tolist()), dtype=float)
+
+    def componentes(self):
+        return np.array(self.g.connected_components().membership, dtype=np.int64)
+
+    def comunidades(self, metodo=METODO_COMUNIDADES, semente=None):
+        if semente is not None:
+            igraph.set_random_number_generator(random.Random(semente))
+        try:
+            if metodo == "leiden":
+                particao = self.g.community_leiden(objective_function="modularity", weights="weight", n_iterations=-1)
+            else:
+                particao = self.g.community_multilevel(weights="weight")
+        finally:
+            if semente is not None:
+                igraph.set_random_number_generator(random)
+        return np.array(particao.membership, dtype=np.int64)
+
+
+class _BackendNetworkx:
+    """networkx em Python puro (como o Script 7 fazia)"""
+
+    nome = "networkx"
+
+    def __init__(self, grafo):
+        self.grafo = grafo
+        self.G = nx.Graph()
+        self.G.add_nodes_from(range(grafo.n))
+        self.G.add_weighted_edges_from(zip(grafo.origem.tolist(), grafo.destino.tolist(), grafo.pesos.tolist()))
+
+    def graus(self):
+        return np.array([grau for _, grau in self.G.degree()], dtype=np.int64)
+
+    def graus_ponderados(self):
+        return np.array([forca for _, forca in self.G.degree(weight="weight")], dtype=float)
+
+    def somar_vizinhos(self, valores, ponderado=False):
+        valores = np.asarray(valores, dtype=float)
+        return np.array([
+            sum(valores[v] * (dados["weight"] if ponderado else 1.0) for v, dados in self.G[u].items())
+            for u in self.G
+        ], dtype=float)
+
+    def pagerank(self, alpha=0.85, max_iter=100, tol=1.0e-6):
+        valores = nx.pagerank(self.G, alpha=alpha, max_iter=max_iter, tol=tol)
+        return np.array([valores[v] for v in range(self.grafo.n)], dtype=float)
+
+    def componentes(self):
+        rotulos = np.zeros(self.grafo.n, dtype=np.int64)
+        for i, componente in enumerate(nx.connected_components(self.G)):
+            rotulos[list(componente)] = i
+        return rotulos
+
+    def comunidades(self, metodo=METODO_COMUNIDADES, semente=None):
+        if metodo == "leiden":
+            print("   ⚠️ Leiden precisa do igraph: usando Louvain (python-louvain)")
+        from community import community_louvain
+        particao = community_louvain.best_partition(self.G, random_state=semente)
+        return np.array([particao[v] for v in range(self.grafo.n)], dtype=np.int64)
+
+
+_CLASSES_BACKEND = {"igraph": _BackendIgraph, "scipy": _BackendScipy, "networkx": _BackendNetworkx}
+
+
+def _chave_aresta(a, b):
+    """Chave inteira da aresta não direcionada (a, b): menor código nos 32 bits altos"""
+    return (np.minimum(a, b) << 32) | np.maximum(a, b)
+
+
+class GrafoVendedores:
+    """
+    Grafo não direcionado e ponderado de vendedores.
+
+    vertices: rótulos dos vértices (seller_id), na ordem dos arrays de resultado.
+    origem, destino, pesos: uma entrada por aresta, sem arestas repetidas
+    (laços permitidos). Todos os métodos devolvem arrays alinhados com `vertices`.
+    """
+
+    def __init__(self, vertices, origem, destino, pesos=None, backend=BACKEND_PADRAO):
+        self.vertices = pd.Index(vertices)
+        self.n = len(self.vertices)
+        self.origem = self.vertices.get_indexer(np.asarray(origem)).astype(np.int64)
+        self.destino = self.vertices.get_indexer(np.asarray(destino)).astype(np.int64)
+        if (self.origem < 0).any() or (self.destino < 0).any():
+            raise ValueError("Aresta com vértice fora de `vertices`")
+        self.pesos = np.ones(len(self.origem)) if pesos is None else np.asarray(pesos, dtype=float)
+        self._adjacencia = None
+        self._vizinhanca = None
+        self._chaves = None
+        self._backend = _CLASSES_BACKEND[escolher_backend(backend)](self)
+
+    @classmethod
+    def de_networkx(cls, G, peso="weight", backend=BACKEND_PADRAO):
+        arestas = list(G.edges(data=peso, default=1.0))
+        origem = [u for u, _, _ in arestas]
+        destino = [v for _, v, _ in arestas]
+        return cls(list(G.nodes), origem, destino, [p for _, _, p in arestas], backend=backend)
+
+    @property
+    def backend(self):
+        return self._backend.nome
+
+    @property
+    def num_arestas(self):
+        return len(self.origem)
+
+    @property
+    def adjacencia(self):
+        """Matriz de adjacência CSR simétrica com os pesos (laço uma vez na diagonal)"""
+        if self._adjacencia is None:
+            fora = self.origem != self.destino
+            linhas = np.concatenate([self.origem, self.destino[fora]])
+            colunas = np.concatenate([self.destino, self.origem[fora]])
+            dados = np.concatenate([self.pesos, self.pesos[fora]])
+            self._adjacencia = coo_matrix((dados, (linhas, colunas)), shape=(self.n, self.n)).tocsr()
+        return self._adjacencia
+
+    @property
+    def vizinhanca(self):
+        """Padrão da adjacência com 1 em cada posição (quem é vizinho de quem)"""
+        if self._vizinhanca is None:
+            self._vizinhanca = self.adjacencia.copy()
+            self._vizinhanca.data[:] = 1.0
+        return self._vizinhanca
+
+    def graus(self):
+        """Número de arestas de cada vértice (nx.Graph.degree)"""
+        return self._backend.graus()
+
+    def graus_ponderados(self):
+        """Soma dos pesos das arestas de cada vértice (nx.Graph.degree(weight=...))"""
+        return self._backend.graus_ponderados()
+
+    def num_vizinhos(self):
+        return np.diff(self.vizinhanca.indptr)
+
+    def somar_vizinhos(self, valores, ponderado=False):
+        """Soma de `valores` sobre os vizinhos de cada vértice (multiplicados pelo peso da aresta se `ponderado`)"""
+        return self._backend.somar_vizinhos(valores, ponderado)
+
+    def pagerank(self, alpha=0.85, max_iter=100, tol=1.0e-6):
+        """PageRank ponderado (parâmetros de nx.pagerank)"""
+        return self._backend.pagerank(alpha=alpha, max_iter=max_iter, tol=tol)
+
+    def componentes(self):
+        """Rótulo da componente conexa de cada vértice"""
+        return self._backend.componentes()
+
+    def comunidades(self, metodo=METODO_COMUNIDADES, semente=None):
+        """Rótulo da comunidade de cada vértice (Louvain ou Leiden, maximizando a modularidade ponderada)"""
+        return self._backend.comunidades(metodo=escolher_metodo_comunidades(metodo), semente=semente)
+
+    def subgrafo(self, mascara):
+        """Grafo induzido pelos vértices com mascara True (mesmo backend)"""
+        mascara = np.asarray(mascara, dtype=bool)
+        dentro = mascara[self.origem] & mascara[self.destino]
+        return GrafoVendedores(
+            self.vertices[mascara], self.vertices[self.origem[dentro]], self.vertices[self.destino[dentro]],
+            self.pesos[dentro], backend=self.backend
+        )
+
+    def somar_arestas(self, origem, destino, pesos, novos_vertices=()):
+        """
+        Novo grafo (mesmo backend) com `novos_vertices` no fim de `vertices` e as arestas
+        dadas somadas às atuais: o peso vai para a aresta que já existe ou cria uma nova
+        """
+        vertices = self.vertices.append(pd.Index(novos_vertices)) if len(novos_vertices) else self.vertices
+        a = vertices.get_indexer(np.asarray(origem)).astype(np.int64)
+        b = vertices.get_indexer(np.asarray(destino)).astype(np.int64)
+        if (a < 0).any() or (b < 0).any():
+            raise ValueError("Aresta com vértice fora de `vertices`")
+        # Arestas repetidas na entrada viram uma só, com os pesos somados
+        chaves, inverso = np.unique(_chave_aresta(a, b), return_inverse=True)
+        pesos = np.bincount(inverso.ravel(), weights=np.asarray(pesos, dtype=float), minlength=len(chaves))
+
+        # Chaves das arestas atuais ordenadas (uma vez por grafo)
+        if self._chaves is None:
+            atuais = _chave_aresta(self.origem, self.destino)
+            ordem = np.argsort(atuais, kind="stable")
+            self._chaves = (atuais[ordem], ordem)
+        ordenadas, ordem = self._chaves
+        posicao = np.minimum(np.searchsorted(ordenadas, chaves), max(len(ordenadas) - 1, 0))
+        existe = ordenadas[posicao] == chaves if len(ordenadas) else np.zeros(len(chaves), dtype=bool)
+
+        somados = self.pesos.copy()
+        somados[ordem[posicao[existe]]] += pesos[existe]
+        novas = chaves[~existe]
+        return GrafoVendedores(
+            vertices,
+            vertices[np.concatenate([self.origem, novas >> 32])],
+            vertices[np.concatenate([self.destino, novas & 0xFFFFFFFF])],
+            np.concatenate([somados, pesos[~existe]]),
+            backend=self.backend,
+        )
+
+    def para_networkx(self):
+        """nx.Graph com os rótulos de `vertices` e o peso em 'weight'"""
+        G = nx.Graph()
+        G.add_nodes_from(self.vertices.tolist())
+        G.add_weighted_edges_from(zip(
+            self.vertices[self.origem].tolist(), self.vertices[self.destino].tolist(), self.pesos.tolist()
+        ))
+        return G
@@ -0,0 +1,227 @@
+"""
+=============================================================================
+ÍNDICE DE DISTÂNCIA DE HAMMING ENTRE pHASHES (SCRIPTS 5 E 7)
+=============================================================================
+O pHash de 64 bits de uma foto recortada ou recomprimida difere do original em
+poucos bits. Comparar a string hexadecimal exata deixa essas cópias de fora;
+aqui os hashes viram inteiros (uint64) e duas imagens são quase-duplicatas se
+a distância de Hamming entre elas é no máximo PIPELINE_PHASH_DISTANCIA bits
+(padrão 4; 0 = só hashes idênticos, o comportamento antigo).
+
+Busca por raio sublinear com multi-index hashing: os 64 bits são divididos em
+m blocos e cada bloco tem uma tabela chave -> hashes (tabela direta de
+deslocamentos para blocos de até 24 bits, busca binária acima disso). Se dois hashes
+estão a até r bits, algum bloco difere em no máximo r // m bits (princípio da
+casa dos pombos), então basta procurar, em cada bloco, as chaves com até
+r // m bits trocados e conferir a distância real (popcount do XOR) só desses
+candidatos. O número de blocos acompanha o tamanho do índice (~64 / log2(n)
+bits por bloco), o que mantém poucos candidatos por chave de 1 mil a milhões
+de imagens (1 milhão de hashes a até 4 bits: ~10 s em um núcleo).
+
+- grupos_e_reuso(): grupo de quase-duplicatas (componentes conexas dos pares a
+  até r bits) e contagem de reuso (anúncios a até r bits) de cada linha
+- IndiceHamming.consultar(): hashes do índice próximos de um hash novo (usado
+  na pontuação de um anúncio avulso)
+"""
+
+import os
+from itertools import combinations
+from math import log2
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+DISTANCIA_PADRAO = max(0, int(os.getenv("PIPELINE_PHASH_DISTANCIA", "4")))
+
+BITS_HASH = 64
+# Pares candidatos conferidos por vez (limita a memória com blocos muito cheios)
+CANDIDATOS_POR_VEZ = 2_000_000
+# Blocos de até 24 bits usam tabela direta de deslocamentos (2^24 posições) em vez de busca binária
+BITS_TABELA_DIRETA = 24
+
+if hasattr(np, "bitwise_count"):
+    def contar_bits(valores):
+        """Popcount de cada elemento de um array uint64"""
+        return np.bitwise_count(valores)
+else:
+    _BITS_POR_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def contar_bits(valores):
+        """Popcount de cada elemento de um array uint64 (tabela por byte; NumPy < 2.0)"""
+        bytes_ = np.ascontiguousarray(valores, dtype=np.uint64).view(np.uint8).reshape(-1, 8)
+        return _BITS_POR_BYTE[bytes_].sum(axis=1, dtype=np.uint8)
+
+
+def phash_para_int(phashes):
+    """(valores uint64, máscara dos válidos) de uma sequência de pHashes hexadecimais ('ERRO' e vazios ficam de fora)"""
+    valores = np.zeros(len(phashes), dtype=np.uint64)
+    validos = np.zeros(len(phashes), dtype=bool)
+    for i, phash in enumerate(phashes):
+        try:
+            valor = int(phash, 16)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= valor < 1 << BITS_HASH:
+            valores[i] = valor
+            validos[i] = True
+    return valores, validos
+
+
+def distancia(phash_a, phash_b):
+    """Distância de Hamming entre dois pHashes hexadecimais"""
+    return bin(int(phash_a, 16) ^ int(phash_b, 16)).count("1")
+
+
+def blocos_recomendados(n_hashes, raio):
+    """Número de blocos do multi-index hashing para `n_hashes` hashes distintos e raio `raio`"""
+    if raio <= 0:
+        return 1
+    bits_por_bloco = max(8.0, log2(max(n_hashes, 2)))
+    return int(min(raio + 1, max(1, round(BITS_HASH / bits_por_bloco))))
+
+
+def _mascaras(largura, bits_trocados):
+    """Máscaras com até `bits_trocados` bits ligados dentro de um bloco de `largura` bits"""
+    mascaras = [0]
+    for k in range(1, bits_trocados + 1):
+        for posicoes in combinations(range(largura), k):
+            mascaras.append(sum(1 << p for p in posicoes))
+    return np.array(mascaras, dtype=np.uint64)
+
+
+class IndiceHamming:
+    """Hashes uint64 distintos com busca por raio de Hamming (multi-index hashing)"""
+
+    def __init__(self, hashes, raio=DISTANCIA_PADRAO, n_blocos=None):
+        self.hashes = np.unique(np.asarray(hashes, dtype=np.uint64))
+        self.raio = max(0, int(raio))
+        n_blocos = n_blocos or blocos_recomendados(len(self.hashes), self.raio)
+        self.subraio = self.raio // n_blocos
+
+        # Blocos de bits contíguos de larguras parecidas (ex.: 22 + 21 + 21)
+        larguras = [BITS_HASH // n_blocos + (1 if i < BITS_HASH % n_blocos else 0) for i in range(n_blocos)]
+        self._blocos = []
+        deslocamento = 0
+        for largura in larguras:
+            filtro = np.uint64((1 << largura) - 1)
+            chaves = (self.hashes >> np.uint64(deslocamento)) & filtro
+            ordem = np.argsort(chaves, kind="stable")
+            # inicios[c]:inicios[c + 1] = hashes (em `ordem`) com chave c no bloco
+            inicios = None
+            if largura <= BITS_TABELA_DIRETA:
+                inicios = np.zeros((1 << largura) + 1, dtype=np.int64)
+                np.cumsum(np.bincount(chaves.astype(np.int64), minlength=1 << largura), out=inicios[1:])
+            self._blocos.append({
+                "deslocamento": np.uint64(deslocamento),
+                "filtro": filtro,
+                "chaves": chaves,
+                "ordenadas": chaves[ordem],
+                "ordem": ordem,
+                "inicios": inicios,
+                "mascaras": _mascaras(largura, self.subraio),
+            })
+            deslocamento += largura
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def posicoes(self, valores):
+        """Posição em self.hashes de cada valor (os valores precisam estar no índice)"""
+        return np.searchsorted(self.hashes, np.asarray(valores, dtype=np.uint64))
+
+    def _candidatos(self, bloco, alvos):
+        """Gera (posição do alvo, posição do hash) para cada hash cuja chave no bloco é igual ao alvo"""
+        if bloco["inicios"] is not None:
+            posicoes = np.asarray(alvos).astype(np.int64)
+            inicio = bloco["inicios"][posicoes]
+            tamanhos = bloco["inicios"][posicoes + 1] - inicio
+        else:
+            inicio = np.searchsorted(bloco["ordenadas"], alvos, side="left")
+            tamanhos = np.searchsorted(bloco["ordenadas"], alvos, side="right") - inicio
+        com_candidatos = np.flatnonzero(tamanhos)
+        if not len(com_candidatos):
+            return
+        acumulado = np.cumsum(tamanhos[com_candidatos])
+        cortes = np.searchsorted(acumulado, np.arange(CANDIDATOS_POR_VEZ, acumulado[-1], CANDIDATOS_POR_VEZ))
+        for selecionados in np.split(com_candidatos, np.unique(cortes)):
+            if not len(selecionados):
+                continue
+            quantos = tamanhos[selecionados]
+            origem = np.repeat(selecionados, quantos)
+            # Posições inicio[s], inicio[s] + 1, ... de cada alvo, sem laço em Python
+            primeiros = np.cumsum(quantos) - quantos
+            deslocamentos = np.arange(quantos.sum()) - np.repeat(primeiros, quantos)
+            yield origem, bloco["ordem"][np.repeat(inicio[selecionados], quantos) + deslocamentos]
+
+    def pares(self):
+        """Arrays (i, j), i < j, das posições de hashes distintos a até `raio` bits"""
+        n = len(self.hashes)
+        if self.raio == 0 or n < 2:
+            vazio = np.zeros(0, dtype=np.int64)
+            return vazio, vazio
+
+        encontrados = []
+        for bloco in self._blocos:
+            for mascara in bloco["mascaras"]:
+                for i, j in self._candidatos(bloco, bloco["chaves"] ^ mascara):
+                    manter = i < j
+                    i, j = i[manter], j[manter]
+                    perto = contar_bits(self.hashes[i] ^ self.hashes[j]) <= self.raio
+                    if perto.any():
+                        encontrados.append(i[perto].astype(np.int64) * n + j[perto])
+        if not encontrados:
+            vazio = np.zeros(0, dtype=np.int64)
+            return vazio, vazio
+        # O mesmo par pode aparecer em mais de um bloco
+        codigos = np.unique(np.concatenate(encontrados))
+        return codigos // n, codigos % n
+
+    def consultar(self, valor):
+        """Posições (em self.hashes) dos hashes a até `raio` bits de `valor` (uint64)"""
+        valor = np.uint64(valor)
+        candidatos = []
+        for bloco in self._blocos:
+            chave = (valor >> bloco["deslocamento"]) & bloco["filtro"]
+            for _, j in self._candidatos(bloco, chave ^ bloco["mascaras"]):
+                candidatos.append(j)
+        if not candidatos:
+            return np.zeros(0, dtype=np.int64)
+        candidatos = np.unique(np.concatenate(candidatos))
+        return candidatos[contar_bits(self.hashes[candidatos] ^ valor) <= self.raio]
+
+    def agrupar(self, pares=None):
+        """Rótulo do grupo de quase-duplicatas de cada hash (componentes conexas dos pares)"""
+        i, j = self.pares() if pares is None else pares
+        n = len(self.hashes)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        grafo = coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(n, n))
+        _, rotulos = connected_components(grafo, directed=False)
+        return rotulos
+
+
+def grupos_e_reuso(phashes, raio=DISTANCIA_PADRAO):
+    """
+    Para uma coluna de pHashes hexadecimais, arrays alinhados com ela:
+    - grupo de quase-duplicatas (-1 sem hash válido)
+    - contagem de reuso: linhas com hash a até `raio` bits, incluindo a própria (0 sem hash válido)
+
+    Com raio 0 equivale a agrupar e contar pelo hash exato.
+    """
+    valores, validos = phash_para_int(list(phashes))
+    grupos = np.full(len(valores), -1, dtype=np.int64)
+    reuso = np.zeros(len(valores), dtype=np.int64)
+    if not validos.any():
+        return grupos, reuso
+
+    indice = IndiceHamming(valores[validos], raio)
+    posicao = indice.posicoes(valores[validos])
+    contagens = np.bincount(posicao, minlength=len(indice))
+    i, j = indice.pares()
+    vizinhanca = (contagens
+                  + np.bincount(i, weights=contagens[j], minlength=len(indice)).astype(np.int64)
+                  + np.bincount(j, weights=contagens[i], minlength=len(indice)).astype(np.int64))
+    grupos[validos] = indice.agrupar((i, j))[posicao]
+    reuso[validos] = vizinhanca[posicao]
+    return grupos, reuso
@@ -0,0 +1,169 @@
+"""
+=============================================================================
+ÍNDICE PERSISTENTE DE pHASH (SCRIPT 5)
+=============================================================================
+Guarda entre execuções, em SQLite (data/cache/phash.sqlite):
+
+- urls:    URL da imagem -> digest (sha256) do conteúdo baixado
+- imagens: digest -> pHash, largura, altura, formato e tamanho em bytes
+
+Uma URL já indexada não é baixada nem aberta de novo (as URLs do CDN apontam
+para um conteúdo fixo). Uma imagem nova cujo conteúdo já foi visto sob outra
+URL (a mesma foto em vários anúncios) reaproveita o pHash pelo digest. Só
+imagens realmente novas vão para o cálculo do pHash.
+
+Remoção: cada URL guarda quando foi usada pela última vez. compactar() remove
+as URLs que nenhum dataset usa há mais de PIPELINE_INDICE_PHASH_DIAS dias
+(padrão 90), depois as imagens sem URL, e compacta o arquivo (VACUUM).
+PIPELINE_INDICE_PHASH=0 desliga o índice.
+
+Invalidação: o índice guarda a versão da receita do pHash (ex.: VERSAO_PHASH de
+_phash.py). Ao abrir com outra versão, URLs e imagens são apagadas e os
+hashes são recalculados na próxima execução.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DIAS_RETENCAO = float(os.getenv("PIPELINE_INDICE_PHASH_DIAS", "90"))
+
+# Consultas IN (...) em blocos (limite de variáveis do SQLite)
+BLOCO_CONSULTA = 500
+
+
+def indice_ativo():
+    """False se PIPELINE_INDICE_PHASH desliga o índice"""
+    return os.getenv("PIPELINE_INDICE_PHASH", "1").strip().lower() not in ("0", "false", "nao", "não")
+
+
+class IndicePhash:
+    """pHash por URL e por digest do conteúdo, persistido entre execuções"""
+
+    def __init__(self, caminho, versao=None):
+        self.caminho = Path(caminho)
+        self.versao = versao
+        self.acertos_url = 0
+        self.acertos_digest = 0
+        self.novos = 0
+        self.invalidadas = 0
+        self._lock = threading.Lock()
+
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS imagens ("
+            " digest TEXT PRIMARY KEY,"
+            " phash TEXT NOT NULL,"
+            " largura INTEGER,"
+            " altura INTEGER,"
+            " formato TEXT,"
+            " bytes INTEGER,"
+            " criado_em REAL NOT NULL)"
+        )
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            " url TEXT PRIMARY KEY,"
+            " digest TEXT NOT NULL,"
+            " usado_em REAL NOT NULL)"
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_urls_digest ON urls (digest)")
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_urls_uso ON urls (usado_em)")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS meta ("
+            " chave TEXT PRIMARY KEY,"
+            " valor TEXT NOT NULL)"
+        )
+        if versao is not None:
+            self._invalidar_outra_versao(str(versao))
+
+    def _invalidar_outra_versao(self, versao):
+        """Apaga URLs e imagens se o índice foi gravado com outra receita de pHash"""
+        with self._conexao:
+            linha = self._conexao.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()
+            if linha is not None and linha[0] == versao:
+                return
+            self.invalidadas = self._conexao.execute("DELETE FROM imagens").rowcount
+            self._conexao.execute("DELETE FROM urls")
+            self._conexao.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('versao', ?)", (versao,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conexao.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def por_urls(self, urls):
+        """Dict url -> pHash das URLs indexadas; marca todas as `urls` como usadas agora"""
+        urls = list(dict.fromkeys(u for u in urls if u))
+        encontrados = {}
+        agora = time.time()
+        with self._lock:
+            for inicio in range(0, len(urls), BLOCO_CONSULTA):
+                bloco = urls[inicio:inicio + BLOCO_CONSULTA]
+                marcadores = ",".join("?" * len(bloco))
+                encontrados.update(self._conexao.execute(
+                    f"SELECT u.url, i.phash FROM urls u JOIN imagens i ON i.digest = u.digest"
+                    f" WHERE u.url IN ({marcadores})", bloco
+                ).fetchall())
+            with self._conexao:
+                self._conexao.executemany(
+                    "UPDATE urls SET usado_em = ? WHERE url = ?", [(agora, u) for u in encontrados]
+                )
+            self.acertos_url += len(encontrados)
+        return encontrados
+
+    def por_digest(self, digest):
+        """pHash de um conteúdo já visto, ou None"""
+        with self._lock:
+            linha = self._conexao.execute("SELECT phash FROM imagens WHERE digest = ?", (digest,)).fetchone()
+            if linha is not None:
+                self.acertos_digest += 1
+            return linha[0] if linha else None
+
+    def registrar(self, url, digest, phash=None, largura=None, altura=None, formato=None, tamanho=None):
+        """Associa a URL ao digest e, se `phash` é informado, grava a imagem"""
+        agora = time.time()
+        with self._lock, self._conexao:
+            if phash is not None:
+                # O mesmo conteúdo tem sempre o mesmo pHash: só a primeira gravação conta
+                self.novos += self._conexao.execute(
+                    "INSERT OR IGNORE INTO imagens (digest, phash, largura, altura, formato, bytes, criado_em)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (digest, phash, largura, altura, formato, tamanho, agora)
+                ).rowcount
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO urls (url, digest, usado_em) VALUES (?, ?, ?)", (url, digest, agora)
+            )
+
+    def compactar(self, dias=DIAS_RETENCAO):
+        """Remove URLs sem uso há mais de `dias` dias e imagens órfãs; compacta o arquivo"""
+        limite = time.time() - dias * 86400
+        with self._lock:
+            with self._conexao:
+                urls = self._conexao.execute("DELETE FROM urls WHERE usado_em < ?", (limite,)).rowcount
+                imagens = self._conexao.execute(
+                    "DELETE FROM imagens WHERE digest NOT IN (SELECT digest FROM urls)"
+                ).rowcount
+            if urls or imagens:
+                self._conexao.execute("VACUUM")
+        return urls, imagens
+
+    def estatisticas(self):
+        with self._lock:
+            urls = self._conexao.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+            imagens = self._conexao.execute("SELECT COUNT(*) FROM imagens").fetchone()[0]
+        return {
+            "acertos_url": self.acertos_url,
+            "acertos_digest": self.acertos_digest,
+            "novos": self.novos,
+            "invalidadas": self.invalidadas,
+            "urls": urls,
+            "imagens": imagens,
+        }
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
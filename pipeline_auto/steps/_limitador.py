@@ -0,0 +1,202 @@
+"""
+=============================================================================
+CONCORRÊNCIA E LIMITE DE TAXA DAS CHAMADAS À OPENAI
+=============================================================================
+As etapas que chamam a API enviam vários itens ao mesmo tempo (pool de threads)
+sem passar da cota da conta:
+
+- PIPELINE_LLM_CONCORRENCIA: requisições simultâneas (padrão 8)
+- PIPELINE_LLM_RPM / PIPELINE_LLM_TPM: requisições e tokens por minuto
+  (padrão 500 / 200000), controlados por dois baldes de fichas (token bucket)
+- PIPELINE_LLM_MAX_TENTATIVAS: tentativas por requisição em 429, 5xx e falhas
+  de conexão (padrão 6)
+
+Um 429 pausa todas as threads do processo: pelo tempo do cabeçalho Retry-After
+(ou retry-after-ms) quando a API informa, senão por um backoff exponencial com
+jitter. O cliente OpenAI deve ser criado com max_retries=0 para que as novas
+tentativas passem pelo limitador.
+
+A URL da API vem de OPENAI_BASE_URL (lida pelo próprio cliente OpenAI), então as
+etapas podem ser executadas contra um servidor local que simule a API e os 429.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+
+CONCORRENCIA_PADRAO = int(os.getenv("PIPELINE_LLM_CONCORRENCIA", "8"))
+RPM_PADRAO = int(os.getenv("PIPELINE_LLM_RPM", "500"))
+TPM_PADRAO = int(os.getenv("PIPELINE_LLM_TPM", "200000"))
+MAX_TENTATIVAS = int(os.getenv("PIPELINE_LLM_MAX_TENTATIVAS", "6"))
+
+# Backoff quando a API não informa Retry-After (segundos)
+BACKOFF_INICIAL = 1.0
+BACKOFF_MAXIMO = 60.0
+
+# Status HTTP que valem nova tentativa (além dos 5xx)
+STATUS_TRANSITORIOS = (408, 409, 429)
+
+
+def estimar_tokens(*textos):
+    """Estimativa grosseira de tokens (~4 caracteres por token)"""
+    return max(1, sum(len(t) for t in textos if t) // 4)
+
+
+class BaldeFichas:
+    """Token bucket: `capacidade` fichas repostas linearmente ao longo de um minuto"""
+
+    def __init__(self, capacidade_por_minuto):
+        self.capacidade = float(max(1, capacidade_por_minuto))
+        self.reposicao = self.capacidade / 60.0
+        self.disponivel = self.capacidade
+        self.atualizado = time.monotonic()
+
+    def _repor(self, agora):
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self.atualizado) * self.reposicao)
+        self.atualizado = agora
+
+    def espera(self, quantidade, agora):
+        """Segundos até haver `quantidade` fichas (0 se já há)"""
+        self._repor(agora)
+        quantidade = min(quantidade, self.capacidade)
+        falta = quantidade - self.disponivel
+        return 0.0 if falta <= 0 else falta / self.reposicao
+
+    def consumir(self, quantidade):
+        # Pode ficar negativo (ajuste pelo uso real): as próximas requisições esperam a reposição
+        self.disponivel -= quantidade
+
+
+class LimitadorTaxa:
+    """Requisições e tokens por minuto, compartilhados pelas threads do processo"""
+
+    def __init__(self, rpm=RPM_PADRAO, tpm=TPM_PADRAO, max_tentativas=MAX_TENTATIVAS):
+        self.requisicoes = BaldeFichas(rpm)
+        self.tokens = BaldeFichas(tpm)
+        self.max_tentativas = max(1, max_tentativas)
+        self.pausa_ate = 0.0
+        self.total_429 = 0
+        self._lock = threading.Lock()
+
+    def aguardar(self, tokens):
+        """Bloqueia até a requisição (com `tokens` estimados) caber nos dois limites"""
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                espera = max(
+                    self.pausa_ate - agora,
+                    self.requisicoes.espera(1, agora),
+                    self.tokens.espera(tokens, agora),
+                )
+                if espera <= 0:
+                    self.requisicoes.consumir(1)
+                    self.tokens.consumir(tokens)
+                    return
+            time.sleep(min(espera, BACKOFF_MAXIMO))
+
+    def ajustar_tokens(self, estimados, usados):
+        """Corrige o balde de tokens com o uso informado pela resposta"""
+        if usados is None:
+            return
+        with self._lock:
+            self.tokens.consumir(usados - estimados)
+
+    def pausar(self, segundos):
+        """Segura todas as threads por `segundos` (resposta 429)"""
+        with self._lock:
+            self.total_429 += 1
+            self.pausa_ate = max(self.pausa_ate, time.monotonic() + segundos)
+
+    def executar(self, chamada, tokens_estimados=1):
+        """
+        Executa `chamada()` dentro dos limites, repetindo em erros transitórios.
+        Demais exceções (e a última transitória) propagam para o chamador.
+        """
+        for tentativa in range(self.max_tentativas):
+            self.aguardar(tokens_estimados)
+            try:
+                resposta = chamada()
+            except Exception as erro:
+                if not _erro_transitorio(erro) or tentativa == self.max_tentativas - 1:
+                    raise
+                espera = _retry_after(erro)
+                if espera is None:
+                    espera = min(BACKOFF_MAXIMO, BACKOFF_INICIAL * 2 ** tentativa) * random.uniform(0.5, 1.0)
+                if getattr(erro, "status_code", None) == 429:
+                    self.pausar(espera)
+                else:
+                    time.sleep(espera)
+                continue
+            uso = getattr(resposta, "usage", None)
+            self.ajustar_tokens(tokens_estimados, getattr(uso, "total_tokens", None))
+            return resposta
+
+
+def _erro_transitorio(erro):
+    """429, 5xx, timeout e falha de conexão valem nova tentativa"""
+    status = getattr(erro, "status_code", None)
+    if status is not None:
+        return status in STATUS_TRANSITORIOS or status >= 500
+    try:
+        import openai
+        return isinstance(erro, openai.APIConnectionError)
+    except ImportError:
+        return False
+
+
+def _retry_after(erro):
+    """Segundos pedidos pela API (retry-after-ms ou Retry-After), ou None"""
+    resposta = getattr(erro, "response", None)
+    cabecalhos = getattr(resposta, "headers", None)
+    if not cabecalhos:
+        return None
+    try:
+        if cabecalhos.get("retry-after-ms"):
+            return max(0.0, float(cabecalhos["retry-after-ms"]) / 1000)
+        valor = cabecalhos.get("retry-after")
+        if not valor:
+            return None
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            # Formato de data HTTP
+            return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_limitador = None
+_lock_limitador = threading.Lock()
+
+
+def limitador_padrao():
+    """Limitador único do processo (etapas em processo dividem a mesma cota)"""
+    global _limitador
+    with _lock_limitador:
+        if _limitador is None:
+            _limitador = LimitadorTaxa()
+        return _limitador
+
+
+def executar_em_paralelo(itens, funcao, concorrencia=CONCORRENCIA_PADRAO):
+    """
+    Aplica `funcao(item)` a cada item num pool de threads.
+
+    Gera (posição, item, resultado) na ordem em que terminam; quem consome o
+    gerador (thread principal) pode gravar checkpoint e imprimir o progresso.
+    """
+    itens = list(itens)
+    if not itens:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(concorrencia, len(itens)))) as pool:
+        futuros = {pool.submit(funcao, item): (posicao, item) for posicao, item in enumerate(itens)}
+        try:
+            for futuro in as_completed(futuros):
+                posicao, item = futuros[futuro]
+                yield posicao, item, futuro.result()
+        finally:
+            for futuro in futuros:
+                futuro.cancel()
@@ -0,0 +1,100 @@
+"""
+=============================================================================
+EMBEDDINGS EM LOTES (SCRIPT 4)
+=============================================================================
+O endpoint de embeddings aceita vários textos por requisição. Os textos são
+agrupados em lotes limitados por tokens estimados e por quantidade, e os lotes
+são enviados em paralelo dentro dos limites de _limitador.py:
+
+- PIPELINE_EMBEDDINGS_LOTE_TOKENS: tokens estimados por lote (padrão 100000;
+  a API aceita até 300000 por requisição)
+- PIPELINE_EMBEDDINGS_LOTE_TEXTOS: textos por lote (padrão 256; limite da API: 2048)
+- PIPELINE_LLM_CONCORRENCIA: lotes enviados ao mesmo tempo
+
+Cada resultado volta para a posição do texto na lista de entrada (pelo campo
+`index` da resposta), então quem chama mapeia de volta para id_anuncio e campo.
+
+Textos repetidos (a mesma descrição copiada entre anúncios, título igual à
+descrição) vão uma vez só para a API; com um CacheEmbeddings (_cache.py), os
+textos já vistos em execuções anteriores nem entram nos lotes.
+"""
+
+import os
+
+from _limitador import CONCORRENCIA_PADRAO, estimar_tokens, executar_em_paralelo, limitador_padrao
+
+LOTE_MAX_TOKENS = int(os.getenv("PIPELINE_EMBEDDINGS_LOTE_TOKENS", "100000"))
+LOTE_MAX_TEXTOS = int(os.getenv("PIPELINE_EMBEDDINGS_LOTE_TEXTOS", "256"))
+
+
+def montar_lotes(textos, max_tokens=LOTE_MAX_TOKENS, max_textos=LOTE_MAX_TEXTOS):
+    """Agrupa as posições dos textos em lotes de até `max_tokens` estimados e `max_textos` textos"""
+    lotes = []
+    atual, tokens_atual = [], 0
+    for posicao, texto in enumerate(textos):
+        tokens = estimar_tokens(texto)
+        if atual and (tokens_atual + tokens > max_tokens or len(atual) >= max_textos):
+            lotes.append(atual)
+            atual, tokens_atual = [], 0
+        atual.append(posicao)
+        tokens_atual += tokens
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+def gerar_embeddings(textos, obter_cliente, modelo, concorrencia=CONCORRENCIA_PADRAO, cache=None):
+    """
+    Gera os embeddings de `textos` em lotes paralelos.
+
+    Gera (posições, vetores, erro) na ordem em que os lotes terminam: vetores[i]
+    é o embedding de textos[posições[i]]. Se o lote falha (depois das novas
+    tentativas do limitador), vetores é None e erro traz a exceção. Os acertos
+    do `cache` vêm primeiro, num único grupo; os vetores novos são gravados nele.
+    """
+    # Texto -> posições em `textos` (cada texto distinto é pedido uma vez)
+    posicoes_por_texto = {}
+    for posicao, texto in enumerate(textos):
+        posicoes_por_texto.setdefault(texto, []).append(posicao)
+    unicos = list(posicoes_por_texto)
+
+    if cache is not None:
+        chaves = {texto: cache.chave(modelo, texto) for texto in unicos}
+        encontrados = cache.obter_varios(chaves.values())
+        posicoes, vetores = [], []
+        for texto in unicos:
+            vetor = encontrados.get(chaves[texto])
+            if vetor is not None:
+                for posicao in posicoes_por_texto[texto]:
+                    posicoes.append(posicao)
+                    vetores.append(vetor)
+        if posicoes:
+            yield posicoes, vetores, None
+        unicos = [texto for texto in unicos if chaves[texto] not in encontrados]
+
+    lotes = montar_lotes(unicos)
+
+    def enviar(posicoes):
+        entrada = [unicos[p] for p in posicoes]
+        try:
+            resposta = limitador_padrao().executar(
+                lambda: obter_cliente().embeddings.create(model=modelo, input=entrada),
+                tokens_estimados=estimar_tokens(*entrada)
+            )
+        except Exception as erro:
+            return None, erro
+        vetores = [None] * len(entrada)
+        for item in resposta.data:
+            vetores[item.index] = item.embedding
+        return vetores, None
+
+    for _, lote, (vetores, erro) in executar_em_paralelo(lotes, enviar, concorrencia):
+        if cache is not None and vetores is not None:
+            cache.registrar_varios(modelo, [(chaves[unicos[p]], v) for p, v in zip(lote, vetores)])
+        posicoes, vetores_expandidos = [], []
+        for i, p in enumerate(lote):
+            for posicao in posicoes_por_texto[unicos[p]]:
+                posicoes.append(posicao)
+                if vetores is not None:
+                    vetores_expandidos.append(vetores[i])
+        yield posicoes, vetores_expandidos if vetores is not None else None, erro
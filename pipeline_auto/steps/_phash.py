@@ -0,0 +1,110 @@
+"""
+=============================================================================
+pHASH DE IMAGENS (SCRIPT 5)
+=============================================================================
+pHash (perceptual hash) de imagens já em memória. As funções rodam nos
+processos do pool (_processos.py): o Script 5 envia os bytes das imagens em
+lotes assim que os downloads terminam, sem gravar e reabrir os arquivos para
+calcular o hash.
+
+Mesmo algoritmo de imagehash.phash (tons de cinza 32x32 com Lanczos, DCT 2D,
+bloco 8x8 de baixas frequências comparado com a mediana), com duas mudanças
+de desempenho:
+
+- decodificação reduzida: o pHash só usa 32x32 pixels, então o JPEG é
+  decodificado já em escala 1/2, 1/4 ou 1/8 (modo draft do Pillow, direto em
+  tons de cinza), mantendo pelo menos PIPELINE_PHASH_DRAFT pixels de lado
+  (padrão 128). O hash difere do da imagem inteira em ~0,2 bit em média (bem
+  abaixo da distância de quase-duplicatas, ver _hamming.py); 0 decodifica a
+  imagem inteira e reproduz imagehash.phash bit a bit. WebP e PNG não têm
+  decodificação reduzida e são abertos inteiros.
+- DCT em lote: só as 8 primeiras linhas da matriz da DCT são usadas
+  (8x32 @ 32x32 @ 32x8), para todas as imagens do lote numa multiplicação.
+
+analisar_lote() devolve também largura, altura e formato, gravados no índice
+persistente (_indice_phash.py) junto com o digest do conteúdo. VERSAO_PHASH
+identifica a receita: pHashes gravados com outra versão (índice e checkpoint)
+são recalculados.
+"""
+
+import hashlib
+import os
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Valor gravado quando a imagem não pode ser aberta
+PHASH_ERRO = 'ERRO'
+
+# Hash 8x8 sobre a imagem reduzida a 32x32 (hash_size e highfreq_factor de imagehash.phash)
+TAMANHO_HASH = 8
+LADO_DCT = TAMANHO_HASH * 4
+
+# Lado mínimo da decodificação reduzida do JPEG (0 = imagem inteira)
+LADO_DRAFT = max(0, int(os.getenv("PIPELINE_PHASH_DRAFT", "128")))
+
+# Imagens por tarefa enviada ao pool (uma DCT em lote e menos serialização entre processos)
+LOTE_PHASH = 32
+
+VERSAO_PHASH = f"dct{TAMANHO_HASH}x{LADO_DCT}-draft{LADO_DRAFT}"
+
+# Linhas de baixa frequência da DCT-II sem normalização (a mesma escala de scipy.fftpack.dct)
+_DCT = 2 * np.cos(
+    np.pi * np.arange(TAMANHO_HASH)[:, None] * (2 * np.arange(LADO_DCT)[None, :] + 1) / (2 * LADO_DCT)
+)
+
+
+def digest_conteudo(dados):
+    """sha256 dos bytes da imagem (identifica o conteúdo no índice de pHash)"""
+    return hashlib.sha256(dados).hexdigest()
+
+
+def reduzir_imagem(dados, lado_draft=LADO_DRAFT):
+    """(pixels LADO_DCT x LADO_DCT em float64, largura, altura, formato); levanta exceção se não abre"""
+    with Image.open(BytesIO(dados)) as img:
+        largura, altura, formato = img.width, img.height, img.format
+        if lado_draft:
+            # Só JPEG: escolhe a maior redução que mantém os dois lados >= lado_draft
+            img.draft('L', (lado_draft, lado_draft))
+        reduzida = img.convert('L').resize((LADO_DCT, LADO_DCT), Image.Resampling.LANCZOS)
+        return np.asarray(reduzida, dtype=np.float64), largura, altura, formato
+
+
+def phash_lote(pixels):
+    """pHash hexadecimal de cada imagem de um array (n, LADO_DCT, LADO_DCT)"""
+    pixels = np.asarray(pixels, dtype=np.float64)
+    if not len(pixels):
+        return []
+    baixas = (_DCT @ pixels @ _DCT.T).reshape(len(pixels), -1)
+    bits = baixas > np.median(baixas, axis=1)[:, None]
+    # Primeiro coeficiente no bit mais significativo (mesma string de imagehash)
+    valores = np.packbits(bits, axis=1).view('>u8').ravel()
+    return [format(int(valor), f'0{TAMANHO_HASH * TAMANHO_HASH // 4}x') for valor in valores]
+
+
+def analisar_lote(lista_dados):
+    """[(phash, largura, altura, formato)] de cada imagem; (PHASH_ERRO, None, None, None) se não abre"""
+    resultados = [(PHASH_ERRO, None, None, None)] * len(lista_dados)
+    abertas, pixels = [], []
+    for i, dados in enumerate(lista_dados):
+        try:
+            matriz, largura, altura, formato = reduzir_imagem(dados)
+        except Exception:
+            continue
+        abertas.append((i, largura, altura, formato))
+        pixels.append(matriz)
+    if pixels:
+        for (i, largura, altura, formato), phash in zip(abertas, phash_lote(np.stack(pixels))):
+            resultados[i] = (phash, largura, altura, formato)
+    return resultados
+
+
+def analisar_imagem(dados):
+    """(phash, largura, altura, formato) da imagem; (PHASH_ERRO, None, None, None) se não abre"""
+    return analisar_lote([dados])[0]
+
+
+def phash_de_bytes(dados):
+    """pHash da imagem como string hexadecimal (PHASH_ERRO se não for possível abrir)"""
+    return analisar_imagem(dados)[0]
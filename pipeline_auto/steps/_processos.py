@@ -0,0 +1,111 @@
+"""
+=============================================================================
+POOL DE PROCESSOS PARA ETAPAS LIMITADAS POR CPU
+=============================================================================
+Trechos em Python puro (VADER, hashing de imagens, ...) não ganham nada com
+threads por causa do GIL. mapear_em_processos() divide os itens em blocos,
+processa os blocos num ProcessPoolExecutor e devolve os resultados na ordem da
+entrada, como se o laço fosse sequencial.
+
+- PIPELINE_PROCESSOS: processos do pool (padrão: número de CPUs; 1 = sem pool)
+
+Para trabalho que chega aos poucos (ex.: imagens conforme terminam de baixar),
+criar_pool() devolve um executor com submit(), usado como context manager.
+
+Entradas pequenas (menos de `minimo_para_pool` itens, ex.: a pontuação de um
+anúncio avulso) rodam no próprio processo: criar o pool custaria mais que o
+trabalho. As funções enviadas ao pool precisam estar num módulo importável
+(_*.py), não no script da etapa.
+"""
+
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+PROCESSOS_PADRAO = max(1, int(os.getenv("PIPELINE_PROCESSOS", str(os.cpu_count() or 1))))
+
+# Abaixo disso o trabalho roda no processo atual
+MINIMO_PARA_POOL = 200
+
+# Blocos por processo: equilibra a carga sem multiplicar a serialização
+BLOCOS_POR_PROCESSO = 4
+
+
+def dividir_em_blocos(itens, n_blocos):
+    """Divide `itens` em até `n_blocos` listas contíguas de tamanhos parecidos"""
+    itens = list(itens)
+    n_blocos = max(1, min(n_blocos, len(itens)))
+    tamanho, resto = divmod(len(itens), n_blocos)
+    blocos, inicio = [], 0
+    for i in range(n_blocos):
+        fim = inicio + tamanho + (1 if i < resto else 0)
+        blocos.append(itens[inicio:fim])
+        inicio = fim
+    return [b for b in blocos if b]
+
+
+def mapear_em_processos(funcao_bloco, itens, processos=PROCESSOS_PADRAO, inicializador=None,
+                        argumentos_inicializador=(), minimo_para_pool=MINIMO_PARA_POOL):
+    """
+    Aplica `funcao_bloco(lista_de_itens) -> lista_de_resultados` a blocos de `itens`.
+
+    Retorna a lista de resultados na ordem de `itens`. `inicializador` roda uma
+    vez por processo (ex.: carregar o léxico do VADER) e também no processo
+    atual quando o pool não é usado.
+    """
+    itens = list(itens)
+    if not itens:
+        return []
+
+    if processos <= 1 or len(itens) < minimo_para_pool:
+        if inicializador is not None:
+            inicializador(*argumentos_inicializador)
+        return list(funcao_bloco(itens))
+
+    blocos = dividir_em_blocos(itens, processos * BLOCOS_POR_PROCESSO)
+    resultados = []
+    with ProcessPoolExecutor(max_workers=min(processos, len(blocos)), initializer=inicializador,
+                             initargs=argumentos_inicializador) as pool:
+        # map() devolve na ordem dos blocos
+        for parcial in pool.map(funcao_bloco, blocos):
+            resultados.extend(parcial)
+    return resultados
+
+
+class ExecutorLocal:
+    """Mesma interface de ProcessPoolExecutor.submit(), executando na hora no processo atual"""
+
+    def submit(self, funcao, *args, **kwargs):
+        futuro = Future()
+        try:
+            futuro.set_result(funcao(*args, **kwargs))
+        except Exception as erro:
+            futuro.set_exception(erro)
+        return futuro
+
+    def shutdown(self, wait=True):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def _nada():
+    return None
+
+
+def criar_pool(n_itens, processos=PROCESSOS_PADRAO, minimo_para_pool=MINIMO_PARA_POOL):
+    """
+    Executor para `n_itens` tarefas enviadas com submit(): ProcessPoolExecutor, ou
+    ExecutorLocal se o pool não compensa.
+
+    Os processos são iniciados aqui, antes de quem chama abrir threads (ex.: os
+    downloads): um fork com threads em andamento pode herdar locks ocupados.
+    """
+    if processos <= 1 or n_itens < minimo_para_pool:
+        return ExecutorLocal()
+    pool = ProcessPoolExecutor(max_workers=processos)
+    pool.submit(_nada).result()
+    return pool
@@ -0,0 +1,143 @@
+"""
+=============================================================================
+PRÉ-CLASSIFICADOR POR REGRAS (SCRIPT 2)
+=============================================================================
+Resolve localmente, sem chamar a API, os títulos sem ambiguidade. Aplica as
+mesmas regras do prompt do Script 2:
+
+- códigos HP (CZ103AB ... 3YM81AB) -> modelo e cor
+- famílias 62/662/664/667, com prioridade do XL
+- preto / colorido (tricolor, tri-color, color)
+- quantidade explícita ("kit 2", "2 cartuchos", "2x", "pack com 4") ou, sem
+  número, 1 por cor num kit
+- usado/seminovo/recondicionado/remanufaturado/vazio
+
+classificar() devolve None sempre que houver dúvida: mais de um modelo no
+título, nenhuma cor, números soltos ou conflitantes, kit sem quantidade clara, termos de
+uso na descrição ou negação ("não é usado"). Esses casos seguem para o LLM.
+PIPELINE_PRECLASSIFICADOR=0 desliga o pré-classificador.
+"""
+
+import os
+import re
+import unicodedata
+
+# Código HP -> (modelo, cor)
+CODIGOS_HP = {
+    "CZ103AB": ("662", "preto"),
+    "CZ104AB": ("662", "colorido"),
+    "CZ105AB": ("662xl", "preto"),
+    "CZ106AB": ("662xl", "colorido"),
+    "F6V28AB": ("664", "colorido"),
+    "F6V29AB": ("664", "preto"),
+    "F6V30AB": ("664xl", "colorido"),
+    "F6V31AB": ("664xl", "preto"),
+    "3YM78AB": ("667", "colorido"),
+    "3YM79AB": ("667", "preto"),
+    "3YM80AB": ("667xl", "colorido"),
+    "3YM81AB": ("667xl", "preto"),
+}
+
+_RE_CODIGO = re.compile(r"\b(" + "|".join(CODIGOS_HP) + r")\b", re.IGNORECASE)
+_RE_MODELO = re.compile(r"(?<![\d.,])(662|664|667|62)\s*-?\s*(xl)?(?![a-z\d])")
+_RE_PRETO = re.compile(r"\b(preto|preta|pretos|black|negro|pto|bk)\b")
+_RE_COLORIDO = re.compile(r"\b(colorido|colorida|coloridos|color|tricolor|tri-color|tri color|tricolores|cmy)\b")
+_RE_QUANTIDADE = re.compile(
+    r"\b(?:kit|pack|combo|caixa)\s*(?:com|c/)?\s*(\d{1,2})\b"
+    r"|\b(\d{1,2})\s*(?:x\b|un\b|und\b|unid|unidades\b|cartuchos\b|pecas\b)"
+)
+_RE_VOLUME = re.compile(r"\b\d+(?:[.,]\d+)?\s*ml\b")
+_RE_NUMERO = re.compile(r"\d+")
+_RE_KIT = re.compile(r"\b(kit|pack|combo|caixa)\b|\+")
+_RE_USADO = re.compile(r"\b(usado|usados|seminovo|semi-novo|semi novo|recondicionado|remanufaturado|vazio|vazios)\b")
+_RE_NEGACAO = re.compile(r"\b(nao|nunca|sem)\s+(?:e\s+|foi\s+)?(usado|seminovo|recondicionado|remanufaturado|vazio)\b")
+
+
+def preclassificador_ativo():
+    """False se PIPELINE_PRECLASSIFICADOR desliga o pré-classificador"""
+    return os.getenv("PIPELINE_PRECLASSIFICADOR", "1").strip().lower() not in ("0", "false", "nao", "não")
+
+
+def _normalizar(texto):
+    """Minúsculas sem acentos (a comparação não depende de 'não'/'nao', 'peças'/'pecas')"""
+    if not texto or str(texto).strip().lower() == "nan":
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def _modelo_unico(titulo, titulo_original):
+    """Modelo único do título (XL tem prioridade sobre o padrão da mesma família), ou None"""
+    encontrados = set()
+    cores_codigo = set()
+    for codigo in _RE_CODIGO.findall(titulo_original):
+        modelo, cor = CODIGOS_HP[codigo.upper()]
+        encontrados.add(modelo)
+        cores_codigo.add(cor)
+    for numero, xl in _RE_MODELO.findall(titulo):
+        encontrados.add(numero + ("xl" if xl else ""))
+
+    familias = {m.replace("xl", "") for m in encontrados}
+    if len(familias) != 1:
+        return None, cores_codigo
+    familia = familias.pop()
+    return (familia + "xl" if familia + "xl" in encontrados else familia), cores_codigo
+
+
+def classificar(titulo, descricao=None):
+    """
+    Informações do anúncio no formato do Script 2 se o título não deixa dúvida;
+    None se o anúncio deve ir para o LLM.
+    """
+    texto = _normalizar(titulo)
+    if not texto:
+        return None
+    texto_descricao = _normalizar(descricao)
+
+    modelo, cores_codigo = _modelo_unico(texto, str(titulo))
+    if modelo is None:
+        return None
+
+    preto = 1 if _RE_PRETO.search(texto) or "preto" in cores_codigo else 0
+    colorido = 1 if _RE_COLORIDO.search(texto) or "colorido" in cores_codigo else 0
+    if not preto and not colorido:
+        return None
+
+    # Números que não são modelo, código, volume ou quantidade reconhecida
+    # (ex.: "3 pretos e 2 coloridos", modelo de impressora) deixam a quantidade incerta
+    resto = texto
+    for regex in (_RE_CODIGO, _RE_MODELO, _RE_VOLUME, _RE_QUANTIDADE):
+        resto = regex.sub(" ", resto)
+    if _RE_NUMERO.search(resto):
+        return None
+
+    # Quantidade: um único número explícito, senão 1 por cor em kits
+    numeros = {int(a or b) for a, b in _RE_QUANTIDADE.findall(texto)}
+    if len(numeros) > 1:
+        return None
+    if numeros:
+        quantidade = numeros.pop()
+        if quantidade < 1 or quantidade > 20:
+            return None
+        # Kit com as duas cores: quantidade par e >= 2 (ex.: "3 pretos e 2 coloridos" fica com o LLM)
+        if preto and colorido and (quantidade < 2 or quantidade % 2):
+            return None
+    elif preto and colorido:
+        quantidade = 2
+    elif _RE_KIT.search(texto) or len(cores_codigo) > 1:
+        # "kit 664 preto" sem número: quantidade incerta
+        return None
+    else:
+        quantidade = 1
+
+    # Uso: só no título e sem negação; menções na descrição ficam com o LLM
+    if _RE_NEGACAO.search(texto) or _RE_USADO.search(texto_descricao):
+        return None
+    usado = 1 if _RE_USADO.search(texto) else 0
+
+    return {
+        "tipo_cartucho": modelo,
+        "cores_detalhadas": {"preto": preto, "colorido": colorido},
+        "quantidade_por_anuncio": quantidade,
+        "usado_seminovo": usado,
+    }
@@ -0,0 +1,79 @@
+"""
+=============================================================================
+SENTIMENTO E PALAVRAS-CHAVE DAS REVIEWS (SCRIPT 4)
+=============================================================================
+Funções executadas nos processos do pool (_processos.py): cada processo carrega
+o VADER uma vez e calcula, para um bloco de produtos, o sentimento médio das
+reviews e as contagens de palavras de fraude e de performance.
+
+As palavras-chave são contadas numa única passada pelo texto (ContadorPalavras:
+uma regex com todas as palavras), com o mesmo resultado da soma de
+texto.count(palavra) para cada palavra da lista.
+"""
+
+import re
+from collections import Counter
+
+import numpy as np
+
+
+class ContadorPalavras:
+    """Soma de texto.count(p) para p em `palavras`, numa passada só pelo texto"""
+
+    def __init__(self, palavras):
+        # Palavra repetida na lista conta repetida (como na soma de count())
+        self.multiplicidade = Counter(p for p in palavras if p)
+        self.palavras = list(self.multiplicidade)
+        # Mais longas primeiro: em cada posição a regex devolve a maior palavra que começa ali
+        ordenadas = sorted(self.palavras, key=len, reverse=True)
+        self._regex = re.compile("(?=(" + "|".join(re.escape(p) for p in ordenadas) + "))") if ordenadas else None
+        # Palavras que começam na mesma posição são prefixos da maior delas
+        self._prefixos = {
+            maior: [p for p in self.palavras if maior.startswith(p)]
+            for maior in self.palavras
+        }
+
+    def contar(self, texto):
+        if self._regex is None:
+            return 0
+        total = 0
+        # Como str.count, cada palavra conta ocorrências sem sobreposição com ela mesma
+        fim_ultima = {}
+        for ocorrencia in self._regex.finditer(texto):
+            inicio = ocorrencia.start()
+            for palavra in self._prefixos[ocorrencia.group(1)]:
+                if inicio >= fim_ultima.get(palavra, 0):
+                    total += self.multiplicidade[palavra]
+                    fim_ultima[palavra] = inicio + len(palavra)
+        return total
+
+
+_analisador = None
+_contador_fraude = None
+_contador_performance = None
+
+
+def inicializar(palavras_fraude, palavras_performance):
+    """Carrega o VADER e os contadores (uma vez por processo)"""
+    global _analisador, _contador_fraude, _contador_performance
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    _analisador = SentimentIntensityAnalyzer()
+    _contador_fraude = ContadorPalavras(palavras_fraude)
+    _contador_performance = ContadorPalavras(palavras_performance)
+
+
+def analisar_bloco(bloco):
+    """
+    bloco: lista de listas de reviews (uma por produto).
+    Retorna [(sentimento_medio, contagem_fraude, contagem_performance)] na mesma ordem.
+    """
+    resultados = []
+    for reviews in bloco:
+        texto_completo = ' '.join(reviews).lower()
+        sentimentos = [_analisador.polarity_scores(review)['compound'] for review in reviews]
+        resultados.append((
+            np.mean(sentimentos),
+            _contador_fraude.contar(texto_completo),
+            _contador_performance.contar(texto_completo),
+        ))
+    return resultados
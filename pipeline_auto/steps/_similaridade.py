@@ -0,0 +1,61 @@
+"""
+=============================================================================
+PARES DE ANÚNCIOS SEMANTICAMENTE SIMILARES (SCRIPT 7)
+=============================================================================
+A camada semântica do grafo só precisa dos pares de anúncios com similaridade
+de cosseno acima do limiar. Em vez da matriz n x n inteira (50 mil anúncios =
+10 GB em float32 por tipo de embedding) percorrida par a par em Python:
+
+- os vetores são normalizados uma vez, em float32 (cosseno = produto escalar)
+- a similaridade é calculada em blocos de linhas contra as linhas seguintes
+  (só o triângulo superior), numa multiplicação de matrizes por bloco (BLAS)
+- de cada bloco saem só os índices dos pares acima do limiar
+
+Memória limitada pelo bloco: PIPELINE_SIMILARIDADE_BLOCO_MB (padrão 256) por
+bloco de similaridades, qualquer que seja o número de anúncios. O resultado é
+exato (mesmos pares da matriz completa), não uma busca aproximada.
+"""
+
+import os
+
+import numpy as np
+
+MEMORIA_BLOCO_MB = float(os.getenv("PIPELINE_SIMILARIDADE_BLOCO_MB", "256"))
+
+
+def normalizar_linhas(matriz):
+    """Cópia em float32 com norma 1 por linha (linhas nulas continuam nulas)"""
+    matriz = np.array(matriz, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    np.divide(matriz, normas, out=matriz, where=normas > 0)
+    return matriz
+
+
+def linhas_por_bloco(n_linhas, memoria_mb=MEMORIA_BLOCO_MB):
+    """Linhas por bloco para que um bloco de similaridades (linhas x n_linhas, float32) caiba em `memoria_mb`"""
+    return max(1, int(memoria_mb * 1024 * 1024 // (4 * max(n_linhas, 1))))
+
+
+def pares_similares(matriz, limiar, memoria_mb=MEMORIA_BLOCO_MB):
+    """
+    Arrays (i, j), i < j, das linhas de `matriz` com similaridade de cosseno > `limiar`.
+    Os pares saem ordenados por i e depois por j.
+    """
+    vetores = normalizar_linhas(matriz)
+    n = len(vetores)
+    bloco = linhas_por_bloco(n, memoria_mb)
+    origens, destinos = [], []
+    for inicio in range(0, n, bloco):
+        fim = min(inicio + bloco, n)
+        # Linhas do bloco contra elas mesmas e as seguintes (pares j > i)
+        similaridades = vetores[inicio:fim] @ vetores[inicio:].T
+        linhas, colunas = np.nonzero(similaridades > limiar)
+        colunas += inicio
+        linhas += inicio
+        acima_da_diagonal = colunas > linhas
+        origens.append(linhas[acima_da_diagonal])
+        destinos.append(colunas[acima_da_diagonal])
+    if not origens:
+        vazio = np.zeros(0, dtype=np.int64)
+        return vazio, vazio
+    return np.concatenate(origens).astype(np.int64), np.concatenate(destinos).astype(np.int64)